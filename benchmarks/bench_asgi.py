@@ -0,0 +1,267 @@
+"""
+Нагрузочное сравнение WSGI и ASGI на async-представлениях (catalog, product_detail, cart_view, send_order_to_bot).
+
+Оба сервера — отдельные процессы на одной базе бенчмарка страниц (benchmarks/bench_views.py):
+  * WSGI — пул из --threads потоков, как gunicorn -k gthread --threads N; async-представления
+    выполняются в потоке воркера через async_to_sync, как в любом WSGI-развёртывании;
+  * ASGI — uvicorn с одним воркером (pip install uvicorn; в requirements не входит).
+
+Telegram подменяется локальной заглушкой Bot API, которая отвечает через --telegram-delay мс:
+на send_order_to_bot WSGI упирается в число потоков, а ASGI ждёт Telegram, не занимая их.
+Нагрузку даёт --concurrency клиентов, каждый шлёт запросы подряд --duration секунд.
+
+Пример:
+    python benchmarks/bench_asgi.py --scale 0.01 --concurrency 50 --duration 10 --telegram-delay 200
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_views import _percentile, fixtures, seed, setup_django  # noqa: E402
+
+BOT_TOKEN = "123456:bench"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Сервер на порту {port} завершился с кодом {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Сервер на порту {port} не поднялся за {timeout}s")
+
+
+# --- Серверы (запускаются этим же скриптом с --serve) ---
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI-сервер с фиксированным пулом потоков: соединение обслуживается одним потоком пула целиком."""
+
+    request_queue_size = 1024
+
+    def __init__(self, address, threads):
+        super().__init__(address, _QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def _configure_server(db_path, telegram_url, telegram_pool):
+    setup_django()
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = str(db_path)
+    settings.DEBUG = False
+    settings.BOT_TOKEN = BOT_TOKEN
+    settings.TELEGRAM_API_URL = telegram_url
+    settings.TELEGRAM_POOL_SIZE = telegram_pool
+    logging.getLogger("app.middleware").setLevel(logging.ERROR)
+
+
+def serve_wsgi(port, db_path, telegram_url, telegram_pool, threads):
+    _configure_server(db_path, telegram_url, telegram_pool)
+    from django.core.wsgi import get_wsgi_application
+
+    server = PooledWSGIServer(("127.0.0.1", port), threads)
+    server.set_app(get_wsgi_application())
+    server.serve_forever()
+
+
+def serve_asgi(port, db_path, telegram_url, telegram_pool):
+    _configure_server(db_path, telegram_url, telegram_pool)
+    import uvicorn
+
+    from flower_shop.asgi import application
+
+    uvicorn.run(application, host="127.0.0.1", port=port, log_level="warning", lifespan="off", access_log=False)
+
+
+def serve_telegram(port, delay_ms):
+    """Заглушка Bot API: на любой метод отвечает «отправлено» через delay_ms миллисекунд."""
+    from aiohttp import web
+
+    async def handle(request):
+        await asyncio.sleep(delay_ms / 1000)
+        return web.json_response({"ok": True, "result": {
+            "message_id": 1, "date": int(time.time()), "chat": {"id": 1, "type": "private"}, "text": "ok",
+        }})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", handle)
+    web.run_app(app, host="127.0.0.1", port=port, print=None, access_log=None)
+
+
+# --- Нагрузка ---
+
+def scenarios(data):
+    """{имя: (метод, путь, JSON-тело)} — только async-представления."""
+    from django.urls import reverse
+
+    return {
+        "catalog": ("GET", reverse("app:catalog"), None),
+        "product_detail": ("GET", reverse("app:product_detail", args=[data["product"].pk]), None),
+        "cart": ("GET", reverse("app:cart"), None),
+        "send_order_to_bot": ("POST", reverse("app:send_order_to_bot"), {"bouquet_name": "Розы", "price": 10}),
+    }
+
+
+async def load(base_url, method, path, body, concurrency, duration, warmup=1.0):
+    """concurrency клиентов шлют запросы подряд; первые warmup секунд не учитываются."""
+    import aiohttp
+
+    latencies, errors = [], 0
+
+    # Без keep-alive: пул потоков WSGI-сервера не держит простаивающие соединения, условия равные
+    connector = aiohttp.TCPConnector(limit=0, force_close=True)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(base_url, connector=connector, timeout=timeout) as session:
+        # Первый запрос прогревает процесс (импорт aiogram, создание Bot) и в замер не входит
+        async with session.request(method, path, json=body) as response:
+            await response.read()
+        started = time.perf_counter()
+        measure_from = started + warmup
+        stop_at = measure_from + duration
+
+        async def client():
+            nonlocal errors
+            while (now := time.perf_counter()) < stop_at:
+                try:
+                    async with session.request(method, path, json=body) as response:
+                        await response.read()
+                        ok = response.status < 400 and (body is None or (await response.json())["status"] == "success")
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    ok = False
+                if now >= measure_from:
+                    latencies.append((time.perf_counter() - now) * 1000)
+                    errors += not ok
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+    if not latencies:
+        raise RuntimeError(f"{method} {path}: ни один запрос не завершился за {duration}s")
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / duration, 1),
+        "errors": errors,
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p90_ms": round(_percentile(latencies, 90), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+    }
+
+
+def _start(*args):
+    return subprocess.Popen([sys.executable, __file__, *map(str, args)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение пропускной способности WSGI и ASGI.")
+    parser.add_argument("--serve", choices=["wsgi", "asgi", "telegram"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--telegram-url", help=argparse.SUPPRESS)
+    parser.add_argument("--scale", type=float, default=0.01, help="Доля набора данных bench_views.")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора данных.")
+    parser.add_argument("--db", default=str(Path(__file__).resolve().parent / "bench_views.sqlite3"),
+                        help="Файл базы бенчмарка (общий с bench_views.py).")
+    parser.add_argument("--threads", type=int, default=8, help="Потоков у WSGI-сервера.")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных клиентов.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Секунд нагрузки на сценарий.")
+    parser.add_argument("--telegram-delay", type=float, default=200.0, help="Задержка заглушки Telegram, мс.")
+    parser.add_argument("--telegram-pool", type=int, default=100,
+                        help="TELEGRAM_POOL_SIZE серверов: при меньшем значении ASGI упирается в пул соединений.")
+    parser.add_argument("--scenario", action="append", help="Только указанные сценарии.")
+    parser.add_argument("--output", help="Куда записать результаты в JSON.")
+    args = parser.parse_args(argv)
+
+    if args.serve == "telegram":
+        return serve_telegram(args.port, args.telegram_delay)
+    if args.serve == "wsgi":
+        return serve_wsgi(args.port, args.db, args.telegram_url, args.telegram_pool, args.threads)
+    if args.serve == "asgi":
+        return serve_asgi(args.port, args.db, args.telegram_url, args.telegram_pool)
+
+    if importlib.util.find_spec("uvicorn") is None:
+        print("Для ASGI-сервера нужен uvicorn: pip install uvicorn", file=sys.stderr)
+        return 2
+
+    setup_django(args.db)
+    from django.db import connection
+
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=True)
+    data = fixtures() or seed(args.scale, args.seed)
+    plan = scenarios(data)
+    if args.scenario:
+        plan = {name: plan[name] for name in args.scenario}
+    connection.close()
+
+    telegram_port = _free_port()
+    telegram_url = f"http://127.0.0.1:{telegram_port}"
+    processes = [_start("--serve", "telegram", "--port", telegram_port, "--telegram-delay", args.telegram_delay)]
+    servers = {}
+    for kind in ("wsgi", "asgi"):
+        port = _free_port()
+        processes.append(_start("--serve", kind, "--port", port, "--db", args.db,
+                                "--telegram-url", telegram_url, "--telegram-pool", args.telegram_pool,
+                                "--threads", args.threads))
+        servers[kind] = (port, processes[-1])
+
+    results = {}
+    try:
+        _wait_for_port(telegram_port, processes[0])
+        for kind, (port, process) in servers.items():
+            _wait_for_port(port, process)
+            for name, (method, path, body) in plan.items():
+                stats = asyncio.run(load(
+                    f"http://127.0.0.1:{port}", method, path, body, args.concurrency, args.duration,
+                ))
+                results.setdefault(name, {})[kind] = stats
+                print(f"{name:>18} {kind}: {stats['rps']:8.1f} rps  p50 {stats['p50_ms']:8.1f}ms  "
+                      f"p99 {stats['p99_ms']:8.1f}ms  errors {stats['errors']}")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    for name, by_kind in results.items():
+        if by_kind["wsgi"]["rps"]:
+            print(f"{name:>18}: ASGI/WSGI = {by_kind['asgi']['rps'] / by_kind['wsgi']['rps']:.2f}x")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
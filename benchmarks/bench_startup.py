@@ -0,0 +1,93 @@
+"""
+Замер холодного старта проекта.
+
+Каждый сценарий запускается в отдельном процессе, поэтому учитываются все импорты:
+  check — `manage.py check` (так стартуют management-команды);
+  wsgi  — импорт WSGI-приложения и загрузка URLconf (app.urls → app.views), как при первом запросе воркера.
+
+Пример:
+    python benchmarks/bench_startup.py --repeat 5 --output startup.json --budget check=3 --budget wsgi=2
+
+Код возврата 1, если медиана какого-либо сценария превышает бюджет (секунды).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / "flower_shop"
+
+WSGI_SNIPPET = (
+    "import flower_shop.wsgi\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+SCENARIOS = {
+    "check": [sys.executable, "manage.py", "check"],
+    "wsgi": [sys.executable, "-c", WSGI_SNIPPET],
+}
+
+
+def measure(command, repeat):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="flower_shop.settings")
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=PROJECT_DIR, env=env, check=True, capture_output=True)
+        runs.append(time.perf_counter() - started)
+    return {
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "max": max(runs),
+        "runs": runs,
+    }
+
+
+def run(repeat=3, scenarios=None):
+    names = scenarios or list(SCENARIOS)
+    return {name: measure(SCENARIOS[name], repeat) for name in names}
+
+
+def over_budget(results, budgets):
+    """Список (сценарий, медиана, бюджет) для сценариев, вышедших за бюджет."""
+    return [
+        (name, results[name]["median"], budget)
+        for name, budget in budgets.items()
+        if name in results and results[name]["median"] > budget
+    ]
+
+
+def _parse_budget(value):
+    name, _, seconds = value.partition("=")
+    if name not in SCENARIOS or not seconds:
+        raise argparse.ArgumentTypeError(f"ожидается <{'|'.join(SCENARIOS)}>=<секунды>, получено {value!r}")
+    return name, float(seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер холодного старта Flower Shop.")
+    parser.add_argument("--repeat", type=int, default=3, help="Сколько раз запускать каждый сценарий.")
+    parser.add_argument("--output", help="Куда записать результаты в JSON.")
+    parser.add_argument("--budget", type=_parse_budget, action="append", default=[],
+                        help="Бюджет медианы, например wsgi=2.0; можно указывать несколько раз.")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    for name, stats in results.items():
+        print(f"{name:>6}: median {stats['median']:.3f}s  min {stats['min']:.3f}s  max {stats['max']:.3f}s")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    failures = over_budget(results, dict(args.budget))
+    for name, median, budget in failures:
+        print(f"РЕГРЕССИЯ: {name} {median:.3f}s > бюджета {budget:.3f}s", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""
+Бенчмарк всех страниц из app/urls.py на большом детерминированном наборе данных.
+
+При scale=1: 10 000 товаров, 100 000 заказов, 1 000 000 позиций заказов (по 10 на заказ).
+Данные создаются один раз в отдельной базе (--db) и переиспользуются следующими запусками.
+Каждый маршрут открывается через тестовый клиент Django; для каждого записываются
+число SQL-запросов, перцентили времени ответа и пиковая память (tracemalloc).
+Каждый запрос выполняется внутри транзакции, которая затем откатывается, так что
+изменяющие маршруты (корзина, оформление заказа) не портят данные для следующих замеров.
+
+Пример:
+    python benchmarks/bench_views.py --scale 0.1 --repeat 20 --output views.json \\
+        --baseline previous.json --max-slowdown 1.5
+
+Код возврата 1, если число запросов превысило бюджет из benchmarks/view_budgets.json
+(или --budgets), либо, при --baseline, если медиана времени выросла больше чем в --max-slowdown раз
+или запросов стало больше, чем в базовом прогоне.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / "flower_shop"
+BUDGETS_FILE = Path(__file__).resolve().parent / "view_budgets.json"
+
+PRODUCTS = 10_000
+ORDERS = 100_000
+ITEMS_PER_ORDER = 10
+USERS = 1_000
+REVIEWS = 5_000
+HISTORY_DAYS = 365
+BATCH_SIZE = 5_000
+
+
+def setup_django(db_path=None):
+    """Настраиваем Django для запуска скрипта; база бенчмарка — отдельный файл SQLite."""
+    if str(PROJECT_DIR) not in sys.path:
+        sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "flower_shop.settings")
+    import django
+
+    django.setup()
+    if db_path:
+        from django.db import connection
+
+        connection.settings_dict["TEST"]["NAME"] = str(db_path)
+
+
+@contextmanager
+def _explicit_created_at(model):
+    """bulk_create с заданным created_at: на время сидирования отключаем auto_now_add."""
+    field = model._meta.get_field("created_at")
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def seed(scale=1.0, seed_value=42):
+    """
+    Заполняем текущую базу детерминированными данными. Возвращает словарь с объектами,
+    которые нужны сценариям (пользователь-покупатель, персонал, товар, заказ, позиция корзины).
+    """
+    from django.contrib.auth.models import User
+    from django.utils.timezone import now
+
+    from app import recommendations, rollups, search
+    from app.models import CartItem, Order, OrderItem, Product, Review
+
+    rng = random.Random(seed_value)
+    products_count = max(int(PRODUCTS * scale), ITEMS_PER_ORDER * 2)
+    orders_count = max(int(ORDERS * scale), 10)
+    users_count = max(int(USERS * scale), 2)
+
+    Product.objects.bulk_create(
+        [
+            Product(
+                name=f"Букет №{i:05d}",
+                price=Decimal(rng.randrange(500, 20000)) / 100,
+                available=rng.random() > 0.05,
+                stock=rng.randrange(0, 50),
+                description="Свежие цветы",
+            )
+            for i in range(products_count)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    product_ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+    prices = dict(Product.objects.values_list("id", "price"))
+
+    # Пароль не нужен: сценарии входят через force_login
+    User.objects.bulk_create(
+        [User(username=f"customer{i:05d}", password="!") for i in range(users_count)],
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(User.objects.order_by("id").values_list("id", flat=True))
+    shopper = User.objects.get(pk=user_ids[0])
+    # Для сценариев только для персонала (аналитика, метрики); fixtures() находит его по имени
+    User.objects.create_user(username="bench-staff", password="!", is_staff=True, is_superuser=True)
+
+    started = now()
+    with _explicit_created_at(Order):
+        for offset in range(0, orders_count, BATCH_SIZE):
+            orders = Order.objects.bulk_create([
+                Order(
+                    user_id=rng.choice(user_ids),
+                    created_at=started - timedelta(minutes=rng.randrange(HISTORY_DAYS * 24 * 60)),
+                    total_price=Decimal("0"),
+                    delivery_address="ул. Цветочная, 1",
+                    phone_number="+70000000000",
+                    delivery_time="12:00",
+                    delivery_date=started.date(),
+                    status=rng.choice(("NEW", "PROCESSING", "COMPLETED", "CANCELLED")),
+                )
+                for _ in range(min(BATCH_SIZE, orders_count - offset))
+            ])
+            items = []
+            for order in orders:
+                total = Decimal("0")
+                for product_id in rng.sample(product_ids, ITEMS_PER_ORDER):
+                    quantity = rng.randrange(1, 4)
+                    items.append(OrderItem(order=order, product_id=product_id,
+                                           quantity=quantity, price=prices[product_id]))
+                    total += prices[product_id] * quantity
+                order.total_price = total
+            OrderItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+            Order.objects.bulk_update(orders, ["total_price"], batch_size=BATCH_SIZE)
+
+    with _explicit_created_at(Review):
+        Review.objects.bulk_create(
+            [
+                Review(user_id=rng.choice(user_ids), rating=rng.randrange(1, 6), text="Отличный букет",
+                       comment="", created_at=started - timedelta(minutes=rng.randrange(HISTORY_DAYS * 24 * 60)))
+                for _ in range(max(int(REVIEWS * scale), 1))
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+    for product_id in rng.sample(product_ids, 5):
+        CartItem.objects.create(user=shopper, product_id=product_id, quantity=1, price=prices[product_id])
+    Product.objects.filter(pk__in=CartItem.objects.values("product_id")).update(available=True, stock=100)
+
+    rollups.backfill()
+    rollups.backfill_ratings()
+    recommendations.update_index(full=True)
+    # bulk_create обходит сигналы — поисковый индекс строим целиком
+    search.rebuild()
+    return fixtures()
+
+
+def fixtures():
+    """Объекты для сценариев из уже заполненной базы."""
+    from django.contrib.auth.models import User
+
+    from app.models import CartItem, Order, Product
+
+    shopper = User.objects.filter(username__startswith="customer").order_by("id").first()
+    if shopper is None:
+        return None
+    return {
+        "shopper": shopper,
+        "staff": User.objects.get(username="bench-staff"),
+        "product": Product.objects.available().filter(stock__gt=0).order_by("id").first(),
+        "order": Order.objects.filter(user=shopper).order_by("-created_at").first(),
+        "cart_item": CartItem.objects.filter(user=shopper).order_by("id").first(),
+    }
+
+
+def scenarios(data):
+    """
+    {имя маршрута: (метод, kwargs для reverse, параметры/данные, кто вошёл)} — по одному на каждый
+    маршрут app.urls. Новый маршрут без сценария — ошибка: бенчмарк должен покрывать все страницы.
+    """
+    from django.contrib.auth.tokens import default_token_generator
+    from django.utils.encoding import force_bytes
+    from django.utils.http import urlsafe_base64_encode
+    from django.utils.timezone import localdate
+
+    shopper, staff = data["shopper"], data["staff"]
+    today = localdate()
+    month = {"start": (today - timedelta(days=30)).isoformat(), "end": today.isoformat()}
+    week = {"start": (today - timedelta(days=7)).isoformat(), "end": today.isoformat()}
+    checkout_form = {
+        "delivery_address": "ул. Цветочная, 1",
+        "phone_number": "+70000000000",
+        "delivery_time": "12:00",
+        "delivery_date": today.isoformat(),
+    }
+    return {
+        "home": ("get", {}, {}, None),
+        "catalog": ("get", {}, {}, None),
+        "search": ("get", {}, {"q": "букеты"}, None),
+        "product_detail": ("get", {"pk": data["product"].pk}, {}, None),
+        "cart": ("get", {}, {}, shopper),
+        "add_to_cart": ("post", {"product_id": data["product"].pk}, {}, shopper),
+        "remove_from_cart": ("post", {"cart_item_id": data["cart_item"].pk}, {}, shopper),
+        "remove_from_session_cart": ("post", {"product_id": data["product"].pk}, {}, None),
+        "checkout": ("post", {}, checkout_form, shopper),
+        "order_success": ("get", {}, {}, shopper),
+        "order_status": ("get", {"order_id": data["order"].pk}, {}, shopper),
+        "repeat_order": ("get", {"order_id": data["order"].pk}, {}, shopper),
+        "order_history": ("get", {}, {}, shopper),
+        "analytics": ("get", {}, {}, staff),
+        "analytics_api": ("get", {}, {**month, "granularity": "day"}, staff),
+        "analytics_export": ("get", {}, {**week, "format": "csv"}, staff),
+        "metrics": ("get", {}, {}, staff),
+        "contacts": ("get", {}, {}, None),
+        "login": ("get", {}, {}, None),
+        "logout": ("get", {}, {}, shopper),
+        "logout_success": ("get", {}, {}, None),
+        "register": ("get", {}, {}, None),
+        "password_reset": ("get", {}, {}, None),
+        "password_reset_done": ("get", {}, {}, None),
+        "password_reset_confirm": (
+            "get",
+            {"uidb64": urlsafe_base64_encode(force_bytes(shopper.pk)),
+             "token": default_token_generator.make_token(shopper)},
+            {},
+            None,
+        ),
+        "password_reset_complete": ("get", {}, {}, None),
+        "reviews": ("get", {}, {}, shopper),
+        "catalog_api": ("get", {}, {}, None),
+        # POST отправил бы сообщение в Telegram — меряем только разбор запроса
+        "send_order_to_bot": ("get", {}, {}, None),
+    }
+
+
+def route_names():
+    from app import urls
+
+    return [pattern.name for pattern in urls.urlpatterns]
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure_route(name, scenario, repeat=10, warmup=2):
+    """
+    Замер одного маршрута; каждый запрос — в откатываемой транзакции.
+
+    Время меряется без tracemalloc (он заметно замедляет Python), пиковая память —
+    одним дополнительным запросом под трассировкой.
+    """
+    from django.db import connection, transaction
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+
+    method, kwargs, params, user = scenario
+    url = reverse(f"app:{name}", kwargs=kwargs)
+    client = Client(raise_request_exception=False)
+
+    def request():
+        with transaction.atomic():
+            if user is not None:
+                client.force_login(user)
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, params)
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return response.status_code, elapsed * 1000, len(ctx.captured_queries)
+
+    for _ in range(warmup):
+        request()
+    runs = [request() for _ in range(repeat)]
+    timings = [elapsed for _, elapsed, _ in runs]
+
+    tracemalloc.start()
+    try:
+        request()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "url": url,
+        "method": method.upper(),
+        "status": runs[-1][0],
+        "queries": max(queries for _, _, queries in runs),
+        "p50_ms": round(statistics.median(timings), 3),
+        "p90_ms": round(_percentile(timings, 90), 3),
+        "p99_ms": round(_percentile(timings, 99), 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run(data, repeat=10, warmup=2, only=None):
+    table = scenarios(data)
+    missing = [name for name in route_names() if name not in table]
+    if missing:
+        raise RuntimeError(f"Нет сценария для маршрутов: {', '.join(missing)}")
+    names = only or route_names()
+    return {name: measure_route(name, table[name], repeat, warmup) for name in names}
+
+
+def over_budget(results, budgets):
+    """Список (маршрут, метрика, значение, бюджет) для превышений бюджета запросов."""
+    return [
+        (name, "queries", results[name]["queries"], budget["queries"])
+        for name, budget in budgets.items()
+        if name in results and "queries" in budget and results[name]["queries"] > budget["queries"]
+    ]
+
+
+def regressions(results, baseline, max_slowdown=1.5):
+    """Сравнение с прошлым прогоном: больше запросов или медиана медленнее в max_slowdown раз."""
+    found = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["queries"] > previous["queries"]:
+            found.append((name, "queries", current["queries"], previous["queries"]))
+        if current["p50_ms"] > previous["p50_ms"] * max_slowdown:
+            found.append((name, "p50_ms", current["p50_ms"], previous["p50_ms"]))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк страниц Flower Shop.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Доля полного набора данных (1.0 — 10k товаров, 100k заказов, 1M позиций).")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора данных.")
+    parser.add_argument("--db", default=str(Path(__file__).resolve().parent / "bench_views.sqlite3"),
+                        help="Файл базы с данными бенчмарка; переиспользуется между запусками.")
+    parser.add_argument("--reseed", action="store_true", help="Пересоздать базу и данные.")
+    parser.add_argument("--repeat", type=int, default=10, help="Замеров на маршрут.")
+    parser.add_argument("--warmup", type=int, default=2, help="Прогревочных запросов на маршрут.")
+    parser.add_argument("--route", action="append", help="Мерить только указанные маршруты.")
+    parser.add_argument("--output", help="Куда записать результаты в JSON.")
+    parser.add_argument("--budgets", default=str(BUDGETS_FILE), help="JSON с бюджетами запросов по маршрутам.")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения.")
+    parser.add_argument("--max-slowdown", type=float, default=1.5,
+                        help="Во сколько раз медиана может вырасти относительно --baseline.")
+    args = parser.parse_args(argv)
+
+    db_path = Path(args.db)
+    if args.reseed and db_path.exists():
+        db_path.unlink()
+    fresh = not db_path.exists()
+
+    setup_django(db_path)
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    # Сломанные страницы попадают в отчёт со статусом 500 — трассировки в консоли не нужны
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+    # На большом наборе медленных запросов много, их SQL уже виден в отчёте по числу запросов
+    logging.getLogger("app.middleware").setLevel(logging.ERROR)
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=True)
+    data = None if fresh else fixtures()
+    if data is None:
+        print(f"Заполняем базу (scale={args.scale})…", file=sys.stderr)
+        started = time.perf_counter()
+        data = seed(args.scale, args.seed)
+        print(f"Готово за {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    results = run(data, args.repeat, args.warmup, args.route)
+    for name, stats in results.items():
+        print(f"{name:>26}: {stats['status']}  {stats['queries']:>3} q  p50 {stats['p50_ms']:8.2f}ms  "
+              f"p90 {stats['p90_ms']:8.2f}ms  peak {stats['peak_kb']:9.1f}KB")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+
+    failures = []
+    if args.budgets and Path(args.budgets).exists():
+        failures += over_budget(results, json.loads(Path(args.budgets).read_text()))
+    if args.baseline:
+        failures += regressions(results, json.loads(Path(args.baseline).read_text()), args.max_slowdown)
+    for name, metric, value, limit in failures:
+        print(f"РЕГРЕССИЯ: {name} {metric} {value} > {limit}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,98 @@
-from django.contrib import admin
+from datetime import datetime, timedelta
+
+from django.contrib import admin, messages
+from django.db import models
+from django.db.models import Min
+from django.utils import timezone
+
+from . import services
 from .models import Product, CartItem, Order, OrderItem, Review
+from .pagination import EstimatedCountPaginator
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'price', 'stock', 'available')
+    list_display = ('name', 'sku', 'price', 'stock', 'available')
     list_filter = ('available',)
-    search_fields = ('name',)
+    search_fields = ('name', 'sku')
+
+
+def _status_action(status, description):
+    """Действие OrderAdmin: перевести выбранные заказы в status одним UPDATE (services.bulk_set_status)."""
+    def action(modeladmin, request, queryset):
+        changed = services.bulk_set_status(queryset, status)
+        # Заказы, из статуса которых перехода нет (например, уже завершённые), не меняются
+        modeladmin.message_user(request, f"Статус изменён у заказов: {changed}.", messages.SUCCESS)
+
+    action.__name__ = f"mark_{status.lower()}"
+    return admin.action(description=description, permissions=['change'])(action)
+
+
+class _DrillDownQuerySet(models.QuerySet):
+    """
+    datetimes() для date_hierarchy без полного прохода по таблице.
+
+    Django строит список лет/месяцев/дней запросом SELECT DISTINCT trunc(created_at) — это чтение
+    всех строк. Здесь периоды находятся «прыжками» по индексу created_at: MIN(created_at) не раньше
+    начала следующего периода — по одному поиску в индексе на каждый найденный период.
+    """
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if kind not in ('year', 'month', 'day'):
+            return super().datetimes(field_name, kind, order, tzinfo)
+        tz = tzinfo or timezone.get_current_timezone()
+        queryset = self.order_by()
+        periods, start = [], None
+        while True:
+            bounded = queryset if start is None else queryset.filter(**{f'{field_name}__gte': start})
+            first = bounded.aggregate(first=Min(field_name))['first']
+            if first is None:
+                break
+            local = timezone.localtime(first, tz) if timezone.is_aware(first) else first
+            period = datetime(local.year, 1 if kind == 'year' else local.month, 1 if kind != 'day' else local.day)
+            if kind == 'year':
+                following = period.replace(year=period.year + 1)
+            elif kind == 'month':
+                following = period.replace(year=period.year + period.month // 12, month=period.month % 12 + 1)
+            else:
+                following = period + timedelta(days=1)
+            if timezone.is_aware(first):
+                period, following = timezone.make_aware(period, tz), timezone.make_aware(following, tz)
+            periods.append(period)
+            start = following
+        return periods if order == 'ASC' else periods[::-1]
+
+
+class _LargeTableAdmin(admin.ModelAdmin):
+    """Списки больших таблиц: без точного COUNT(*), date_hierarchy — поиском по индексу."""
+
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return _DrillDownQuerySet(self.model, query=queryset.query, using=queryset.db)
+
 
+# Таблицы заказов и отзывов большие: без точного COUNT(*), пользователи — в том же запросе,
+# фильтры по дате — диапазоном по индексу created_at
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(_LargeTableAdmin):
     list_display = ('id', 'user', 'status', 'created_at', 'total_price')
     list_filter = ('status', 'created_at')
     search_fields = ('user__username', 'delivery_address', 'id')
     list_editable = ('status',)
+    list_select_related = ('user',)
+    date_hierarchy = 'created_at'
+    actions = [
+        _status_action('PROCESSING', "Взять в обработку"),
+        _status_action('COMPLETED', "Отметить завершёнными"),
+        _status_action('CANCELLED', "Отменить"),
+    ]
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(_LargeTableAdmin):
     list_display = ('user', 'rating', 'comment', 'created_at')
+    list_select_related = ('user',)
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,194 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.sessions.backends.signed_cookies import SessionStore as SignedCookieStore
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, F, IntegerField, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import CartItem, Product
+
+CART_SUMMARY_TIMEOUT = getattr(settings, "CART_SUMMARY_TIMEOUT", 60 * 60 * 24)
+SESSION_CART_KEY = "cart"
+# Корзина гостя живёт в своей подписанной cookie (~4 КБ) — ограничиваем число позиций
+GUEST_CART_COOKIE_NAME = getattr(settings, "GUEST_CART_COOKIE_NAME", "guest_cart")
+GUEST_CART_COOKIE_AGE = getattr(settings, "GUEST_CART_COOKIE_AGE", 60 * 60 * 24 * 14)
+SESSION_CART_MAX_ITEMS = getattr(settings, "SESSION_CART_MAX_ITEMS", 30)
+EMPTY_SUMMARY = {'count': 0, 'total': Decimal('0.00')}
+
+
+def _summary_key(user_id):
+    return f"cart:{user_id}:summary"
+
+
+def _summary_aggregates():
+    return {
+        'count': Coalesce(Sum('quantity'), Value(0), output_field=IntegerField()),
+        'total': Coalesce(
+            Sum(F('price') * F('quantity')), Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    }
+
+
+def _summary_from(totals):
+    return {'count': totals['count'], 'total': Decimal(totals['total']).quantize(Decimal('0.01'))}
+
+
+def compute_summary(user_id):
+    """Число единиц товара и сумма корзины одним агрегирующим запросом."""
+    return _summary_from(CartItem.objects.filter(user_id=user_id).aggregate(**_summary_aggregates()))
+
+
+def get_summary(user):
+    """
+    Сводка корзины {'count', 'total'} из кэша; при промахе — один запрос и запись в кэш.
+
+    Бейдж корзины на каждой странице (context_processors.cart_summary) обходится без запросов к БД.
+    """
+    if not user.is_authenticated:
+        return dict(EMPTY_SUMMARY)
+    key = _summary_key(user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_summary(user.pk)
+        cache.set(key, summary, CART_SUMMARY_TIMEOUT)
+    return summary
+
+
+async def aget_summary(user):
+    """То же, что get_summary, для async-представлений."""
+    if not user.is_authenticated:
+        return dict(EMPTY_SUMMARY)
+    key = _summary_key(user.pk)
+    summary = await cache.aget(key)
+    if summary is None:
+        summary = _summary_from(await CartItem.objects.filter(user_id=user.pk).aaggregate(**_summary_aggregates()))
+        await cache.aset(key, summary, CART_SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate_summary(user_id):
+    """
+    Сбрасываем сводку после любого изменения корзины.
+
+    Удаляем и сразу, и после коммита: иначе параллельный запрос мог бы успеть
+    положить в кэш сводку по ещё не закоммиченному состоянию.
+    """
+    key = _summary_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+# Корзина гостя: {"<product_id>": {"quantity": n, "price": "10.00"}} под SESSION_CART_KEY в request.guest_cart —
+# отдельной подписанной cookie (GuestCartStore, app.middleware.GuestCartMiddleware), без записей в БД:
+# сессии авторизации остаются в SESSION_ENGINE. При входе или регистрации корзина сливается в CartItem
+# одним bulk upsert (merge_session_cart).
+
+
+class GuestCartStore(SignedCookieStore):
+    """Хранилище корзины гостя: подписанная cookie GUEST_CART_COOKIE_NAME с тем же API, что у сессии."""
+
+    def get_session_cookie_age(self):
+        return GUEST_CART_COOKIE_AGE
+
+class SessionCartFull(Exception):
+    """В корзине гостя уже SESSION_CART_MAX_ITEMS позиций."""
+
+
+def session_items(session):
+    return session.get(SESSION_CART_KEY, {})
+
+
+def session_add(session, product, quantity=1):
+    """
+    Кладём товар в корзину гостя. Остаток только проверяется, а не резервируется:
+    списание произойдёт при оформлении заказа (inventory.claim).
+    """
+    items = dict(session_items(session))
+    entry = items.get(str(product.pk))
+    if entry is None and len(items) >= SESSION_CART_MAX_ITEMS:
+        raise SessionCartFull()
+    wanted = (entry['quantity'] if entry else 0) + quantity
+    if wanted > product.stock:
+        from .inventory import InsufficientStock
+        raise InsufficientStock([product.pk])
+    items[str(product.pk)] = {'quantity': wanted, 'price': str(product.price)}
+    session[SESSION_CART_KEY] = items
+
+
+def session_remove(session, product_id):
+    items = dict(session_items(session))
+    if items.pop(str(product_id), None) is not None:
+        session[SESSION_CART_KEY] = items
+
+
+def session_cart_items(session):
+    """Несохранённые CartItem для шаблона корзины гостя; товары — одной выборкой."""
+    items = session_items(session)
+    if not items:
+        return []
+    return _session_cart_items(items, Product.objects.available().in_bulk([int(pk) for pk in items]))
+
+
+async def asession_cart_items(session):
+    """То же, что session_cart_items, для async-представлений."""
+    items = await session.aget(SESSION_CART_KEY, {})
+    if not items:
+        return []
+    return _session_cart_items(items, await Product.objects.available().ain_bulk([int(pk) for pk in items]))
+
+
+def _session_cart_items(items, products):
+    return [
+        CartItem(product=products[int(pk)], quantity=entry['quantity'], price=Decimal(entry['price']))
+        for pk, entry in items.items()
+        if int(pk) in products
+    ]
+
+
+def session_summary(session):
+    """Сводка корзины гостя считается прямо из сессии, без запросов."""
+    items = session_items(session).values()
+    return {
+        'count': sum(entry['quantity'] for entry in items),
+        'total': sum((Decimal(entry['price']) * entry['quantity'] for entry in items), Decimal('0.00')),
+    }
+
+
+def merge_session_cart(request):
+    """
+    Переносим корзину гостя в CartItem вошедшего пользователя: одна выборка товаров,
+    одна выборка существующих позиций и один bulk upsert; количества складываются.
+
+    Новые позиции не резервируются на складе — недостающее списывается при оформлении заказа.
+    Возвращает число перенесённых позиций.
+    """
+    items = session_items(request.guest_cart)
+    if not items:
+        return 0
+    user = request.user
+    quantities = {int(pk): entry['quantity'] for pk, entry in items.items()}
+    products = Product.objects.available().in_bulk(quantities)
+    existing = dict(
+        CartItem.objects.filter(user=user, product_id__in=products).values_list('product_id', 'quantity')
+    )
+    CartItem.objects.bulk_create(
+        [
+            CartItem(
+                user=user,
+                product=product,
+                price=product.price,
+                quantity=existing.get(pk, 0) + quantities[pk],
+            )
+            for pk, product in products.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['user', 'product'],
+        update_fields=['quantity'],
+    )
+    del request.guest_cart[SESSION_CART_KEY]
+    # bulk_create не шлёт post_save — сводку для бейджа сбрасываем сами
+    invalidate_summary(user.pk)
+    return len(products)
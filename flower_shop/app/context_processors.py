@@ -0,0 +1,16 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cart import get_summary, session_summary
+
+
+def cart_summary(request):
+    """Сводка корзины для бейджа в base.html (из кэша или cookie корзины гостя), только если шаблон к ней обратился."""
+    def summary():
+        # Async-представления загружают сводку заранее (views._load_async_context): из event loop в БД нельзя
+        if getattr(request, 'cart_summary', None) is not None:
+            return request.cart_summary
+        if request.user.is_authenticated:
+            return get_summary(request.user)
+        return session_summary(request.guest_cart)
+
+    return {'cart_summary': SimpleLazyObject(summary)}
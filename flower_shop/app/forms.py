@@ -60,4 +60,57 @@ class ReviewForm(forms.ModelForm):
         labels = {
             'text': 'Ваш отзыв',
             'rating': 'Оценка',
-        }
\ No newline at end of file
+        }
+
+class CatalogFilterForm(forms.Form):
+    SORT_CHOICES = (
+        ('price', 'Сначала дешёвые'),
+        ('-price', 'Сначала дорогие'),
+        ('name', 'По названию (А–Я)'),
+        ('-name', 'По названию (Я–А)'),
+    )
+
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False, label="Сортировка")
+    min_price = forms.DecimalField(min_value=0, decimal_places=2, required=False, label="Цена от")
+    max_price = forms.DecimalField(min_value=0, decimal_places=2, required=False, label="Цена до")
+    in_stock = forms.BooleanField(required=False, label="Только в наличии")
+    # Скрытые товары показываем только персоналу (см. views.filter_catalog)
+    include_unavailable = forms.BooleanField(required=False, label="Показывать скрытые")
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
+
+
+class AnalyticsRangeForm(forms.Form):
+    GRANULARITY_CHOICES = (
+        ('hour', 'По часам'),
+        ('day', 'По дням'),
+        ('week', 'По неделям'),
+    )
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('parquet', 'Parquet'),
+    )
+    MAX_DAYS = 366
+    MAX_HOURLY_DAYS = 31
+
+    start = forms.DateField(input_formats=['%Y-%m-%d'], label="С даты")
+    end = forms.DateField(input_formats=['%Y-%m-%d'], label="По дату")
+    granularity = forms.ChoiceField(choices=GRANULARITY_CHOICES, required=False, label="Шаг")
+    top = forms.IntegerField(min_value=1, max_value=50, required=False, label="Топ товаров")
+    # Используется только выгрузкой (views.analytics_export)
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False, label="Формат")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get("start"), cleaned_data.get("end")
+        cleaned_data["granularity"] = cleaned_data.get("granularity") or 'day'
+        cleaned_data["top"] = cleaned_data.get("top") or 10
+        cleaned_data["format"] = cleaned_data.get("format") or 'csv'
+        if start and end:
+            if start > end:
+                raise forms.ValidationError("Начало периода позже его конца.")
+            days = (end - start).days + 1
+            if days > self.MAX_DAYS:
+                raise forms.ValidationError(f"Период не может быть длиннее {self.MAX_DAYS} дней.")
+            if cleaned_data["granularity"] == 'hour' and days > self.MAX_HOURLY_DAYS:
+                raise forms.ValidationError(f"Почасовая разбивка доступна для периода до {self.MAX_HOURLY_DAYS} дней.")
+        return cleaned_data
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+FRAGMENT_TIMEOUT = getattr(settings, "FRAGMENT_CACHE_TIMEOUT", 60 * 60 * 24)
+
+# Меняется вместе с разметкой карточки: фрагменты, отрендеренные старым шаблоном, перестают читаться
+CARD_TEMPLATE_VERSION = 3
+
+
+def product_version(updated_at):
+    """
+    Версия фрагментов товара — его Product.updated_at в микросекундах.
+
+    Версия хранится в БД, а не в кэше: LocMemCache у каждого процесса свой, и сброс из команды
+    импорта или пула превью иначе не увидели бы веб-воркеры. save() сдвигает updated_at сам (auto_now),
+    UPDATE и bulk_update в обход save() должны передавать updated_at явно.
+    """
+    return int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+
+
+def _card_key(pk, version):
+    return f"product:{pk}:card:v{CARD_TEMPLATE_VERSION}:{version}"
+
+
+def render_product_cards(rows, load_products):
+    """
+    Возвращаем карточки [{'pk': ..., 'body': html}] для списка (pk, updated_at) в том же порядке.
+
+    Карточка не зависит от пользователя (форма с csrf-токеном рендерится отдельно),
+    поэтому один и тот же фрагмент переиспользуется всеми запросами. load_products(missing_pks)
+    вызывается только для промахов и должен вернуть {pk: Product}.
+    """
+    pks, keys, cached, missing = _cached_cards(rows)
+    if missing:
+        _render_missing(missing, load_products(missing), keys, cached)
+    return _cards(pks, keys, cached)
+
+
+async def arender_product_cards(rows, aload_products):
+    """То же, что render_product_cards, для async-представлений: aload_products — корутина."""
+    pks, keys, cached, missing = _cached_cards(rows)
+    if missing:
+        _render_missing(missing, await aload_products(missing), keys, cached)
+    return _cards(pks, keys, cached)
+
+
+def _cached_cards(rows):
+    keys = {pk: _card_key(pk, product_version(updated_at)) for pk, updated_at in rows}
+    pks = list(keys)
+    cached = cache.get_many(keys.values())
+    return pks, keys, cached, [pk for pk in pks if keys[pk] not in cached]
+
+
+def _render_missing(missing, products, keys, cached):
+    rendered = {}
+    for pk in missing:
+        product = products.get(pk)
+        if product is None:
+            continue
+        rendered[keys[pk]] = render_to_string('app/includes/product_card_body.html', {'product': product})
+    cache.set_many(rendered, FRAGMENT_TIMEOUT)
+    cached.update(rendered)
+
+
+def _cards(pks, keys, cached):
+    return [{'pk': pk, 'body': mark_safe(cached[keys[pk]])} for pk in pks if keys[pk] in cached]
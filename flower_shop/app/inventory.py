@@ -0,0 +1,180 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils.timezone import now
+
+from .cart import invalidate_summary
+from .models import CartItem, Product
+
+logger = logging.getLogger(__name__)
+
+CART_HOLD_TTL = timedelta(minutes=getattr(settings, "CART_HOLD_MINUTES", 30))
+
+
+class InsufficientStock(Exception):
+    """На складе нет запрошенного количества хотя бы одного из товаров product_ids."""
+
+    def __init__(self, product_ids):
+        self.product_ids = list(product_ids)
+        super().__init__(f"Недостаточно товара на складе: {', '.join(f'#{pk}' for pk in self.product_ids)}.")
+
+
+def take_stock(product_id, quantity):
+    """
+    Условно списываем quantity единиц: UPDATE ... SET stock = stock - n WHERE id = ? AND stock >= n.
+
+    Проверка и списание — один оператор, поэтому параллельные запросы не могут уйти в минус,
+    а блокировка строки держится только на время самого UPDATE.
+    """
+    if quantity <= 0:
+        return True
+    updated = Product.objects.filter(pk=product_id, stock__gte=quantity).update(stock=F('stock') - quantity)
+    return updated == 1
+
+
+def _per_product(quantities):
+    return Case(
+        *[When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def take_stock_bulk(quantities):
+    """
+    Списываем {product_id: quantity} одним условным UPDATE с CASE по товарам.
+
+    Возвращает False, если хотя бы у одного товара не хватило остатка; часть товаров при этом
+    уже могла быть списана, поэтому вызывать только внутри transaction.atomic() и откатывать её.
+    """
+    quantities = {pk: qty for pk, qty in quantities.items() if qty > 0}
+    if not quantities:
+        return True
+    amount = _per_product(quantities)
+    updated = Product.objects.filter(pk__in=quantities, stock__gte=amount).update(stock=F('stock') - amount)
+    return updated == len(quantities)
+
+
+def return_stock(quantities):
+    """Возвращаем на склад {product_id: quantity} одним UPDATE с CASE по товарам."""
+    quantities = {pk: qty for pk, qty in quantities.items() if qty > 0}
+    if not quantities:
+        return
+    Product.objects.filter(pk__in=quantities).update(stock=F('stock') + _per_product(quantities))
+
+
+def hold(user, product, quantity=1):
+    """
+    Добавляем товар в корзину пользователя, сразу резервируя его на складе на CART_HOLD_TTL.
+
+    Бросает InsufficientStock, если свободного остатка не хватает; корзина при этом не меняется.
+    """
+    until = now() + CART_HOLD_TTL
+    with transaction.atomic():
+        if not take_stock(product.pk, quantity):
+            raise InsufficientStock([product.pk])
+        if _add_to_held(user, product, quantity, until):
+            return
+        try:
+            # Точка сохранения: при гонке откатывается только INSERT, списание со склада остаётся
+            with transaction.atomic():
+                CartItem.objects.create(
+                    user=user,
+                    product=product,
+                    price=product.price,
+                    quantity=quantity,
+                    reserved_quantity=quantity,
+                    reserved_until=until,
+                )
+        except IntegrityError:
+            # Параллельный запрос успел создать позицию (unique_cart_item) — добавляем к ней
+            if not _add_to_held(user, product, quantity, until):
+                raise
+
+
+def _add_to_held(user, product, quantity, until):
+    updated = CartItem.objects.filter(user=user, product=product).update(
+        quantity=F('quantity') + quantity,
+        reserved_quantity=F('reserved_quantity') + quantity,
+        reserved_until=until,
+    )
+    if updated:
+        # UPDATE через queryset не шлёт post_save — сводку корзины сбрасываем сами
+        invalidate_summary(user.pk)
+    return bool(updated)
+
+
+def release(cart_item):
+    """
+    Удаляем позицию из корзины и возвращаем её резерв на склад.
+
+    Позиция удаляется одной командой DELETE ... RETURNING (SQLite 3.35+, PostgreSQL): на склад уходит
+    ровно тот резерв, что был в строке в момент удаления, а не в прочитанной ранее копии cart_item.
+    Параллельные release и sweep_expired_holds не вернут один резерв дважды. Возвращает это количество.
+    """
+    table = connection.ops.quote_name(CartItem._meta.db_table)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE id = %s RETURNING product_id, reserved_quantity", [cart_item.pk]
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return 0
+        product_id, reserved = row
+        return_stock({product_id: reserved})
+    # Сырой DELETE не шлёт post_delete — сводку корзины сбрасываем сами
+    invalidate_summary(cart_item.user_id)
+    return reserved
+
+
+def claim(cart_items):
+    """
+    Окончательно списываем остаток под позиции корзины при оформлении заказа.
+
+    Уже зарезервированная часть (даже с истёкшим, но ещё не возвращённым резервом) считается
+    списанной; недостающее списывается одним условным UPDATE на всю корзину.
+    Вызывать внутри transaction.atomic(): при InsufficientStock вся транзакция должна откатиться.
+    """
+    missing = defaultdict(int)
+    for item in cart_items:
+        if item.quantity > item.reserved_quantity:
+            missing[item.product_id] += item.quantity - item.reserved_quantity
+    if not take_stock_bulk(missing):
+        raise InsufficientStock(missing)
+
+
+def sweep_expired_holds(batch_size=1000):
+    """
+    Возвращаем на склад резервы, срок которых истёк; позиции остаются в корзине без резерва.
+
+    Работает пачками: одна выборка, один UPDATE товаров и один UPDATE корзин на пачку.
+    На PostgreSQL строки, занятые оформлением заказа, пропускаются (SKIP LOCKED) до следующего прохода.
+    Возвращает число освобождённых позиций.
+    """
+    released = 0
+    cutoff = now()
+    while True:
+        with transaction.atomic():
+            rows = list(
+                CartItem.objects.select_for_update(skip_locked=True)
+                .filter(reserved_until__lt=cutoff, reserved_quantity__gt=0)
+                .values_list('id', 'product_id', 'reserved_quantity')[:batch_size]
+            )
+            if not rows:
+                break
+            totals = defaultdict(int)
+            for _, product_id, quantity in rows:
+                totals[product_id] += quantity
+            return_stock(totals)
+            CartItem.objects.filter(id__in=[row[0] for row in rows]).update(reserved_quantity=0, reserved_until=None)
+        released += len(rows)
+        if len(rows) < batch_size:
+            break
+    if released:
+        logger.info("Возвращено на склад истёкших резервов: %d", released)
+    return released
@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.rollups import backfill, backfill_ratings
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает сводки продаж из заказов и сводку оценок отзывов (после миграции или для сверки)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Пересчитать только дни начиная с даты ГГГГ-ММ-ДД (по умолчанию — все).",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("Дата --since должна быть в формате ГГГГ-ММ-ДД.")
+        daily, per_product = backfill(since=since)
+        ratings = backfill_ratings()
+        self.stdout.write(self.style.SUCCESS(
+            f"Сводок по дням: {daily}, сводок по товарам: {per_product}, оценок отзывов: {ratings}"
+        ))
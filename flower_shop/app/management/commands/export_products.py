@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import product_io
+
+
+class Command(BaseCommand):
+    help = "Выгружает товары в CSV или JSONL потоком (формат совместим с import_products)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Куда писать; «-» (по умолчанию) — стандартный вывод.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Формат (по умолчанию — по расширению, иначе CSV).")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=product_io.CHUNK_SIZE,
+            help=f"Строк, читаемых из БД за раз (по умолчанию {product_io.CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path == "-" else product_io.detect_format(path))
+        write = product_io.write_jsonl if fmt == "jsonl" else product_io.write_csv
+        rows = product_io.export_rows(options["chunk_size"])
+        if path == "-":
+            # OutputWrapper дописывает перевод строки, только если его нет, — строки CSV/JSONL не меняются
+            write(rows, self.stdout)
+            return
+        try:
+            with open(path, "w", encoding="utf-8", newline="") as file:
+                count = write(rows, file)
+        except OSError as exc:
+            raise CommandError(f"Не удалось записать {path}: {exc}")
+        self.stderr.write(self.style.SUCCESS(f"Выгружено товаров: {count}"))
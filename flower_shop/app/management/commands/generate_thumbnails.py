@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from app import thumbnails
+from app.models import Product
+
+
+class Command(BaseCommand):
+    help = "Строит превью (JPEG и WebP) для картинок товаров, у которых их ещё нет."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Перестроить превью у всех товаров с картинкой (готовые файлы с тем же хешем не перекодируются).",
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image="").exclude(image__isnull=True).only("image", "thumbnails")
+        built = 0
+        for product in products.iterator(chunk_size=500):
+            if not options["force"] and product.has_thumbnails:
+                continue
+            if thumbnails.generate(product.pk) is not None:
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f"Превью построено для товаров: {built}"))
@@ -0,0 +1,66 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import product_io
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует товары из CSV (с заголовком) или JSONL по ключу SKU: новые создаются, "
+        f"существующие обновляются. Колонки: {', '.join(product_io.COLUMNS)}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл .csv или .jsonl; «-» — стандартный ввод.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Формат файла (по умолчанию — по расширению).")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=product_io.CHUNK_SIZE,
+            help=f"Строк в одной пачке bulk_create/bulk_update (по умолчанию {product_io.CHUNK_SIZE}).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Только проверить строки, ничего не записывая.")
+        parser.add_argument("--no-images", action="store_true", help="Не загружать картинки из колонки image.")
+        parser.add_argument("--images-dir", help="Каталог, относительно которого ищутся локальные картинки.")
+        parser.add_argument("--workers", type=int, default=8, help="Потоков загрузки картинок (по умолчанию 8).")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path == "-" else product_io.detect_format(path))
+        started = time.monotonic()
+
+        def progress(stats):
+            elapsed = time.monotonic() - started
+            self.stderr.write(
+                f"\rОбработано строк: {stats['rows']} ({stats['rows'] / max(elapsed, 1e-6):.0f}/с), "
+                f"ошибок: {stats['errors']}",
+                ending="",
+            )
+
+        try:
+            file = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+        except OSError as exc:
+            raise CommandError(f"Не удалось открыть {path}: {exc}")
+        with file:
+            stats = product_io.import_products(
+                product_io.read_rows(file, fmt),
+                chunk_size=options["chunk_size"],
+                dry_run=options["dry_run"],
+                images=not options["no_images"],
+                images_dir=options["images_dir"],
+                workers=options["workers"],
+                progress=progress,
+            )
+        self.stderr.write("")
+
+        for message in stats["error_messages"]:
+            self.stderr.write(self.style.WARNING(message))
+        if stats["errors"] > len(stats["error_messages"]):
+            self.stderr.write(self.style.WARNING(f"... и ещё {stats['errors'] - len(stats['error_messages'])}"))
+        prefix = "Проверка без записи. " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Строк: {stats['rows']}, создано: {stats['created']}, обновлено: {stats['updated']}, "
+            f"без изменений: {stats['unchanged']}, ошибок: {stats['errors']} за {time.monotonic() - started:.1f} с"
+        ))
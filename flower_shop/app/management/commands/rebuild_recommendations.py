@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from app.recommendations import update_index
+
+
+class Command(BaseCommand):
+    help = "Инкрементально обновляет индекс рекомендаций «покупают вместе» по новым заказам."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Очистить индекс и пересчитать его по всем заказам.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Сколько заказов обрабатывать в одной транзакции (по умолчанию 1000).",
+        )
+
+    def handle(self, *args, **options):
+        processed = update_index(full=options["full"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Учтено заказов: {processed}"))
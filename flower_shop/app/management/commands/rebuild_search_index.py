@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from app import search
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовый индекс товаров (после импорта или правок в обход сигналов)."
+
+    def handle(self, *args, **options):
+        if not search.is_enabled():
+            self.stdout.write("Индекс FTS5 используется только с SQLite — перестраивать нечего.")
+            return
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано товаров: {count}"))
@@ -0,0 +1,15 @@
+import asyncio
+import logging
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Запускает Telegram-бота (long polling) с уже настроенным Django."
+
+    def handle(self, *args, **options):
+        # Модуль бота тянет aiogram и регистрирует хендлеры — импортируем только здесь
+        from app.telegram_bot import main
+
+        logging.basicConfig(level=logging.INFO)
+        asyncio.run(main())
@@ -0,0 +1,40 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from app import status_digest
+from app.notifications import client
+from app.outbox import OutboxDispatcher
+
+
+class Command(BaseCommand):
+    help = "Отправляет накопленные в TelegramOutbox уведомления (повторы, backoff, лимиты Telegram)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Разобрать одну пачку и выйти.")
+        parser.add_argument("--batch-size", type=int, default=50, help="Размер пачки (по умолчанию 50).")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Пауза между опросами пустой очереди, секунды (по умолчанию 1).",
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        client.attach_loop(asyncio.get_running_loop())
+        # Перед каждой пачкой накопленные смены статусов складываются в сводки
+        dispatcher = OutboxDispatcher(
+            client.bot, batch_size=options["batch_size"], before_drain=status_digest.flush,
+        )
+        try:
+            if options["once"]:
+                sent = await dispatcher.drain_once()
+                self.stdout.write(self.style.SUCCESS(f"Обработано сообщений: {sent}"))
+            else:
+                self.stdout.write("Диспетчер уведомлений запущен. Ожидаю сообщения...")
+                await dispatcher.run_forever(poll_interval=options["interval"])
+        finally:
+            await client.aclose()
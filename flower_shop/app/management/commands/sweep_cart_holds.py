@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from app.inventory import sweep_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Возвращает на склад истёкшие резервы корзин (запускать по cron раз в минуту-две)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Сколько позиций корзины освобождать за одну транзакцию (по умолчанию 1000).",
+        )
+
+    def handle(self, *args, **options):
+        released = sweep_expired_holds(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Освобождено резервов: {released}"))
@@ -0,0 +1,204 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Замеры текущего запроса (RequestStats), если он проходит через InstrumentationMiddleware
+current_request = ContextVar("current_request", default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+# Сколько запросов к БД запоминать для лога медленного запроса
+MAX_LOGGED_QUERIES = 200
+
+
+class RequestStats:
+    """Счётчики одного HTTP-запроса: SQL (число, время, тексты) и время рендеринга шаблонов."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.statements = []
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if len(self.statements) < MAX_LOGGED_QUERIES:
+                self.statements.append((elapsed, sql))
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка connection.execute_wrapper: считает запрос в замеры текущего HTTP-запроса, если они есть."""
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats.record_query(execute, sql, params, many, context)
+
+
+def install_query_timer():
+    """
+    Ставим record_query на все соединения процесса, в т.ч. будущие.
+
+    Обёртка постоянная, а не на время запроса: под ASGI ORM выполняется в потоках sync_to_async
+    со своими соединениями. Нужные замеры она находит через contextvar, который туда копируется.
+    """
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(_on_connection_created, dispatch_uid="app.metrics.record_query")
+    for connection in connections.all(initialized_only=True):
+        _add_query_timer(connection)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _add_query_timer(connection)
+
+
+def _add_query_timer(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, label_values, value):
+        counts, total = self._series.get(label_values, (None, 0.0))
+        if counts is None:
+            counts = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._series[label_values] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self._series.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._series = {}
+
+    def inc(self, label_values, amount=1):
+        self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Registry:
+    """
+    Метрики процесса в памяти. У каждого воркера gunicorn/uwsgi — свои,
+    Prometheus опрашивает их по отдельности (или через общий балансировщик).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter(
+            "flower_shop_requests_total", "Обработанные запросы.", ("view", "method", "status"))
+        self.slow_requests = Counter(
+            "flower_shop_slow_requests_total", "Запросы дольше порога METRICS_SLOW_REQUEST_MS.", ("view",))
+        self.latency = Histogram(
+            "flower_shop_request_duration_seconds", "Время обработки запроса.", ("view",), LATENCY_BUCKETS)
+        self.db_queries = Histogram(
+            "flower_shop_request_db_queries", "Число SQL-запросов на HTTP-запрос.", ("view",), QUERY_BUCKETS)
+        self.db_time = Histogram(
+            "flower_shop_request_db_seconds", "Время в БД на HTTP-запрос.", ("view",), LATENCY_BUCKETS)
+        self.template_time = Histogram(
+            "flower_shop_request_template_seconds", "Время рендеринга шаблонов на HTTP-запрос.", ("view",),
+            LATENCY_BUCKETS)
+        self.response_size = Histogram(
+            "flower_shop_response_size_bytes", "Размер ответа (кроме потоковых).", ("view",), SIZE_BUCKETS)
+
+    def observe(self, view, method, status, duration, stats, size=None, slow=False):
+        with self._lock:
+            self.requests.inc((view, method, status))
+            self.latency.observe((view,), duration)
+            self.db_queries.observe((view,), stats.queries)
+            self.db_time.observe((view,), stats.db_time)
+            self.template_time.observe((view,), stats.template_time)
+            if size is not None:
+                self.response_size.observe((view,), size)
+            if slow:
+                self.slow_requests.inc((view,))
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus (version 0.0.4)."""
+        with self._lock:
+            lines = []
+            for metric in (self.requests, self.slow_requests, self.latency, self.db_queries,
+                           self.db_time, self.template_time, self.response_size):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+_template_timer_installed = False
+_install_lock = threading.Lock()
+
+
+def install_template_timer():
+    """
+    Оборачиваем django.template.base.Template.render, чтобы считать время рендеринга шаблонов.
+
+    У Django нет сигнала для этого вне тестов. Время считается только для внешнего
+    вызова: вложенные {% include %} и {% extends %} уже входят в него.
+    """
+    global _template_timer_installed
+    from django.template.base import Template
+
+    with _install_lock:
+        if _template_timer_installed:
+            return
+        original = Template.render
+
+        def render(self, context):
+            stats = current_request.get()
+            if stats is None:
+                return original(self, context)
+            stats.template_depth += 1
+            started = time.perf_counter()
+            try:
+                return original(self, context)
+            finally:
+                stats.template_depth -= 1
+                if not stats.template_depth:
+                    stats.template_time += time.perf_counter() - started
+
+        Template.render = render
+        _template_timer_installed = True
@@ -0,0 +1,137 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+from . import cart, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentationMiddleware:
+    """
+    Замеры каждого запроса: время, число и время SQL-запросов, время шаблонов, размер ответа.
+
+    Данные копятся в metrics.registry и отдаются персоналу на /metrics/ в формате Prometheus.
+    Запросы дольше METRICS_SLOW_REQUEST_MS пишутся в лог вместе со списком SQL.
+    Ставить первым в MIDDLEWARE, чтобы учитывались запросы сессий и аутентификации.
+    Работает и под WSGI, и под ASGI, не переводя async-представления в поток.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.slow_threshold = getattr(settings, "METRICS_SLOW_REQUEST_MS", 500) / 1000
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        metrics.install_query_timer()
+        metrics.install_template_timer()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        self._observe(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        self._observe(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def _observe(self, request, response, stats, duration):
+        match = request.resolver_match
+        # Метка — имя маршрута, а не путь: число рядов метрик не растёт с числом товаров и заказов
+        view = match.view_name if match else "unmatched"
+        slow = duration >= self.slow_threshold
+        size = None if response.streaming else len(response.content)
+        metrics.registry.observe(view, request.method, response.status_code, duration, stats, size, slow)
+        if slow:
+            self._log_slow(request, view, duration, stats)
+
+    def _log_slow(self, request, view, duration, stats):
+        statements = "\n".join(
+            f"  {elapsed * 1000:8.2f} ms  {sql}"
+            for elapsed, sql in sorted(stats.statements, key=lambda row: row[0], reverse=True)
+        )
+        logger.warning(
+            "Медленный запрос %s %s (%s): %.0f ms, SQL: %d за %.0f ms, шаблоны: %.0f ms\n%s",
+            request.method, request.path, view, duration * 1000,
+            stats.queries, stats.db_time * 1000, stats.template_time * 1000, statements,
+        )
+
+
+class GuestCartMiddleware:
+    """
+    Корзина гостя в отдельной подписанной cookie: request.guest_cart (app.cart.GuestCartStore).
+
+    Добавление в корзину без входа не пишет ни в БД, ни в сессию — сессии авторизации остаются
+    в SESSION_ENGINE, и выход или смена пароля по-прежнему отзывают их на сервере.
+    Cookie пишется, только если корзину меняли; пустая корзина удаляет cookie.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.guest_cart = cart.GuestCartStore(request.COOKIES.get(cart.GUEST_CART_COOKIE_NAME))
+        return self._save(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        request.guest_cart = cart.GuestCartStore(request.COOKIES.get(cart.GUEST_CART_COOKIE_NAME))
+        return self._save(request, await self.get_response(request))
+
+    def _save(self, request, response):
+        store = request.guest_cart
+        if store.accessed:
+            patch_vary_headers(response, ("Cookie",))
+        if not store.modified:
+            return response
+        if not store.get(cart.SESSION_CART_KEY):
+            response.delete_cookie(
+                cart.GUEST_CART_COOKIE_NAME,
+                path=settings.SESSION_COOKIE_PATH,
+                domain=settings.SESSION_COOKIE_DOMAIN,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+            return response
+        store.save()
+        response.set_cookie(
+            cart.GUEST_CART_COOKIE_NAME,
+            store.session_key,
+            max_age=cart.GUEST_CART_COOKIE_AGE,
+            path=settings.SESSION_COOKIE_PATH,
+            domain=settings.SESSION_COOKIE_DOMAIN,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite=settings.SESSION_COOKIE_SAMESITE,
+        )
+        return response
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:39
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    """Старые корзины могли содержать несколько строк на один товар — складываем их в одну."""
+    CartItem = apps.get_model('app', 'CartItem')
+    duplicates = (
+        CartItem.objects.values('user_id', 'product_id')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for pair in duplicates:
+        items = list(CartItem.objects.filter(user_id=pair['user_id'], product_id=pair['product_id']).order_by('id'))
+        keep, extra = items[0], items[1:]
+        keep.quantity = sum(item.quantity for item in items)
+        keep.reserved_quantity = sum(item.reserved_quantity for item in items)
+        keep.reserved_until = max((item.reserved_until for item in items if item.reserved_until), default=None)
+        keep.save(update_fields=['quantity', 'reserved_quantity', 'reserved_until'])
+        CartItem.objects.filter(pk__in=[item.pk for item in extra]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_sales_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'product'), name='unique_cart_item'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:40
+
+from django.db import migrations
+
+# Имя таблицы и схема зафиксированы здесь, а не берутся из app.search: историческая миграция
+# не должна меняться вместе с живым кодом. Индекс заполняет команда rebuild_search_index.
+FTS_TABLE = 'app_product_fts'
+
+
+def create_search_index(apps, schema_editor):
+    """Таблица FTS5 только для SQLite; на других СУБД search.py ищет через icontains."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, description, prefix="3 4")')
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_product_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
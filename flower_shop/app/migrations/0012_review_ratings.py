@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_ratings(apps, schema_editor):
+    """Гистограмма оценок по уже оставленным отзывам; дальше она поддерживается сигналами Review."""
+    Review = apps.get_model('app', 'Review')
+    ReviewRatingRollup = apps.get_model('app', 'ReviewRatingRollup')
+    ReviewRatingRollup.objects.bulk_create(
+        ReviewRatingRollup(rating=row['rating'], review_count=row['n'])
+        for row in Review.objects.values('rating').annotate(n=Count('id')).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_product_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewRatingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.PositiveSmallIntegerField(unique=True)),
+                ('review_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at', 'id'], name='review_created_id_idx'),
+        ),
+        migrations.RunPython(count_existing_ratings, migrations.RunPython.noop),
+    ]
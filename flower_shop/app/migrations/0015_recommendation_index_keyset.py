@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+def rebuild_existing_index(apps, schema_editor):
+    # Старый водяной знак хранил только id заказа: без даты продолжить нельзя, пересчитываем индекс целиком
+    RecommendationIndexState = apps.get_model('app', 'RecommendationIndexState')
+    RecommendationIndexState.objects.filter(last_order_id__gt=0).update(dirty=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_order_status_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recommendationindexstate',
+            name='dirty',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='recommendationindexstate',
+            name='last_created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(rebuild_existing_index, migrations.RunPython.noop),
+    ]
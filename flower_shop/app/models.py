@@ -1,27 +1,76 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.lookups import Exact
 from django.contrib.auth.models import User
 from django.utils.timezone import now
+from django.core.exceptions import ValidationError
 from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 
+from .thumbnails import smallest_url, srcset
 
 
 
 
 
+
+class ProductQuerySet(models.QuerySet):
+    def available(self):
+        """
+        Только доступные товары.
+
+        filter(available=True) на SQLite превращается в голое WHERE "available", по которому
+        планировщик не использует составные индексы (available, ...); явное сравнение
+        available = true даёт поиск по индексу и сортировку без временного B-дерева.
+        """
+        return self.filter(Exact(F('available'), True))
+
+
 class Product(models.Model):
+    # Внешний артикул: ключ массового импорта (import_products); у товаров из админки может отсутствовать
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     available = models.BooleanField(default=True)
     stock = models.PositiveIntegerField(default=0)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
     description = models.TextField(blank=True)
+    # Превью картинки разных ширин в JPEG и WebP (app/thumbnails.py):
+    # {"source": имя исходника, "jpeg": {"320": имя файла, ...}, "webp": {...}}
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False)
+    # Версия кэшированных фрагментов товара (app/fragments.py); UPDATE в обход save() ставит её сам
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductQuerySet.as_manager()
 
     def is_in_stock(self):
         return self.stock > 0
 
+    @property
+    def has_thumbnails(self):
+        """Превью построены для текущей картинки (после замены старые уже не подходят)."""
+        return bool(self.image) and self.thumbnails.get('source') == self.image.name
+
+    def image_srcset(self):
+        return srcset(self.thumbnails, 'jpeg')
+
+    def image_webp_srcset(self):
+        return srcset(self.thumbnails, 'webp')
+
+    def thumbnail_url(self):
+        return smallest_url(self.thumbnails, 'jpeg', min_width=320)
+
     # Другие поля, например, описание, изображение и т.д.
 
+    class Meta:
+        indexes = [
+            # Ключи keyset-пагинации каталога: WHERE available = ? ORDER BY price, id / name, id
+            models.Index(fields=['available', 'price', 'id'], name='product_avail_price_idx'),
+            models.Index(fields=['available', 'name', 'id'], name='product_avail_name_idx'),
+            # Выборки доступных товаров по id (in_bulk рекомендаций, карточки каталога)
+            models.Index(fields=['available', 'id'], name='product_avail_id_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -31,12 +80,32 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Сколько единиц уже списано со склада под эту позицию и до какого момента держится резерв
+    # (см. app/inventory.py). Истёкшие резервы возвращает на склад sweep_cart_holds.
+    reserved_quantity = models.PositiveIntegerField(default=0)
+    reserved_until = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            # Одна позиция на товар: позволяет сливать корзины одним bulk upsert (app/cart.py)
+            models.UniqueConstraint(fields=['user', 'product'], name='unique_cart_item'),
+        ]
 
     def subtotal(self):
         return self.price * self.quantity
 
 
 
+# Смена статуса заказов: sender=Order, status — новый статус, order_ids — до DIGEST_MAX_IDS номеров,
+# count — сколько заказов перешло в status. Шлётся и для одного заказа (Order.save), и для массовой смены
+# одним UPDATE (services.bulk_set_status); слушатель копит события для сводки в Telegram (app/status_digest.py)
+order_status_changed = Signal()
+
+
+class InvalidStatusTransition(ValueError):
+    """Переход между статусами заказа, которого нет в Order.TRANSITIONS."""
+
+
 class Order(models.Model):
     STATUS_CHOICES = (
         ('NEW', 'Новый'),
@@ -44,6 +113,13 @@ class Order(models.Model):
         ('COMPLETED', 'Завершён'),
         ('CANCELLED', 'Отменён'),
     )
+    # Допустимые переходы статусов; из завершённого и отменённого заказа выхода нет
+    TRANSITIONS = {
+        'NEW': ('PROCESSING', 'COMPLETED', 'CANCELLED'),
+        'PROCESSING': ('COMPLETED', 'CANCELLED'),
+        'COMPLETED': (),
+        'CANCELLED': (),
+    }
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -53,6 +129,14 @@ class Order(models.Model):
     delivery_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='NEW')
 
+    class Meta:
+        indexes = [
+            # История заказов: WHERE user_id = ? ORDER BY created_at DESC, id DESC (keyset-курсор)
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_id_idx'),
+            # Аналитика и выгрузки: WHERE created_at >= ? AND created_at < ?
+            models.Index(fields=['created_at'], name='order_created_idx'),
+        ]
+
     def __str__(self):
         return f"Заказ #{self.id} от {self.user.username} (Статус: {self.get_status_display()})"
 
@@ -61,6 +145,36 @@ class Order(models.Model):
     def get_status_display(self):
         return dict(self.STATUS_CHOICES).get(self.status, "Неизвестно")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Статус на момент загрузки: clean() проверяет переход без лишнего запроса (list_editable в админке)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    @classmethod
+    def statuses_leading_to(cls, status):
+        """Статусы, из которых можно перейти в status."""
+        return tuple(source for source, targets in cls.TRANSITIONS.items() if status in targets)
+
+    def can_change_status(self, status):
+        return status in self.TRANSITIONS.get(self.status, ())
+
+    def change_status(self, status):
+        """Переводим заказ в status; событие смены уходит из post_save (order_status_changed)."""
+        if not self.can_change_status(status):
+            raise InvalidStatusTransition(f"Заказ #{self.pk}: переход {self.status} → {status} недопустим")
+        self.status = status
+        self.save(update_fields=['status'])
+
+    def clean(self):
+        previous = getattr(self, '_loaded_status', None)
+        if previous and previous != self.status and self.status not in self.TRANSITIONS.get(previous, ()):
+            raise ValidationError({'status': (
+                f"Нельзя сменить статус «{dict(self.STATUS_CHOICES).get(previous)}» "
+                f"на «{self.get_status_display()}»."
+            )})
+
     def total_cost(self):
         return sum(item.price * item.quantity for item in self.order_items.all())
 
@@ -74,6 +188,118 @@ class OrderItem(models.Model):
 
 
 
+class DailySalesRollup(models.Model):
+    """Сводка заказов за день в разрезе статуса; поддерживается инкрементально (app/rollups.py)."""
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'status'], name='unique_daily_sales_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status}: {self.order_count} / {self.revenue}"
+
+
+class ProductDailyRollup(models.Model):
+    """Продажи товара за день (по всем статусам заказов); поддерживается инкрементально."""
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_rollups')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_product_daily_rollup'),
+        ]
+
+
+class ProductCoPurchase(models.Model):
+    """Сколько заказов содержали одновременно product и related_product (строки хранятся в обе стороны)."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='copurchases')
+    related_product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'related_product'], name='unique_copurchase_pair'),
+        ]
+        indexes = [
+            # top-N соседей: WHERE product_id = ? ORDER BY count DESC — без обращения к таблице
+            models.Index(fields=['product', '-count', 'related_product'], name='copurchase_top_idx'),
+        ]
+
+
+class RecommendationIndexState(models.Model):
+    """
+    Водяной знак инкрементальной перестройки рекомендаций: заказы до (last_created_at, last_order_id)
+    включительно уже учтены. dirty — учтённые заказы с тех пор правили, нужна полная перестройка.
+    updated_at входит в ключи кэша рекомендаций, поэтому меняется при каждой записи в индекс.
+    """
+    last_order_id = models.PositiveBigIntegerField(default=0)
+    last_created_at = models.DateTimeField(null=True, blank=True)
+    dirty = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class TelegramOutbox(models.Model):
+    """
+    Исходящее сообщение Telegram (transactional outbox).
+
+    Строка пишется в той же транзакции, что и заказ, а отправляет её отдельный процесс
+    (manage.py run_telegram_outbox), поэтому уведомление не теряется при падении веб-процесса.
+    """
+    STATUS_CHOICES = (
+        ('PENDING', 'В очереди'),
+        ('SENT', 'Отправлено'),
+        ('FAILED', 'Ошибка'),
+    )
+    chat_id = models.CharField(max_length=64)
+    text = models.TextField()
+    parse_mode = models.CharField(max_length=16, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Выборка очереди: WHERE status = 'PENDING' AND next_attempt_at <= now ORDER BY next_attempt_at
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Telegram #{self.id} → {self.chat_id} ({self.status})"
+
+
+class OrderStatusEvent(models.Model):
+    """
+    Смена статуса заказов, ещё не попавшая в сводку Telegram (app/status_digest.py).
+
+    Массовая смена статуса — одна строка: число заказов и первые номера, а не строка на каждый заказ.
+    После отправки сводки строки удаляются.
+    """
+    chat_id = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    order_count = models.PositiveIntegerField(default=1)
+    order_ids = models.JSONField(default=list)
+    created_at = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [
+            # Сводка по чату: WHERE chat_id = ? ORDER BY created_at, id
+            models.Index(fields=['chat_id', 'created_at'], name='status_event_chat_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_status_display()}: {self.order_count} → {self.chat_id}"
+
+
 class Review(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reviews")
     text = models.TextField(default='Нет комментария')
@@ -81,11 +307,20 @@ class Review(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Лента отзывов по курсору: ORDER BY created_at DESC, id DESC
+            models.Index(fields=['created_at', 'id'], name='review_created_id_idx'),
+        ]
+
     def __str__(self):
         return f"Review by {self.user.username} - Rating: {self.rating}"
 
 
+class ReviewRatingRollup(models.Model):
+    """Число отзывов с данной оценкой; поддерживается инкрементально (app/rollups.py), из строк строится сводка рейтинга."""
+    rating = models.PositiveSmallIntegerField(unique=True)
+    review_count = models.IntegerField(default=0)
 
-
-
-
+    def __str__(self):
+        return f"{self.rating}★: {self.review_count}"
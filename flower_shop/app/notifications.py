@@ -0,0 +1,135 @@
+import asyncio
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationClient:
+    """
+    Единственный на процесс клиент Telegram: один Bot, один пул соединений aiohttp, один event loop.
+
+    Ничего не создаётся при импорте. Bot строится при первом обращении к .bot, фоновый поток
+    с event loop запускается только при первом enqueue() — и только если процесс не подключил
+    свой собственный loop через attach_loop() (бот-поллер, диспетчер outbox).
+    """
+
+    def __init__(self, token=None, pool_size=None):
+        self._token = token
+        self._pool_size = pool_size
+        self._lock = threading.Lock()
+        self._bot = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def bot(self):
+        if self._bot is None:
+            with self._lock:
+                if self._bot is None:
+                    self._bot = self._create_bot()
+        return self._bot
+
+    def _create_bot(self):
+        from aiogram import Bot
+        from aiogram.client.session.aiohttp import AiohttpSession
+
+        token = self._token or getattr(settings, "BOT_TOKEN", None)
+        if not token or ":" not in token:
+            raise ValueError("BOT_TOKEN is invalid or missing in settings.py!")
+        pool_size = self._pool_size or getattr(settings, "TELEGRAM_POOL_SIZE", 10)
+        session_options = {}
+        api_url = getattr(settings, "TELEGRAM_API_URL", "")
+        if api_url:
+            # Свой Bot API сервер (или заглушка в benchmarks/bench_asgi.py)
+            from aiogram.client.telegram import TelegramAPIServer
+            session_options["api"] = TelegramAPIServer.from_base(api_url)
+        return Bot(token=token, session=AiohttpSession(limit=pool_size, **session_options))
+
+    def attach_loop(self, loop):
+        """Используем уже работающий loop процесса вместо отдельного потока."""
+        with self._lock:
+            self._loop = loop
+
+    def _ensure_loop(self):
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._run_loop, args=(loop,), name="telegram-notifications", daemon=True
+                )
+                self._thread.start()
+                self._loop = loop
+                atexit.register(self.shutdown)
+        return self._loop
+
+    @staticmethod
+    def _run_loop(loop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def enqueue(self, coro):
+        """
+        Неблокирующе запускаем корутину в loop клиента и сразу возвращаем concurrent.futures.Future.
+
+        Ошибки не теряются молча: они пишутся в лог, когда корутина завершится.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        future.add_done_callback(self._log_failure)
+        return future
+
+    async def run(self, coro):
+        """
+        Ожидаем корутину из async-кода (ASGI-представления).
+
+        В loop клиента (attach_loop, см. flower_shop/asgi.py) — просто await; из чужого loop
+        (тестовый клиент, WSGI) корутина уходит в loop клиента, а текущий ждёт её, не блокируясь.
+        """
+        if self._loop is asyncio.get_running_loop():
+            return await coro
+        return await asyncio.wrap_future(self.enqueue(coro))
+
+    def attach_running_loop(self):
+        """Берём текущий loop (сервера ASGI), если клиент ещё не работает в своём."""
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    self._loop = loop
+        return self._loop is loop
+
+    def send_message(self, chat_id, text, **kwargs):
+        return self.enqueue(self.bot.send_message(chat_id, text, **kwargs))
+
+    @staticmethod
+    def _log_failure(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Ошибка отправки сообщения в Telegram: %s", future.exception())
+
+    async def aclose(self):
+        """Закрываем HTTP-сессию бота; вызывать из того loop, в котором бот использовался."""
+        if self._bot is not None:
+            await self._bot.session.close()
+
+    def shutdown(self, timeout=5):
+        """Закрываем сессию и останавливаем фоновый поток, если он запускался."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if thread is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.aclose(), loop).result(timeout)
+        except Exception as e:
+            logger.warning("Не удалось корректно закрыть сессию Telegram: %s", e)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        self._bot = None
+
+
+client = NotificationClient()
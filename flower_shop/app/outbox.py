@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+from .models import TelegramOutbox
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, "TELEGRAM_OUTBOX_MAX_ATTEMPTS", 8)
+BACKOFF_BASE = getattr(settings, "TELEGRAM_OUTBOX_BACKOFF_BASE", 5)  # секунды
+BACKOFF_MAX = getattr(settings, "TELEGRAM_OUTBOX_BACKOFF_MAX", 60 * 60)
+# Сколько строка считается «занятой» воркером после выборки; если воркер упал — её подхватит другой.
+# Диспетчер добавляет к ней время, за которое RateLimiter успевает разослать всю пачку, и продлевает
+# аренду каждого сообщения перед отправкой
+LEASE = timedelta(seconds=60)
+
+
+def enqueue(chat_id, text, parse_mode=""):
+    """Кладём сообщение в очередь. Вызывать в той же транзакции, что и изменения, о которых оно сообщает."""
+    return TelegramOutbox.objects.create(chat_id=str(chat_id), text=text, parse_mode=parse_mode)
+
+
+def format_new_order(order):
+    return (
+        f"🎉 *Новый заказ!*\n\n"
+        f"👤 *Пользователь*: {order.user.username}\n"
+        f"💰 *Сумма заказа*: {order.total_price} руб.\n"
+        f"📅 *Дата заказа*: {order.created_at.strftime('%d.%m.%Y %H:%M')}\n"
+        f"📍 *Адрес*: {order.delivery_address}\n"
+        f"📞 *Телефон*: {order.phone_number}\n"
+        f"⏰ *Время доставки*: {order.delivery_time}\n"
+        f"Дата доставки: {order.delivery_date}"
+    )
+
+
+def enqueue_new_order(order):
+    return enqueue(settings.ADMIN_CHAT_ID, format_new_order(order), parse_mode="Markdown")
+
+
+# Сколько номеров заказов перечислять в сводном сообщении о смене статуса
+DIGEST_MAX_IDS = 20
+
+
+def format_status_digest(groups):
+    """
+    Одно сообщение о смене статуса у многих заказов вместо сообщения на каждый заказ.
+
+    groups — [(название статуса, номера заказов, всего заказов)] (app/status_digest.py).
+    """
+    lines = ["📢 *Изменение статуса заказов*"]
+    for status_label, order_ids, total in groups:
+        listed = ", ".join(f"#{pk}" for pk in order_ids[:DIGEST_MAX_IDS])
+        more = total - min(len(order_ids), DIGEST_MAX_IDS)
+        lines.append(f"\n➡️ {status_label} — заказов: {total}\n{listed}{f' и ещё {more}' if more > 0 else ''}")
+    return "\n".join(lines)
+
+
+def backoff_delay(attempts):
+    """Экспоненциальная задержка перед попыткой attempts + 1, с небольшим разбросом."""
+    delay = min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+    return delay + random.uniform(0, delay * 0.1)
+
+
+def claim_batch(batch_size, lease=LEASE):
+    """
+    Забираем пачку готовых к отправке сообщений и продлеваем их аренду на lease.
+
+    Срок аренды (next_attempt_at) остаётся у сообщений в памяти и служит меткой владельца:
+    mark_sent, mark_failed и postpone меняют строку, только пока аренда принадлежит этому воркеру.
+    """
+    current = now()
+    lease_until = current + lease
+    with transaction.atomic():
+        messages = list(
+            TelegramOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', next_attempt_at__lte=current)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if messages:
+            TelegramOutbox.objects.filter(pk__in=[message.pk for message in messages]).update(
+                next_attempt_at=lease_until
+            )
+    for message in messages:
+        message.next_attempt_at = lease_until
+    return messages
+
+
+def _leased(message):
+    """Строка сообщения, если аренда всё ещё у этого воркера (никто не перехватил её после истечения)."""
+    return TelegramOutbox.objects.filter(pk=message.pk, status='PENDING', next_attempt_at=message.next_attempt_at)
+
+
+def renew_lease(message, lease=LEASE):
+    """Продлеваем аренду перед отправкой; False — аренда истекла и сообщение забрал другой воркер."""
+    lease_until = now() + lease
+    if not _leased(message).update(next_attempt_at=lease_until):
+        return False
+    message.next_attempt_at = lease_until
+    return True
+
+
+def mark_sent(message):
+    return bool(_leased(message).update(
+        status='SENT', sent_at=now(), attempts=F('attempts') + 1, last_error=''
+    ))
+
+
+def mark_failed(message, error, permanent=False):
+    """Неудачная попытка: планируем повтор с backoff или сдаёмся после MAX_ATTEMPTS."""
+    attempts = message.attempts + 1
+    if permanent or attempts >= MAX_ATTEMPTS:
+        if _leased(message).update(status='FAILED', attempts=attempts, last_error=error):
+            logger.error("Сообщение Telegram #%s не доставлено: %s", message.pk, error)
+        return
+    _leased(message).update(
+        attempts=attempts,
+        last_error=error,
+        next_attempt_at=now() + timedelta(seconds=backoff_delay(attempts)),
+    )
+
+
+def postpone(messages, seconds):
+    """Откладываем сообщения без учёта попытки (Telegram попросил подождать)."""
+    until = now() + timedelta(seconds=seconds)
+    for message in messages:
+        _leased(message).update(next_attempt_at=until)
+
+
+class RateLimiter:
+    """
+    Ограничитель в духе лимитов Bot API: не более ~30 сообщений в секунду всего,
+    не чаще раза в секунду в личный чат и раза в три секунды в группу.
+    """
+
+    def __init__(self, per_second=30, chat_interval=1.0, group_interval=3.0, clock=time.monotonic):
+        self.global_interval = 1.0 / per_second
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.clock = clock
+        self._next_global = 0.0
+        self._next_chat = {}
+        self._paused_until = 0.0
+
+    def _interval(self, chat_id):
+        return self.group_interval if str(chat_id).startswith('-') else self.chat_interval
+
+    def delay(self, chat_id):
+        ready = max(self._next_global, self._next_chat.get(chat_id, 0.0), self._paused_until)
+        return max(ready - self.clock(), 0.0)
+
+    async def wait(self, chat_id):
+        delay = self.delay(chat_id)
+        if delay:
+            await asyncio.sleep(delay)
+        current = self.clock()
+        self._next_global = current + self.global_interval
+        self._next_chat[chat_id] = current + self._interval(chat_id)
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, self.clock() + seconds)
+
+
+class OutboxDispatcher:
+    """Разбирает очередь TelegramOutbox пачками; запускается командой run_telegram_outbox."""
+
+    def __init__(self, bot, batch_size=50, limiter=None, before_drain=None):
+        self.bot = bot
+        self.batch_size = batch_size
+        self.limiter = limiter or RateLimiter()
+        # Синхронная функция, которая пополняет очередь перед пачкой (сводки статусов — app/status_digest.py)
+        self.before_drain = before_drain
+        # Почти все сообщения идут в один чат: пачка рассылается не быстрее batch_size интервалов чата
+        interval = max(self.limiter.chat_interval, self.limiter.group_interval)
+        self.lease = LEASE + timedelta(seconds=batch_size * interval)
+
+    async def drain_once(self):
+        """Отправляем одну пачку; возвращаем число взятых из очереди сообщений."""
+        # aiogram нужен только воркеру — не тянем его в веб-процесс при импорте модуля
+        from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+        if self.before_drain is not None:
+            try:
+                await sync_to_async(self.before_drain)()
+            except DatabaseError as e:
+                # Например, «database is locked» на SQLite: очередь разбираем, повторим на следующей пачке
+                logger.warning("Ошибка подготовки сообщений перед пачкой: %s", e)
+        messages = await sync_to_async(claim_batch)(self.batch_size, self.lease)
+        for index, message in enumerate(messages):
+            await self.limiter.wait(message.chat_id)
+            if not await sync_to_async(renew_lease)(message):
+                logger.warning("Аренда сообщения Telegram #%s истекла, его отправит другой воркер.", message.pk)
+                continue
+            try:
+                await self.bot.send_message(message.chat_id, message.text, parse_mode=message.parse_mode or None)
+            except TelegramRetryAfter as e:
+                logger.warning("Telegram просит подождать %s с.", e.retry_after)
+                self.limiter.pause(e.retry_after)
+                await sync_to_async(postpone)(messages[index:], e.retry_after)
+                break
+            except (TelegramBadRequest, TelegramForbiddenError) as e:
+                await sync_to_async(mark_failed)(message, str(e), permanent=True)
+            except Exception as e:
+                logger.warning("Ошибка отправки сообщения Telegram #%s: %s", message.pk, e)
+                await sync_to_async(mark_failed)(message, str(e))
+            else:
+                await sync_to_async(mark_sent)(message)
+        return len(messages)
+
+    async def run_forever(self, poll_interval=1.0):
+        while True:
+            taken = await self.drain_once()
+            if taken < self.batch_size:
+                await asyncio.sleep(poll_interval)
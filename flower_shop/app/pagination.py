@@ -0,0 +1,128 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+
+def encode_cursor(values):
+    """Упаковываем значения ключа сортировки последней строки в непрозрачный курсор."""
+    raw = json.dumps([str(value) if value is not None else None for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size, fields=None):
+    """
+    Распаковываем курсор; при любой ошибке возвращаем None (начинаем с первой страницы).
+
+    fields — поля модели ключа сортировки: значения приводятся их to_python(), поэтому курсор
+    с подделанными значениями («abc» вместо цены или даты, null) тоже даёт первую страницу.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    if fields is not None:
+        if None in values:
+            return None
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            return None
+    return values
+
+
+def keyset_filter(ordering, values):
+    """
+    Строим условие «строго после» для составного ключа сортировки.
+
+    Для ordering=('price', 'id') и values=(p, i) получаем
+    (price > p) OR (price = p AND id > i); для полей с «-» сравнение меняется на «<».
+    Дополнительно ставим границу price >= p: не каждая СУБД выводит диапазон индекса из OR,
+    а с ней глубокие страницы начинаются сразу с нужного места индекса.
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    if len(ordering) > 1:
+        first = ordering[0]
+        condition &= Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": values[0]})
+    return condition
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=20):
+    """
+    Возвращаем одну страницу queryset по ключу ordering (последнее поле должно быть уникальным).
+
+    Запрашиваем page_size + 1 строк, чтобы узнать, есть ли следующая страница,
+    не выполняя COUNT(*). Результат: (items, next_cursor); next_cursor = None на последней странице.
+    """
+    items = list(_page_queryset(queryset, ordering, cursor, page_size))
+    return _split_page(items, ordering, page_size)
+
+
+async def akeyset_page(queryset, ordering, cursor=None, page_size=20):
+    """То же, что keyset_page, для async-представлений (асинхронная итерация ORM)."""
+    items = [item async for item in _page_queryset(queryset, ordering, cursor, page_size)]
+    return _split_page(items, ordering, page_size)
+
+
+def _page_queryset(queryset, ordering, cursor, page_size):
+    queryset = queryset.order_by(*ordering)
+    fields = [queryset.model._meta.get_field(field.lstrip("-")) for field in ordering]
+    values = decode_cursor(cursor, len(ordering), fields)
+    if values is not None:
+        queryset = queryset.filter(keyset_filter(ordering, values))
+    return queryset[:page_size + 1]
+
+
+def _split_page(items, ordering, page_size):
+    has_next = len(items) > page_size
+    items = items[:page_size]
+
+    next_cursor = None
+    if has_next and items:
+        last = items[-1]
+        next_cursor = encode_cursor([_key_value(last, field.lstrip("-")) for field in ordering])
+    return items, next_cursor
+
+
+def _key_value(item, name):
+    if isinstance(item, dict):
+        return item[name]
+    return getattr(item, name)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списков админки для больших таблиц: точный COUNT(*) не выполняется.
+
+    Число строк считается с ограничением — COUNT по подзапросу с LIMIT count_limit + 1, — поэтому
+    с любым фильтром читается не больше count_limit + 1 строк индекса. Если строк больше, для списка
+    без фильтров берётся оценка MAX(id) (один поиск по первичному ключу), иначе — сам предел:
+    страниц показывается столько, сколько укладывается в count_limit строк.
+    """
+
+    count_limit = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        capped = queryset.order_by()[:self.count_limit + 1].count()
+        if capped <= self.count_limit:
+            return capped
+        if not queryset.query.where:
+            return max(queryset.aggregate(estimate=Max('pk'))['estimate'] or 0, self.count_limit)
+        return self.count_limit
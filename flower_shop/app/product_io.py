@@ -0,0 +1,290 @@
+import csv
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from io import BytesIO
+from itertools import islice
+from pathlib import Path
+from urllib.request import urlopen
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.timezone import now
+
+from . import search, thumbnails
+from .models import Product
+
+# Массовый импорт и выгрузка товаров (команды import_products / export_products).
+# Строки читаются и пишутся потоком, пачками по CHUNK_SIZE: память не зависит от размера файла.
+COLUMNS = ('sku', 'name', 'price', 'available', 'stock', 'description', 'image')
+CHUNK_SIZE = 1000
+IMAGE_DIR = "products"
+IMAGE_TIMEOUT = 15
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+IMAGE_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+MAX_REPORTED_ERRORS = 50
+
+_TRUE = {'1', 'true', 'yes', 'да', 'y'}
+_FALSE = {'0', 'false', 'no', 'нет', 'n'}
+
+
+class ImportRowError(ValueError):
+    """Строка файла не прошла проверку; импорт пропускает её и продолжает."""
+
+
+# --- Чтение ---
+
+def detect_format(path):
+    return 'jsonl' if Path(path).suffix.lower() in ('.jsonl', '.ndjson') else 'csv'
+
+
+def read_rows(file, fmt):
+    """(номер строки, словарь) из открытого файла CSV (с заголовком) или JSONL — потоком."""
+    if fmt == 'jsonl':
+        for line_no, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_no, ImportRowError(f"некорректный JSON: {exc}")
+                continue
+            yield line_no, row if isinstance(row, dict) else ImportRowError("ожидался объект JSON")
+    else:
+        # Строка 1 — заголовок
+        for line_no, row in enumerate(csv.DictReader(file), 2):
+            yield line_no, row
+
+
+def parse_row(raw):
+    """
+    Проверяем и приводим типы. Возвращает {поле: значение} только для колонок, которые есть в строке:
+    отсутствующие колонки у существующего товара не меняются, у нового берутся значения по умолчанию.
+    """
+    if isinstance(raw, Exception):
+        raise raw
+    raw = {key.strip().lower(): value for key, value in raw.items() if key and key.strip().lower() in COLUMNS}
+    row = {}
+    sku = str(raw.get('sku') or '').strip()
+    if not sku or len(sku) > 64:
+        raise ImportRowError("нужен SKU длиной до 64 символов")
+    row['sku'] = sku
+    name = str(raw.get('name') or '').strip()
+    if not name or len(name) > 255:
+        raise ImportRowError("нужно название длиной до 255 символов")
+    row['name'] = name
+    try:
+        price = Decimal(str(raw.get('price')).strip().replace(',', '.'))
+    except (InvalidOperation, AttributeError):
+        raise ImportRowError(f"некорректная цена: {raw.get('price')!r}")
+    if not price.is_finite() or price < 0 or price >= Decimal('1e8'):
+        raise ImportRowError(f"некорректная цена: {raw.get('price')!r}")
+    row['price'] = price.quantize(Decimal('0.01'))
+
+    if raw.get('available') not in (None, ''):
+        value = raw['available']
+        if isinstance(value, bool):
+            row['available'] = value
+        elif str(value).strip().lower() in _TRUE | _FALSE:
+            row['available'] = str(value).strip().lower() in _TRUE
+        else:
+            raise ImportRowError(f"некорректный признак наличия: {value!r}")
+    if raw.get('stock') not in (None, ''):
+        try:
+            row['stock'] = int(raw['stock'])
+        except (TypeError, ValueError):
+            raise ImportRowError(f"некорректный остаток: {raw['stock']!r}")
+        if row['stock'] < 0:
+            raise ImportRowError("остаток не может быть отрицательным")
+    if 'description' in raw:
+        row['description'] = str(raw['description'] or '')
+    if raw.get('image'):
+        row['image'] = str(raw['image']).strip()
+    return row
+
+
+# --- Картинки ---
+
+def fetch_image(source, images_dir=None):
+    """
+    Скачиваем (http/https) или читаем с диска (путь относительно images_dir) картинку, проверяем её
+    Pillow и сохраняем в хранилище под именем из хеша содержимого. Возвращает имя файла в хранилище.
+
+    Одинаковые картинки у разных товаров и при повторном импорте сохраняются один раз. Имя файла,
+    который уже есть в хранилище (так картинки записывает export_products), используется как есть.
+    Локальные пути — только относительные и без «..»: файл не может оказаться вне images_dir.
+    """
+    if source.startswith(('http://', 'https://')):
+        with urlopen(source, timeout=IMAGE_TIMEOUT) as response:
+            data = response.read(MAX_IMAGE_BYTES + 1)
+    else:
+        path = Path(source)
+        if path.is_absolute() or '..' in path.parts:
+            raise ImportRowError(f"путь к картинке должен быть относительным и без «..»: {source}")
+        if default_storage.exists(source):
+            return source
+        with open(Path(images_dir or '.') / path, 'rb') as file:
+            data = file.read(MAX_IMAGE_BYTES + 1)
+    # Pillow нужен только при импорте картинок: модуль импортируют и выгрузка, и команды без картинок
+    from PIL import Image, UnidentifiedImageError
+
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ImportRowError(f"картинка больше {MAX_IMAGE_BYTES // (1024 * 1024)} МБ: {source}")
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image_format = image.format
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise ImportRowError(f"файл не является картинкой: {source}")
+    if image_format not in IMAGE_EXTENSIONS:
+        raise ImportRowError(f"неподдерживаемый формат картинки {image_format}: {source}")
+    name = f"{IMAGE_DIR}/{hashlib.sha256(data).hexdigest()[:16]}.{IMAGE_EXTENSIONS[image_format]}"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    return name
+
+
+# --- Импорт ---
+
+def import_products(rows, chunk_size=CHUNK_SIZE, dry_run=False, images=True, images_dir=None,
+                    workers=8, progress=None):
+    """
+    Создаём и обновляем товары по SKU пачками: один SELECT, один bulk_create и один bulk_update на пачку.
+
+    rows — итератор (номер строки, словарь) из read_rows. Картинки скачиваются пулом из workers потоков
+    параллельно внутри пачки; превью для новых картинок строятся как обычно (thumbnails.schedule).
+    bulk-операции не вызывают сигналы Product, поэтому поисковый индекс и версии фрагментов
+    обновляются здесь явно. При dry_run строки только проверяются: в БД и хранилище ничего не пишется,
+    картинки не скачиваются.
+
+    Возвращает статистику {'rows', 'created', 'updated', 'unchanged', 'errors', 'error_messages'};
+    progress(stats) вызывается после каждой пачки.
+    """
+    stats = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'errors': 0, 'error_messages': []}
+    rows = iter(rows)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import-images") as pool:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            _import_chunk(chunk, stats, dry_run, pool if images and not dry_run else None, images_dir)
+            if progress is not None:
+                progress(stats)
+    return stats
+
+
+def _error(stats, line_no, message):
+    stats['errors'] += 1
+    if len(stats['error_messages']) < MAX_REPORTED_ERRORS:
+        stats['error_messages'].append(f"строка {line_no}: {message}")
+
+
+def _import_chunk(chunk, stats, dry_run, pool, images_dir):
+    parsed = {}
+    for line_no, raw in chunk:
+        stats['rows'] += 1
+        try:
+            row = parse_row(raw)
+        except ImportRowError as exc:
+            _error(stats, line_no, exc)
+            continue
+        # Повтор SKU внутри пачки: побеждает последняя строка
+        parsed[row['sku']] = (line_no, row)
+
+    # Картинки одной пачки качаются параллельно; одинаковые источники — один раз
+    fetched = {}
+    if pool is not None:
+        sources = {row['image'] for _, row in parsed.values() if 'image' in row}
+        futures = {source: pool.submit(fetch_image, source, images_dir) for source in sources}
+        for source, future in futures.items():
+            try:
+                fetched[source] = future.result()
+            except (ImportRowError, OSError, ValueError) as exc:
+                fetched[source] = exc
+
+    existing = Product.objects.in_bulk(list(parsed), field_name='sku')
+    to_create, to_update, fields = [], [], set()
+    reindex, new_images = [], []
+    for sku, (line_no, row) in parsed.items():
+        product = existing.get(sku)
+        created = product is None
+        if created:
+            product = Product(sku=sku)
+        changed = set()
+        for field, value in row.items():
+            if field == 'image':
+                continue
+            if getattr(product, field) != value:
+                setattr(product, field, value)
+                changed.add(field)
+        image = fetched.get(row.get('image'))
+        if isinstance(image, Exception):
+            # Товар всё равно импортируем, картинка остаётся прежней
+            _error(stats, line_no, f"картинка {row['image']}: {image}")
+        elif image is not None and product.image.name != image:
+            product.image = image
+            changed.add('image')
+            new_images.append(product)
+
+        if created:
+            to_create.append(product)
+        elif changed:
+            to_update.append(product)
+            fields |= changed
+        else:
+            stats['unchanged'] += 1
+            continue
+        if created or changed & {'name', 'description'}:
+            reindex.append(product)
+
+    stats['created'] += len(to_create)
+    stats['updated'] += len(to_update)
+    if dry_run or not (to_create or to_update):
+        return
+
+    with transaction.atomic():
+        Product.objects.bulk_create(to_create)
+        if to_create and to_create[0].pk is None:
+            # СУБД без RETURNING в bulk INSERT — id новых товаров дочитываем по SKU
+            ids = dict(Product.objects.filter(sku__in=[p.sku for p in to_create]).values_list('sku', 'pk'))
+            for product in to_create:
+                product.pk = ids[product.sku]
+        if to_update:
+            # bulk_update не вызывает save(): updated_at (версию фрагментов товара) ставим сами
+            updated_at = now()
+            for product in to_update:
+                product.updated_at = updated_at
+            Product.objects.bulk_update(to_update, sorted(fields | {'updated_at'}))
+        search.index_rows([(product.pk, product.name, product.description) for product in reindex])
+        for product in new_images:
+            thumbnails.schedule(product.pk)
+
+
+# --- Выгрузка ---
+
+def export_rows(chunk_size=CHUNK_SIZE):
+    """Товары по id потоком (iterator без кэширования queryset) — кортежи в порядке COLUMNS."""
+    return Product.objects.order_by('pk').values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+
+
+def write_csv(rows, file):
+    """Пишет строки export_rows в CSV с заголовком; возвращает число строк."""
+    writer = csv.writer(file)
+    writer.writerow(COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(['' if value is None else int(value) if isinstance(value, bool) else value for value in row])
+        count += 1
+    return count
+
+
+def write_jsonl(rows, file):
+    count = 0
+    for row in rows:
+        record = dict(zip(COLUMNS, row))
+        record['price'] = str(record['price'])
+        file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
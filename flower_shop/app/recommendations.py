@@ -0,0 +1,176 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+from itertools import groupby, permutations
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .models import Order, OrderItem, Product, ProductCoPurchase, RecommendationIndexState
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS_COUNT = getattr(settings, "RECOMMENDATIONS_COUNT", 4)
+RECOMMENDATIONS_TIMEOUT = 60 * 60 * 24
+# Заказ попадает в индекс, только когда он старше SETTLE_SECONDS: транзакция оформления к этому
+# времени уже закоммичена, и заказ с более ранним created_at не проскочит мимо водяного знака
+SETTLE_SECONDS = getattr(settings, "RECOMMENDATIONS_SETTLE_SECONDS", 300)
+
+
+def _index_version():
+    # Версию берём из БД, а не из кэша: LocMemCache у каждого процесса свой, а перестройку
+    # индекса запускает отдельный процесс (manage.py rebuild_recommendations)
+    updated_at = RecommendationIndexState.objects.filter(pk=1).values_list('updated_at', flat=True).first()
+    return int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+
+
+async def _aindex_version():
+    updated_at = await RecommendationIndexState.objects.filter(pk=1).values_list('updated_at', flat=True).afirst()
+    return int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+
+
+def _neighbours_key(version, product_id, limit):
+    return f"recommendations:{version}:{product_id}:{limit}"
+
+
+def _neighbours_query(product_id, limit):
+    return (
+        ProductCoPurchase.objects
+        .filter(product_id=product_id)
+        .order_by('-count', 'related_product_id')
+        .values_list('related_product_id', flat=True)[:limit]
+    )
+
+
+def top_neighbours(product_id, limit=RECOMMENDATIONS_COUNT):
+    """
+    id товаров, чаще всего покупаемых вместе с product_id, по убыванию частоты.
+
+    Список кэшируется до следующей записи в индекс: в горячем пути это чтение версии индекса
+    по первичному ключу и один get из кэша; при промахе — ещё индексный запрос к ProductCoPurchase.
+    """
+    key = _neighbours_key(_index_version(), product_id, limit)
+    neighbours = cache.get(key)
+    if neighbours is None:
+        neighbours = list(_neighbours_query(product_id, limit))
+        cache.set(key, neighbours, RECOMMENDATIONS_TIMEOUT)
+    return neighbours
+
+
+def recommended_products(product_id, limit=RECOMMENDATIONS_COUNT):
+    """Доступные рекомендованные товары одной пакетной выборкой, в порядке ранга."""
+    neighbours = top_neighbours(product_id, limit)
+    if not neighbours:
+        return []
+    products = Product.objects.available().in_bulk(neighbours)
+    return [products[pk] for pk in neighbours if pk in products]
+
+
+async def arecommended_products(product_id, limit=RECOMMENDATIONS_COUNT):
+    """То же, что recommended_products, для async-представлений."""
+    key = _neighbours_key(await _aindex_version(), product_id, limit)
+    neighbours = await cache.aget(key)
+    if neighbours is None:
+        neighbours = [pk async for pk in _neighbours_query(product_id, limit)]
+        await cache.aset(key, neighbours, RECOMMENDATIONS_TIMEOUT)
+    if not neighbours:
+        return []
+    products = await Product.objects.available().ain_bulk(neighbours)
+    return [products[pk] for pk in neighbours if pk in products]
+
+
+def _count_pairs(rows):
+    """rows — (order_id, product_id), отсортированные по order_id; считаем пары внутри каждого заказа."""
+    pairs = Counter()
+    for _, group in groupby(rows, key=lambda row: row[0]):
+        products = {product_id for _, product_id in group}
+        pairs.update(permutations(products, 2))
+    return pairs
+
+
+def _apply_pairs(pairs):
+    """Прибавляем счётчики пар: одна выборка существующих строк и один bulk upsert."""
+    if not pairs:
+        return
+    products = {product_id for product_id, _ in pairs}
+    existing = {
+        (row.product_id, row.related_product_id): row.count
+        for row in ProductCoPurchase.objects.filter(product_id__in=products, related_product_id__in=products)
+    }
+    ProductCoPurchase.objects.bulk_create(
+        [
+            ProductCoPurchase(product_id=a, related_product_id=b, count=existing.get((a, b), 0) + delta)
+            for (a, b), delta in pairs.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['product', 'related_product'],
+        update_fields=['count'],
+        batch_size=1000,
+    )
+
+
+def _after_watermark(state):
+    if state.last_created_at is None:
+        return Q()
+    return Q(created_at__gt=state.last_created_at) | Q(created_at=state.last_created_at, id__gt=state.last_order_id)
+
+
+def update_index(full=False, batch_size=1000):
+    """
+    Инкрементально добавляем в индекс заказы, появившиеся после водяного знака (created_at, id).
+
+    Учитываются только заказы старше SETTLE_SECONDS, так что поздно закоммиченный заказ
+    не окажется позади водяного знака. full=True (или флаг dirty после правки уже учтённых заказов)
+    очищает таблицу и пересчитывает всё с нуля. Каждая пачка заказов обрабатывается в своей
+    транзакции вместе со сдвигом водяного знака, поэтому прерванную перестройку можно просто
+    запустить снова. Возвращает число учтённых заказов.
+    """
+    processed = 0
+    cutoff = now() - timedelta(seconds=SETTLE_SECONDS)
+    with transaction.atomic():
+        state, _ = RecommendationIndexState.objects.select_for_update().get_or_create(pk=1)
+        if full or state.dirty:
+            ProductCoPurchase.objects.all().delete()
+            state.last_created_at, state.last_order_id, state.dirty = None, 0, False
+            state.save(update_fields=['last_created_at', 'last_order_id', 'dirty', 'updated_at'])
+
+    while True:
+        with transaction.atomic():
+            state = RecommendationIndexState.objects.select_for_update().get(pk=1)
+            orders = list(
+                Order.objects.filter(_after_watermark(state), created_at__lte=cutoff)
+                .order_by('created_at', 'id')
+                .values_list('created_at', 'id')[:batch_size]
+            )
+            if not orders:
+                break
+            rows = (
+                OrderItem.objects
+                .filter(order_id__in=[pk for _, pk in orders])
+                .order_by('order_id')
+                .values_list('order_id', 'product_id')
+            )
+            _apply_pairs(_count_pairs(rows.iterator(chunk_size=5000)))
+            state.last_created_at, state.last_order_id = orders[-1]
+            state.save(update_fields=['last_created_at', 'last_order_id', 'updated_at'])
+            processed += len(orders)
+            logger.debug("Рекомендации: учтены заказы до #%s", state.last_order_id)
+
+    return processed
+
+
+def mark_order_changed(order):
+    """
+    Состав уже учтённого заказа изменился: помечаем индекс для полной перестройки.
+
+    Счётчики пар аддитивны, поэтому правку нельзя дописать поверх; один UPDATE без лишнего чтения,
+    для ещё не учтённых заказов он ничего не меняет.
+    """
+    RecommendationIndexState.objects.filter(
+        Q(last_created_at__gt=order.created_at)
+        | Q(last_created_at=order.created_at, last_order_id__gte=order.pk),
+        pk=1,
+    ).update(dirty=True)
@@ -0,0 +1,203 @@
+import csv
+from decimal import Decimal
+from itertools import islice
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour, TruncWeek
+
+from .models import DailySalesRollup, Order, OrderItem, ProductDailyRollup
+from .rollups import day_bounds
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_COLUMNS = (
+    'order_id', 'created_at', 'status', 'username',
+    'product_id', 'product_name', 'quantity', 'price', 'subtotal',
+)
+
+
+def _period_range(start, end):
+    """Границы [start, end] по локальным суткам: начало первого и начало следующего за последним."""
+    return day_bounds(start)[0], day_bounds(end)[1]
+
+
+def sales_series(start, end, granularity='day'):
+    """
+    Выручка и число заказов по периодам между датами start и end включительно.
+
+    Дни и недели считаются по сводкам DailySalesRollup — O(дней) строк;
+    часы — агрегацией по Order в БД (TruncHour) с фильтром по диапазону created_at.
+    """
+    if granularity == 'hour':
+        since, until = _period_range(start, end)
+        rows = (
+            Order.objects.filter(created_at__gte=since, created_at__lt=until)
+            .annotate(period=TruncHour('created_at'))
+            .values('period')
+            .annotate(orders=Count('id'), revenue=Sum('total_price'))
+            .order_by('period')
+        )
+    else:
+        rows = DailySalesRollup.objects.filter(date__gte=start, date__lte=end)
+        rows = rows.annotate(period=TruncWeek('date')) if granularity == 'week' else rows.annotate(period=F('date'))
+        rows = (
+            rows.values('period')
+            .annotate(orders=Sum('order_count'), revenue=Sum('revenue'))
+            .filter(orders__gt=0)
+            .order_by('period')
+        )
+    return [
+        {
+            'period': row['period'].isoformat(),
+            'orders': row['orders'],
+            'revenue': _money(row['revenue']),
+            'average_basket': _average(row['revenue'], row['orders']),
+        }
+        for row in rows
+    ]
+
+
+def top_products(start, end, limit=10):
+    """Самые продаваемые товары за период по сводке ProductDailyRollup."""
+    return list(
+        ProductDailyRollup.objects.filter(date__gte=start, date__lte=end)
+        .values('product_id', 'product__name')
+        .annotate(sold=Sum('quantity'), sold_revenue=Sum('revenue'))
+        .filter(sold__gt=0)
+        .order_by('-sold_revenue', 'product_id')[:limit]
+    )
+
+
+def _money(value):
+    # SQLite возвращает суммы без фиксированного числа знаков — приводим к копейкам
+    return Decimal(value or 0).quantize(Decimal('0.01'))
+
+
+def _average(revenue, orders):
+    return _money(revenue / orders if orders else 0)
+
+
+def sales_report(start, end, granularity='day', top=10):
+    """Отчёт для analytics_api: ряд по периодам, итоги за диапазон и топ товаров."""
+    series = sales_series(start, end, granularity)
+    orders = sum(row['orders'] for row in series)
+    revenue = sum((row['revenue'] for row in series), Decimal('0'))
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'totals': {'orders': orders, 'revenue': _money(revenue), 'average_basket': _average(revenue, orders)},
+        'series': series,
+        'top_products': [
+            {
+                'id': row['product_id'],
+                'name': row['product__name'],
+                'quantity': row['sold'],
+                'revenue': _money(row['sold_revenue']),
+            }
+            for row in top_products(start, end, top)
+        ],
+    }
+
+
+def export_rows(start, end):
+    """
+    Строки соединения Order/OrderItem за период, потоком.
+
+    iterator() читает результат кусками по EXPORT_CHUNK_SIZE, не кэшируя queryset,
+    так что память не зависит от размера выгрузки.
+    """
+    since, until = _period_range(start, end)
+    return (
+        OrderItem.objects.filter(order__created_at__gte=since, order__created_at__lt=until)
+        .order_by('order__created_at', 'order_id', 'id')
+        .values_list(
+            'order_id', 'order__created_at', 'order__status', 'order__user__username',
+            'product_id', 'product__name', 'quantity', 'price',
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: write() просто возвращает строку, не накапливая её."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for order_id, created_at, status, username, product_id, name, quantity, price in rows:
+        yield writer.writerow([
+            order_id, created_at.isoformat(), status, username,
+            product_id, name, quantity, price, price * quantity,
+        ])
+
+
+class _ChunkSink:
+    """Приёмник для ParquetWriter: копит байты до очередного take()."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def stream_parquet(rows):
+    """
+    Parquet потоком: каждая пачка строк — отдельная row group, отдаётся клиенту сразу после записи.
+
+    Требует pyarrow (необязательная зависимость); без него бросает ImportError.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('order_id', pa.int64()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('status', pa.string()),
+        ('username', pa.string()),
+        ('product_id', pa.int64()),
+        ('product_name', pa.string()),
+        ('quantity', pa.int64()),
+        ('price', pa.decimal128(10, 2)),
+        ('subtotal', pa.decimal128(14, 2)),
+    ])
+
+    def generate():
+        sink = _ChunkSink()
+        with pq.ParquetWriter(sink, schema) as writer:
+            while True:
+                chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+                if not chunk:
+                    break
+                columns = list(zip(*chunk))
+                columns.append([price * quantity for quantity, price in zip(columns[6], columns[7])])
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                    schema=schema,
+                ))
+                yield sink.take()
+        yield sink.take()
+
+    return generate()
@@ -0,0 +1,236 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils.timezone import localdate, make_aware
+
+from .models import DailySalesRollup, Order, OrderItem, ProductDailyRollup, Review, ReviewRatingRollup
+
+RATING_SUMMARY_KEY = "reviews:rating_summary"
+RATING_SUMMARY_TIMEOUT = getattr(settings, "RATING_SUMMARY_TIMEOUT", 60 * 60 * 24)
+RATINGS = range(5, 0, -1)
+
+
+def _add(model, keys, deltas, rows):
+    """
+    Атомарно прибавляем дельты к строкам сводки одним оператором:
+    INSERT ... ON CONFLICT (keys) DO UPDATE SET f = f + excluded.f (SQLite 3.24+, PostgreSQL).
+
+    Параллельные заказы не теряют обновлений, а число запросов не зависит от числа строк.
+    Строки с одинаковым ключом предварительно складываются: один оператор не может
+    обновить одну и ту же строку дважды.
+    """
+    merged = defaultdict(lambda: [0] * len(deltas))
+    for row in rows:
+        totals = merged[tuple(row[key] for key in keys)]
+        for index, name in enumerate(deltas):
+            totals[index] += row[name]
+    if not merged:
+        return
+
+    meta = model._meta
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    fields = [meta.get_field(name) for name in (*keys, *deltas)]
+    columns = ", ".join(quote(field.column) for field in fields)
+    conflict = ", ".join(quote(meta.get_field(key).column) for key in keys)
+    updates = ", ".join(
+        f"{quote(meta.get_field(name).column)} = {table}.{quote(meta.get_field(name).column)} "
+        f"+ excluded.{quote(meta.get_field(name).column)}"
+        for name in deltas
+    )
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(fields)) + ")"] * len(merged))
+    params = []
+    for key, totals in merged.items():
+        for field, value in zip(fields, (*key, *totals)):
+            params.append(field.get_db_prep_value(value, connection))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) VALUES {placeholders} "
+            f"ON CONFLICT ({conflict}) DO UPDATE SET {updates}",
+            params,
+        )
+
+
+def _order_row(date, status, total_price, sign):
+    return {'date': date, 'status': status, 'order_count': sign, 'revenue': sign * total_price}
+
+
+def record_order(order, previous=None):
+    """
+    Учитываем создание или изменение заказа в DailySalesRollup.
+
+    previous — (date, status, total_price) до сохранения; смена статуса переносит заказ
+    из одной строки сводки в другую, изменение суммы корректирует выручку.
+    """
+    rows = [_order_row(localdate(order.created_at), order.status, order.total_price, 1)]
+    if previous is not None:
+        rows.append(_order_row(*previous, -1))
+    _add(DailySalesRollup, ('date', 'status'), ('order_count', 'revenue'), rows)
+
+
+def forget_order(order):
+    _add(DailySalesRollup, ('date', 'status'), ('order_count', 'revenue'),
+         [_order_row(localdate(order.created_at), order.status, order.total_price, -1)])
+
+
+def move_orders(queryset, status):
+    """
+    Переносим заказы queryset в строки сводки со статусом status — до массового UPDATE статуса,
+    который не вызывает сигналы. Один агрегирующий запрос по (день, текущий статус) и один upsert.
+    """
+    rows = []
+    for row in (
+        queryset.annotate(date=TruncDate('created_at'))
+        .values('date', 'status')
+        .annotate(orders=Count('id'), total=Sum('total_price'))
+        .order_by()
+    ):
+        rows.append({'date': row['date'], 'status': row['status'], 'order_count': -row['orders'],
+                     'revenue': -row['total']})
+        rows.append({'date': row['date'], 'status': status, 'order_count': row['orders'], 'revenue': row['total']})
+    _add(DailySalesRollup, ('date', 'status'), ('order_count', 'revenue'), rows)
+
+
+def record_items(date, items, sign=1):
+    """Учитываем позиции заказа (в т.ч. созданные bulk_create) в ProductDailyRollup."""
+    _add(ProductDailyRollup, ('date', 'product'), ('quantity', 'revenue'), [
+        {
+            'date': date,
+            'product': item.product_id,
+            'quantity': sign * item.quantity,
+            'revenue': sign * item.price * item.quantity,
+        }
+        for item in items
+    ])
+
+
+def day_bounds(date):
+    """[начало, конец) локальных суток date — для фильтра по индексу created_at вместо created_at__date."""
+    start = make_aware(datetime.combine(date, time.min))
+    return start, make_aware(datetime.combine(date + timedelta(days=1), time.min))
+
+
+def sales_summary(start=None, end=None):
+    """Число заказов и выручка по сводке за период [start, end] (обе границы включительно)."""
+    queryset = DailySalesRollup.objects.all()
+    if start is not None:
+        queryset = queryset.filter(date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(date__lte=end)
+    totals = queryset.aggregate(orders=Sum('order_count'), revenue=Sum('revenue'))
+    return totals['orders'] or 0, totals['revenue'] or Decimal('0')
+
+
+def backfill(since=None):
+    """
+    Пересчитываем сводки с нуля (или начиная с даты since) агрегирующими запросами в БД.
+
+    Возвращает (число строк DailySalesRollup, число строк ProductDailyRollup).
+    """
+    orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    daily_rollups = DailySalesRollup.objects.all()
+    product_rollups = ProductDailyRollup.objects.all()
+    if since is not None:
+        start, _ = day_bounds(since)
+        orders = orders.filter(created_at__gte=start)
+        items = items.filter(order__created_at__gte=start)
+        daily_rollups = daily_rollups.filter(date__gte=since)
+        product_rollups = product_rollups.filter(date__gte=since)
+
+    with transaction.atomic():
+        daily_rollups.delete()
+        product_rollups.delete()
+        daily = DailySalesRollup.objects.bulk_create(
+            (
+                DailySalesRollup(**row)
+                for row in orders.annotate(date=TruncDate('created_at'))
+                .values('date', 'status')
+                .annotate(order_count=Count('id'), revenue=Sum('total_price'))
+                .order_by()
+                .iterator()
+            ),
+            batch_size=1000,
+        )
+        per_product = ProductDailyRollup.objects.bulk_create(
+            (
+                ProductDailyRollup(date=row['date'], product_id=row['product'],
+                                   quantity=row['sold'], revenue=row['sold_revenue'])
+                for row in items.annotate(date=TruncDate('order__created_at'))
+                .values('date', 'product')
+                .annotate(sold=Sum('quantity'), sold_revenue=Sum(F('price') * F('quantity')))
+                .order_by()
+                .iterator()
+            ),
+            batch_size=1000,
+        )
+    return len(daily), len(per_product)
+
+
+def record_review(rating, previous=None):
+    """Учитываем новый отзыв или смену оценки (previous — оценка до сохранения) в ReviewRatingRollup."""
+    rows = [{'rating': rating, 'review_count': 1}]
+    if previous is not None:
+        rows.append({'rating': previous, 'review_count': -1})
+    _add(ReviewRatingRollup, ('rating',), ('review_count',), rows)
+    invalidate_rating_summary()
+
+
+def forget_review(rating):
+    _add(ReviewRatingRollup, ('rating',), ('review_count',), [{'rating': rating, 'review_count': -1}])
+    invalidate_rating_summary()
+
+
+def invalidate_rating_summary():
+    # Как и сводку корзины, удаляем и сразу, и после коммита (см. cart.invalidate_summary)
+    cache.delete(RATING_SUMMARY_KEY)
+    transaction.on_commit(lambda: cache.delete(RATING_SUMMARY_KEY))
+
+
+def rating_summary():
+    """
+    Сводка рейтинга {'count', 'mean', 'histogram': [{'rating', 'count', 'percent'}, ...]} от 5 до 1.
+
+    Берётся из кэша; при промахе — один запрос к ReviewRatingRollup (не больше пяти строк),
+    поэтому главная и страница отзывов показывают её без агрегации по всем отзывам.
+    """
+    summary = cache.get(RATING_SUMMARY_KEY)
+    if summary is None:
+        counts = dict(ReviewRatingRollup.objects.filter(review_count__gt=0).values_list('rating', 'review_count'))
+        total = sum(counts.values())
+        summary = {
+            'count': total,
+            'mean': (
+                (Decimal(sum(rating * count for rating, count in counts.items())) / total).quantize(Decimal('0.01'))
+                if total else None
+            ),
+            'histogram': [
+                {
+                    'rating': rating,
+                    'count': counts.get(rating, 0),
+                    'percent': round(100 * counts.get(rating, 0) / total) if total else 0,
+                }
+                for rating in RATINGS
+            ],
+        }
+        cache.set(RATING_SUMMARY_KEY, summary, RATING_SUMMARY_TIMEOUT)
+    return summary
+
+
+def backfill_ratings():
+    """Пересчитываем ReviewRatingRollup по всем отзывам (после импорта или bulk_create в обход сигналов)."""
+    with transaction.atomic():
+        ReviewRatingRollup.objects.all().delete()
+        rows = ReviewRatingRollup.objects.bulk_create(
+            ReviewRatingRollup(rating=row['rating'], review_count=row['n'])
+            for row in Review.objects.values('rating').annotate(n=Count('id')).order_by()
+        )
+    invalidate_rating_summary()
+    return len(rows)
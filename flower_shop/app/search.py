@@ -0,0 +1,214 @@
+import re
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Product
+
+# Полнотекстовый индекс товаров: SQLite FTS5 (миграция 0011_product_search). В таблицу пишутся уже
+# стеммированные слова: русского стеммера в FTS5 нет, поэтому индекс ведём из Python (сигналы Product),
+# а не триггерами. На других СУБД поиск откатывается к icontains.
+FTS_TABLE = "app_product_fts"
+# Вес совпадения в названии относительно описания для BM25
+NAME_WEIGHT = 10.0
+MAX_QUERY_TERMS = 8
+# Последнее слово запроса ищем как префикс основы, если в нём не меньше стольких букв: короткий префикс
+# совпадает с большей частью каталога, а BM25 считается по каждому совпадению. Длины 3 и 4 покрыты
+# префиксным индексом FTS5 (prefix='3 4' в миграции)
+MIN_PREFIX = 3
+SEARCH_LIMIT = 48
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+# --- Стеммер: алгоритм Snowball для русского языка ---
+
+_VOWELS = "аеиоуыэюя"
+_PERFECTIVE_GERUND = (("в", "вши", "вшись"), ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"))
+_ADJECTIVE = (
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+_PARTICIPLE = (("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+_REFLEXIVE = ("ся", "сь")
+_VERB = (
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"),
+    (
+        "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым", "ен",
+        "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю",
+    ),
+)
+_NOUN = (
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой", "ий", "й",
+    "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я",
+)
+_DERIVATIONAL = ("ост", "ость")
+_SUPERLATIVE = ("ейш", "ейше")
+
+
+def _regions(word):
+    """Начала областей RV и R2 по правилам Snowball."""
+    rv = next((i + 1 for i, ch in enumerate(word) if ch in _VOWELS), len(word))
+
+    def after_consonant(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+                return i + 1
+        return len(word)
+
+    return rv, after_consonant(after_consonant(0))
+
+
+def _strip(word, start, groups):
+    """
+    Отрезаем самое длинное окончание из groups в word[start:]; None, если окончания нет.
+
+    groups — пары (окончания, нужно ли перед окончанием «а»/«я»), как в первой и второй группах Snowball.
+    """
+    region = word[start:]
+    best = None
+    for suffixes, after_a in groups:
+        for suffix in suffixes:
+            if region.endswith(suffix) and (best is None or len(suffix) > len(best[0])):
+                best = (suffix, after_a)
+    if best is None:
+        return None
+    stem = word[:-len(best[0])]
+    if best[1] and (len(stem) <= start or stem[-1] not in "ая"):
+        return None
+    return stem
+
+
+@lru_cache(maxsize=50_000)
+def stem(word):
+    """Основа русского слова (Snowball); слова на латинице и числа возвращаются как есть."""
+    word = word.lower().replace("ё", "е")
+    if not any("а" <= ch <= "я" for ch in word):
+        return word
+    rv, r2 = _regions(word)
+
+    stripped = _strip(word, rv, ((_PERFECTIVE_GERUND[0], True), (_PERFECTIVE_GERUND[1], False)))
+    if stripped is not None:
+        word = stripped
+    else:
+        word = _strip(word, rv, ((_REFLEXIVE, False),)) or word
+        stripped = _strip(word, rv, ((_ADJECTIVE, False),))
+        if stripped is not None:
+            word = _strip(stripped, rv, ((_PARTICIPLE[0], True), (_PARTICIPLE[1], False))) or stripped
+        else:
+            stripped = _strip(word, rv, ((_VERB[0], True), (_VERB[1], False)))
+            if stripped is None:
+                stripped = _strip(word, rv, ((_NOUN, False),))
+            if stripped is not None:
+                word = stripped
+
+    if word[rv:].endswith("и"):
+        word = word[:-1]
+    word = _strip(word, r2, ((_DERIVATIONAL, False),)) or word
+
+    superlative = _strip(word, rv, ((_SUPERLATIVE, False),))
+    if superlative is not None:
+        word = superlative
+    if word[rv:].endswith("нн"):
+        word = word[:-1]
+    elif superlative is None and word[rv:].endswith("ь"):
+        word = word[:-1]
+    return word
+
+
+def terms(text):
+    """Основы слов текста в порядке появления."""
+    return [stem(word) for word in _WORD.findall(text or "")]
+
+
+# --- Индекс ---
+
+def is_enabled():
+    return connection.vendor == "sqlite"
+
+
+def index_product(product):
+    """Добавляем или обновляем товар в индексе (вызывается из сигнала post_save)."""
+    index_rows([(product.pk, product.name, product.description)])
+
+
+def index_rows(rows):
+    """Пакетно индексируем строки (id, name, description)."""
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)",
+            [(pk, " ".join(terms(name)), " ".join(terms(description))) for pk, name, description in rows],
+        )
+
+
+def remove_product(pk):
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+
+def rebuild(batch_size=2000):
+    """
+    Перестраиваем индекс по всем товарам. Нужен после bulk_create/update в обход сигналов
+    (импорт, бенчмарки). Возвращает число проиндексированных товаров.
+    """
+    if not is_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    count = 0
+    batch = []
+    for row in Product.objects.order_by("pk").values_list("pk", "name", "description").iterator(batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            index_rows(batch)
+            count += len(batch)
+            batch = []
+    index_rows(batch)
+    return count + len(batch)
+
+
+def _match_query(query):
+    """
+    Запрос FTS5: все слова обязательны. Основы полных слов ищутся точно, последнее слово — как префикс
+    («роз» найдёт «розы» и «розовый»), чтобы поиск работал по мере набора.
+    """
+    words = [word for word in terms(query)[:MAX_QUERY_TERMS] if word]
+    return " ".join(
+        f'"{word}"*' if i == len(words) - 1 and len(word) >= MIN_PREFIX else f'"{word}"'
+        for i, word in enumerate(words)
+    )
+
+
+def search_ids(query, limit=SEARCH_LIMIT, include_unavailable=False):
+    """id товаров по убыванию релевантности (BM25, совпадение в названии весит больше)."""
+    return [pk for pk, _ in search_rows(query, limit, include_unavailable)]
+
+
+def search_rows(query, limit=SEARCH_LIMIT, include_unavailable=False):
+    """
+    То же, что search_ids, но пары (id, updated_at): версии фрагментов карточек (app/fragments.py)
+    приходят тем же запросом, без второго обращения к таблице товаров.
+    """
+    match = _match_query(query)
+    if not match:
+        return []
+    if not is_enabled():
+        queryset = Product.objects.all() if include_unavailable else Product.objects.available()
+        for word in _WORD.findall(query)[:MAX_QUERY_TERMS]:
+            queryset = queryset.filter(Q(name__icontains=word) | Q(description__icontains=word))
+        return list(queryset.order_by("name", "id").values_list("pk", "updated_at")[:limit])
+
+    available = "" if include_unavailable else "AND p.available = 1"
+    # raw() вместо курсора: updated_at проходит через конвертеры поля, как в обычном queryset
+    products = Product.objects.raw(
+        f"SELECT p.id, p.updated_at FROM {FTS_TABLE} AS f JOIN app_product AS p ON p.id = f.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s {available} "
+        f"ORDER BY bm25({FTS_TABLE}, %s, 1.0), f.rowid LIMIT %s",
+        [match, NAME_WEIGHT, limit],
+    )
+    return [(product.pk, product.updated_at) for product in products]
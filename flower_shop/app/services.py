@@ -0,0 +1,126 @@
+import logging
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils.timezone import localdate
+
+from . import inventory, outbox, rollups
+from .cart import invalidate_summary
+from .models import CartItem, Order, OrderItem, order_status_changed
+
+logger = logging.getLogger(__name__)
+
+
+class EmptyCart(Exception):
+    """В корзине пользователя нет товаров."""
+
+
+def place_order(user, form):
+    """
+    Оформляем заказ из корзины пользователя одной транзакцией.
+
+    Корзина читается один раз (с товарами, с блокировкой строк корзины), остаток списывается
+    одним UPDATE, позиции заказа пишутся одним bulk_create, сводки продаж (app.rollups) — двумя
+    upsert, корзина удаляется одним DELETE,
+    уведомление для Telegram кладётся в outbox — число запросов не зависит от размера корзины.
+    При любой ошибке всё откатывается.
+    """
+    with transaction.atomic():
+        cart_items = list(
+            CartItem.objects.select_for_update(of=('self',))
+            .filter(user=user)
+            .select_related('product')
+        )
+        if not cart_items:
+            raise EmptyCart()
+
+        total_price = sum(item.subtotal() for item in cart_items)
+        logger.debug("Начало оформления заказа. Пользователь: %s, Всего товаров: %d, Общая сумма: %s",
+                     user.username, len(cart_items), total_price)
+
+        inventory.claim(cart_items)
+
+        order = form.save(commit=False)
+        order.user = user
+        order.total_price = total_price
+        order.save()
+
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=item.product, quantity=item.quantity, price=item.price)
+            for item in cart_items
+        ])
+        # bulk_create не шлёт сигналов — сводку по товарам обновляем сами, одним upsert
+        rollups.record_items(localdate(order.created_at), order_items)
+        CartItem.objects.filter(pk__in=[item.pk for item in cart_items]).delete()
+        # Уведомление попадает в очередь вместе с заказом и отправляется воркером run_telegram_outbox
+        outbox.enqueue_new_order(order)
+
+    logger.debug("Заказ сохранён. Заказ id: %s, позиций: %d", order.id, len(cart_items))
+    return order
+
+
+def reorder(user, order):
+    """
+    Кладём в корзину пользователя товары из прошлого заказа.
+
+    Позиции заказа читаются одним запросом вместе с товарами, текущая корзина — одним,
+    запись — один bulk upsert по уникальной паре (user, product). Количество в корзине
+    ограничивается тем, что реально можно продать: резерв позиции плюс свободный остаток.
+    Снятые с продажи товары пропускаются; цена берётся текущая.
+    Возвращает (число добавленных позиций, товары, которых досталось меньше, чем в заказе).
+    """
+    wanted = defaultdict(int)
+    products = {}
+    for item in order.order_items.select_related('product').filter(product__available=True):
+        wanted[item.product_id] += item.quantity
+        products[item.product_id] = item.product
+    if not wanted:
+        return 0, []
+
+    with transaction.atomic():
+        existing = {
+            product_id: (quantity, reserved)
+            for product_id, quantity, reserved in CartItem.objects.filter(user=user, product_id__in=wanted)
+            .values_list('product_id', 'quantity', 'reserved_quantity')
+        }
+        rows, short = [], []
+        for product_id, quantity in wanted.items():
+            product = products[product_id]
+            in_cart, reserved = existing.get(product_id, (0, 0))
+            target = min(in_cart + quantity, reserved + product.stock)
+            if target < in_cart + quantity:
+                short.append(product)
+            if target > in_cart:
+                rows.append(CartItem(user=user, product=product, price=product.price, quantity=target))
+        CartItem.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user', 'product'],
+            update_fields=['quantity'],
+        )
+        # bulk_create не шлёт post_save — сводку для бейджа сбрасываем сами
+        invalidate_summary(user.pk)
+    return len(rows), short
+
+
+def bulk_set_status(queryset, status):
+    """
+    Массовая смена статуса заказов (действия OrderAdmin) одним UPDATE.
+
+    Меняются только заказы, для которых переход допустим (Order.TRANSITIONS). Сводки продаж переносятся
+    одним upsert (UPDATE не вызывает сигналы), событие order_status_changed шлётся одно на всю пачку —
+    в Telegram оно попадёт общей сводкой (app/status_digest.py). Возвращает число изменённых заказов.
+    """
+    with transaction.atomic():
+        orders = Order.objects.filter(
+            pk__in=queryset.order_by().values('pk'), status__in=Order.statuses_leading_to(status),
+        )
+        order_ids = list(orders.order_by('pk').values_list('pk', flat=True)[:outbox.DIGEST_MAX_IDS])
+        if not order_ids:
+            return 0
+        rollups.move_orders(orders, status)
+        changed = orders.update(status=status)
+        order_status_changed.send(sender=Order, status=status, order_ids=order_ids, count=changed)
+    logger.info("Статус %s установлен у %d заказов", status, changed)
+    return changed
@@ -0,0 +1,132 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils.timezone import localdate
+
+from . import recommendations, rollups, search, status_digest, thumbnails
+from .cart import invalidate_summary
+from .models import CartItem, Order, OrderItem, Product, Review, order_status_changed
+
+
+@receiver(post_save, sender=Product)
+def generate_product_thumbnails(sender, instance, raw=False, **kwargs):
+    """Новая или заменённая картинка: превью строятся в фоне после коммита (app/thumbnails.py)."""
+    if not raw and instance.image and not instance.has_thumbnails:
+        thumbnails.schedule(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Поисковый индекс (app/search.py) обновляется, только если менялись название или описание."""
+    if raw or (update_fields is not None and not {'name', 'description'} & set(update_fields)):
+        return
+    search.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search(sender, instance, **kwargs):
+    search.remove_product(instance.pk)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def invalidate_cart_summary(sender, instance, **kwargs):
+    """Правки корзины в обход app.inventory (админка, shell) тоже сбрасывают сводку для бейджа."""
+    invalidate_summary(instance.user_id)
+
+
+# Сводки продаж поддерживаются при каждом сохранении/удалении заказа и позиции.
+# OrderItem, созданные через bulk_create (оформление заказа), учитываются явно в services.place_order.
+
+@receiver(pre_save, sender=Order)
+def remember_order_rollup(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if raw or instance._state.adding:
+        return
+    previous = Order.objects.filter(pk=instance.pk).values_list('created_at', 'status', 'total_price').first()
+    if previous is not None:
+        created_at, status, total_price = previous
+        instance._rollup_previous = (localdate(created_at), status, total_price)
+
+
+@receiver(post_save, sender=Order)
+def update_order_rollup(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    rollups.record_order(instance, None if created else getattr(instance, '_rollup_previous', None))
+
+
+@receiver(post_save, sender=Order)
+def emit_order_status_change(sender, instance, created, raw=False, **kwargs):
+    """Смена статуса одного заказа (админка, list_editable, Order.change_status) — событие для сводки."""
+    previous = None if created or raw else getattr(instance, '_rollup_previous', None)
+    if previous is not None and previous[1] != instance.status:
+        order_status_changed.send(sender=Order, status=instance.status, order_ids=[instance.pk], count=1)
+    instance._loaded_status = instance.status
+
+
+@receiver(order_status_changed, sender=Order)
+def collect_order_status_change(sender, status, order_ids, count, **kwargs):
+    status_digest.record(status, order_ids, count)
+
+
+@receiver(post_delete, sender=Order)
+def forget_order_rollup(sender, instance, **kwargs):
+    rollups.forget_order(instance)
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_item_rollup(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if raw or instance._state.adding:
+        return
+    instance._rollup_previous = OrderItem.objects.filter(pk=instance.pk).select_related('order').first()
+
+
+@receiver(post_save, sender=OrderItem)
+def update_item_rollup(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    rollups.record_items(localdate(instance.order.created_at), [instance])
+    previous = None if created else getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        rollups.record_items(localdate(previous.order.created_at), [previous], sign=-1)
+
+
+@receiver(pre_delete, sender=OrderItem)
+def forget_item_rollup(sender, instance, **kwargs):
+    rollups.record_items(localdate(instance.order.created_at), [instance], sign=-1)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def invalidate_copurchases(sender, instance, raw=False, **kwargs):
+    """Правка уже учтённого в рекомендациях заказа: индекс перестроится при следующем rebuild_recommendations."""
+    if raw:
+        return
+    recommendations.mark_order_changed(instance.order)
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None and previous.order_id != instance.order_id:
+        recommendations.mark_order_changed(previous.order)
+
+
+# Сводка оценок отзывов (rollups.rating_summary): гистограмма по ReviewRatingRollup
+
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if not raw and not instance._state.adding:
+        instance._rollup_previous = Review.objects.filter(pk=instance.pk).values_list('rating', flat=True).first()
+
+
+@receiver(post_save, sender=Review)
+def update_review_rating(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_rollup_previous', None)
+    if previous != instance.rating:
+        rollups.record_review(instance.rating, previous)
+
+
+@receiver(post_delete, sender=Review)
+def forget_review_rating(sender, instance, **kwargs):
+    rollups.forget_review(instance.rating)
@@ -0,0 +1,90 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils.timezone import now
+
+from . import outbox
+from .models import Order, OrderStatusEvent
+
+logger = logging.getLogger(__name__)
+
+# Сводка смен статусов заказов в Telegram. События копятся в OrderStatusEvent; первое событие в чате
+# открывает окно, через WINDOW секунд все накопленные за окно события уходят одним сообщением.
+# Так в чат уходит не больше одного сообщения о статусах за окно, сколько бы заказов ни поменялось.
+WINDOW = getattr(settings, "ORDER_STATUS_DIGEST_WINDOW", 30)  # секунды
+
+
+def record(status, order_ids, count, chat_id=None):
+    """Запоминаем смену статуса для ближайшей сводки. Вызывать в транзакции смены статуса."""
+    return OrderStatusEvent.objects.create(
+        chat_id=str(chat_id or settings.ADMIN_CHAT_ID),
+        status=status,
+        order_count=count,
+        order_ids=list(order_ids)[:outbox.DIGEST_MAX_IDS],
+    )
+
+
+def due_chats(current=None, window=None):
+    """Чаты, у которых окно сводки уже закрылось."""
+    cutoff = (current or now()) - timedelta(seconds=WINDOW if window is None else window)
+    return list(
+        OrderStatusEvent.objects.values('chat_id')
+        .annotate(first=Min('created_at'))
+        .filter(first__lte=cutoff)
+        .values_list('chat_id', flat=True)
+    )
+
+
+def flush(current=None, window=None):
+    """
+    Складываем накопленные события каждого чата с закрытым окном в одно сообщение outbox.
+
+    Вызывается диспетчером run_telegram_outbox перед каждой пачкой. Возвращает число сводок.
+    """
+    labels = dict(Order.STATUS_CHOICES)
+    digests = 0
+    for chat_id in due_chats(current, window):
+        with transaction.atomic():
+            events = _take_events(chat_id)
+            if not events:
+                # События этого чата уже забрал другой воркер
+                continue
+            # {статус: [номера заказов, число заказов]} в порядке первой смены
+            groups = {}
+            for status, order_count, order_ids in events:
+                group = groups.setdefault(status, [[], 0])
+                for pk in order_ids:
+                    if pk not in group[0] and len(group[0]) < outbox.DIGEST_MAX_IDS:
+                        group[0].append(pk)
+                group[1] += order_count
+            outbox.enqueue(
+                chat_id,
+                outbox.format_status_digest(
+                    [(labels.get(status, status), ids, total) for status, (ids, total) in groups.items()]
+                ),
+                parse_mode="Markdown",
+            )
+        digests += 1
+        logger.info("Сводка статусов для чата %s: событий %d", chat_id, len(events))
+    return digests
+
+
+def _take_events(chat_id):
+    """
+    Забираем события чата одной командой DELETE ... RETURNING (SQLite 3.35+, PostgreSQL).
+
+    select_for_update на SQLite ничего не блокирует, а удаление с возвратом строк атомарно: из двух
+    воркеров строки получит только один, второй — пустой список. Удаление откатится вместе с транзакцией,
+    если сообщение в outbox записать не удалось. Возвращает [(status, order_count, order_ids)] по порядку.
+    """
+    table = connection.ops.quote_name(OrderStatusEvent._meta.db_table)
+    order_ids = OrderStatusEvent._meta.get_field('order_ids')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE chat_id = %s RETURNING id, status, order_count, order_ids", [chat_id]
+        )
+        rows = sorted(cursor.fetchall())
+    return [(status, count, order_ids.from_db_value(ids, None, connection)) for _, status, count, ids in rows]
@@ -3,7 +3,6 @@ import sys
 import logging
 import asyncio
 import django
-from datetime import datetime
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import (
@@ -15,29 +14,31 @@ from aiogram.types import (
     FSInputFile,
 )
 from asgiref.sync import sync_to_async
+from django.apps import apps
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Django настраиваем только при запуске модуля как скрипта (python -m app.telegram_bot);
+# при импорте из проекта (manage.py run_telegram_bot, тесты) всё уже готово.
+if not apps.ready:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "flower_shop.settings")
+    django.setup()
 
+from django.conf import settings
+from django.utils.timezone import localdate
 
-# Настройка Django
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "flower_shop.settings")
-django.setup()
-
-from .models import Order, CartItem
-from django.db.models import Sum, Count
+from . import rollups, services
+from .models import Order
+from .notifications import client
 
 # Логирование
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Конфигурация
-BOT_TOKEN = "7871114248:AAHpOr0l7R53OPjhYmvrXFa4xuUdnlsE7rQ"
-ADMIN_CHAT_ID = "5285694652"
+# Конфигурация (токен и пул соединений — в общем клиенте app.notifications)
+ADMIN_CHAT_ID = getattr(settings, "ADMIN_CHAT_ID", "5285694652")
 
-# Инициализация бота и диспетчера
-from aiogram import Bot, Dispatcher
+# Инициализация диспетчера
+from aiogram import Dispatcher
 
-bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
 router = Router()
 dp.include_router(router)
@@ -56,46 +57,146 @@ async def start_command(message: Message):
 async def help_command(message: Message):
     await message.answer(
         "Доступные команды:\n"
-        "/order_status — Статусы заказов (админ)\n"
+        "/order_status [NEW|PROCESSING|COMPLETED|CANCELLED] — Статусы заказов (админ)\n"
         "/analytics — Аналитика заказов (админ)\n"
         "/test_order — Тестовый заказ (для проверки)"
     )
 
 # Команда /order_status
+ORDERS_PER_PAGE = 10
+# Лимит Telegram на текст сообщения; длинные поля заказа обрезаем, чтобы страница всегда в него влезала
+MESSAGE_LIMIT = 4096
+USERNAME_LIMIT = 32
+ADDRESS_LIMIT = 80
+
+STATUS_MAP = {
+    "NEW": "🟡 Новый",
+    "PROCESSING": "🔵 В обработке",
+    "COMPLETED": "✅ Завершён",
+    "CANCELLED": "❌ Отменён",
+}
+
+
+async def fetch_orders_page(status=None, direction="first", cursor=None, per_page=ORDERS_PER_PAGE):
+    """
+    Одна страница заказов по keyset-курсору на id (id растёт вместе с created_at).
+
+    direction: "first" — самые новые, "older" — старее заказа cursor, "newer" — новее него.
+    Строки читаются асинхронным итератором, в памяти не больше per_page + 1 заказов.
+    Возвращает (orders, has_newer, has_older); orders всегда от новых к старым.
+    """
+    queryset = Order.objects.select_related("user")
+    if status:
+        queryset = queryset.filter(status=status)
+    if direction == "newer" and cursor:
+        queryset = queryset.filter(id__gt=cursor).order_by("id")
+    elif direction == "older" and cursor:
+        queryset = queryset.filter(id__lt=cursor).order_by("-id")
+    else:
+        direction, cursor = "first", None
+        queryset = queryset.order_by("-id")
+
+    orders = [order async for order in queryset[:per_page + 1].aiterator(chunk_size=per_page + 1)]
+    has_more = len(orders) > per_page
+    orders = orders[:per_page]
+
+    if direction == "newer":
+        orders.reverse()
+        return orders, has_more, True
+    return orders, cursor is not None, has_more
+
+
+def _orders_callback(status, direction, cursor=0):
+    # callback_data ограничена 64 байтами — курсор держим как голый id
+    return f"orders:{status or 'ALL'}:{direction}:{cursor}"
+
+
+def _clip(value, limit):
+    return value if len(value) <= limit else value[:limit - 1] + "…"
+
+
+def render_orders_page(orders, status, has_newer, has_older):
+    """
+    Текст одной страницы и клавиатура: фильтры по статусу, навигация, повтор заказов.
+
+    Имя пользователя и адрес обрезаются до USERNAME_LIMIT и ADDRESS_LIMIT символов: страница из
+    ORDERS_PER_PAGE заказов занимает около 2500 символов и не упирается в MESSAGE_LIMIT.
+    """
+    title = STATUS_MAP.get(status, "Все заказы")
+    blocks = [
+        (
+            f"🛒 Заказ №{order.id} от {order.created_at.strftime('%d.%m.%Y %H:%M')}\n"
+            f"👤 Пользователь: {_clip(order.user.username, USERNAME_LIMIT)}\n"
+            f"💰 Сумма: {order.total_price} €\n"
+            f"📍 Адрес: {_clip(order.delivery_address, ADDRESS_LIMIT)}\n"
+            f"📊 Статус: {STATUS_MAP.get(order.status, 'Неизвестно')}"
+        )
+        for order in orders
+    ]
+    text = _clip(f"📋 {title}\n\n" + "\n\n".join(blocks), MESSAGE_LIMIT)
+
+    filters = [InlineKeyboardButton(text="Все", callback_data=_orders_callback(None, "first"))] + [
+        InlineKeyboardButton(text=label.split()[0], callback_data=_orders_callback(code, "first"))
+        for code, label in STATUS_MAP.items()
+    ]
+    navigation = []
+    if has_newer:
+        navigation.append(InlineKeyboardButton(
+            text="⬅️ Новее", callback_data=_orders_callback(status, "newer", orders[0].id)
+        ))
+    if has_older:
+        navigation.append(InlineKeyboardButton(
+            text="Старее ➡️", callback_data=_orders_callback(status, "older", orders[-1].id)
+        ))
+    repeat = [
+        InlineKeyboardButton(text=f"🔁 №{order.id}", callback_data=f"repeat_order:{order.id}")
+        for order in orders
+    ]
+    rows = [filters] + ([navigation] if navigation else []) + [repeat[i:i + 5] for i in range(0, len(repeat), 5)]
+    return text, InlineKeyboardMarkup(inline_keyboard=rows)
+
+
 @router.message(Command("order_status"))
 async def order_status_command(message: Message):
     if str(message.chat.id) != ADMIN_CHAT_ID:
         await message.answer("У вас нет доступа к этому функционалу.")
         return
 
-    orders = await sync_to_async(list)(
-        Order.objects.select_related("user").order_by("-created_at")
-    )
+    # /order_status NEW — фильтр по статусу
+    args = (message.text or "").split()[1:]
+    status = args[0].upper() if args and args[0].upper() in STATUS_MAP else None
+
+    orders, has_newer, has_older = await fetch_orders_page(status)
     if not orders:
         await message.answer("Нет заказов.")
         return
 
-    status_map = {
-        "NEW": "🟡 Новый",
-        "PROCESSING": "🔵 В обработке",
-        "COMPLETED": "✅ Завершён",
-        "CANCELLED": "❌ Отменён",
-    }
-
-    for order in orders:
-        text = (
-            f"🛒 Заказ №{order.id}\n"
-            f"👤 Пользователь: {order.user.username}\n"
-            f"💰 Сумма: {order.total_price} €\n"
-            f"📍 Адрес: {order.delivery_address}\n"
-            f"📊 Статус: {status_map.get(order.status, 'Неизвестно')}"
-        )
-        keyboard = InlineKeyboardMarkup(
-            inline_keyboard=[
-                [InlineKeyboardButton(text="Повторить заказ", callback_data=f"repeat_order:{order.id}")]
-            ]
-        )
-        await message.answer(text, reply_markup=keyboard)
+    text, keyboard = render_orders_page(orders, status, has_newer, has_older)
+    await message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(lambda callback: callback.data and callback.data.startswith("orders:"))
+async def orders_page_callback(callback: CallbackQuery):
+    if str(callback.message.chat.id) != ADMIN_CHAT_ID:
+        await callback.answer("У вас нет доступа к этому функционалу.", show_alert=True)
+        return
+    try:
+        _, status, direction, cursor = callback.data.split(":")
+        cursor = int(cursor)
+    except ValueError:
+        await callback.answer("Некорректный запрос.", show_alert=True)
+        return
+    status = status if status in STATUS_MAP else None
+
+    orders, has_newer, has_older = await fetch_orders_page(status, direction, cursor)
+    if not orders:
+        await callback.answer("Нет заказов.", show_alert=True)
+        return
+
+    text, keyboard = render_orders_page(orders, status, has_newer, has_older)
+    # Листаем, редактируя то же сообщение, — число сообщений не растёт
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
 
 # Команда /analytics
 @router.message(Command("analytics"))
@@ -104,13 +205,10 @@ async def analytics_command(message: Message):
         await message.answer("У вас нет доступа к этому функционалу.")
         return
 
-    today = datetime.now().date()
-    total_revenue = await sync_to_async(lambda: Order.objects.aggregate(Sum("total_price"))["total_price__sum"] or 0)()
-    total_orders = await sync_to_async(lambda: Order.objects.count())()
-    orders_today = await sync_to_async(lambda: list(Order.objects.filter(created_at__date=today)))()
-
-    total_revenue_today = sum(order.total_price for order in orders_today)
-    total_orders_today = len(orders_today)
+    # Итоги — из сводок продаж (по строке на день и статус), без агрегатов по всей таблице заказов
+    today = localdate()
+    total_orders, total_revenue = await sync_to_async(rollups.sales_summary)()
+    total_orders_today, total_revenue_today = await sync_to_async(rollups.sales_summary)(today, today)
 
     response = (
         f"📊 Аналитика:\n"
@@ -126,23 +224,16 @@ async def analytics_command(message: Message):
 async def repeat_order_callback(callback: CallbackQuery):
     try:
         order_id = int(callback.data.split(":")[1])
-        order = await sync_to_async(lambda: Order.objects.filter(id=order_id).first())()
+        order = await Order.objects.select_related("user").filter(id=order_id).afirst()
         if not order:
             await callback.answer("Заказ не найден.", show_alert=True)
             return
 
-        async def copy_order_to_cart():
-            for item in order.order_items.all():
-                cart_item, _ = CartItem.objects.get_or_create(
-                    user=order.user,
-                    product=item.product,
-                    defaults={"price": item.price, "quantity": item.quantity},
-                )
-                cart_item.quantity += item.quantity
-                cart_item.save()
-
-        await sync_to_async(copy_order_to_cart)()
-        await callback.answer("Товары добавлены в корзину.", show_alert=True)
+        added, short = await sync_to_async(services.reorder)(order.user, order)
+        text = "Товары добавлены в корзину." if added else "Нечего добавить: товаров нет в наличии."
+        if short:
+            text += " Не хватило на складе: " + ", ".join(product.name for product in short) + "."
+        await callback.answer(text, show_alert=True)
     except Exception as e:
         logger.error(f"Ошибка: {e}")
         await callback.answer("Произошла ошибка.", show_alert=True)
@@ -161,13 +252,13 @@ async def send_order(chat_id: int, bouquet_name: str, price: float, delivery_dat
     try:
         if image_path and os.path.exists(image_path):
             photo = FSInputFile(image_path)
-            await bot.send_photo(
+            await client.bot.send_photo(
                 chat_id=chat_id,
                 photo=photo,
                 caption=f"🎉 Новый заказ:\n💐 {bouquet_name}\n💰 {price} €\n📅 {delivery_date}",
             )
         else:
-            await bot.send_message(
+            await client.bot.send_message(
                 chat_id=chat_id,
                 text=f"🎉 Новый заказ:\n💐 {bouquet_name}\n💰 {price} €\n📅 {delivery_date}",
             )
@@ -176,13 +267,20 @@ async def send_order(chat_id: int, bouquet_name: str, price: float, delivery_dat
 
 # Запуск бота
 async def main():
+    # Бот-поллер сам владеет event loop — клиент уведомлений работает в нём же, без отдельного потока
+    client.attach_loop(asyncio.get_running_loop())
+    bot = client.bot
     await bot.set_my_commands([
         BotCommand(command="/order_status", description="Статусы заказов"),
         BotCommand(command="/analytics", description="Аналитика"),
         BotCommand(command="/test_order", description="Тестовый заказ"),
     ])
     logger.info("Бот запущен. Ожидаю сообщения...")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await client.aclose()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
@@ -0,0 +1,146 @@
+import atexit
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils.timezone import now
+
+logger = logging.getLogger(__name__)
+
+# Ширины превью (px); карточка каталога ~ 300 px, страница товара — до 640 px (x2 для retina)
+THUMBNAIL_WIDTHS = tuple(getattr(settings, "THUMBNAIL_WIDTHS", (160, 320, 640, 1280)))
+THUMBNAIL_DIR = "products/thumbs"
+# (формат Pillow, расширение, параметры сохранения)
+FORMATS = {
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", "webp", {"quality": 78, "method": 4}),
+}
+# Меняется при смене параметров кодирования: имена файлов тоже поменяются, старые кэши браузеров не мешают
+PIPELINE_VERSION = 1
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "THUMBNAIL_WORKERS", 2), thread_name_prefix="thumbnails",
+                )
+                atexit.register(_executor.shutdown, wait=False)
+    return _executor
+
+
+def schedule(product_pk):
+    """
+    Ставим генерацию превью товара в пул после коммита транзакции, где сохранили картинку.
+
+    При THUMBNAILS_ASYNC = False превью строятся сразу в текущем потоке (тесты, команды).
+    """
+    def submit():
+        if getattr(settings, "THUMBNAILS_ASYNC", True):
+            _get_executor().submit(_run_job, product_pk).add_done_callback(_log_failure)
+        else:
+            generate(product_pk)
+
+    transaction.on_commit(submit)
+
+
+def _run_job(product_pk):
+    # У потоков пула свои соединения с БД: закрываем их сами, запрос-ответный цикл Django их не трогает
+    close_old_connections()
+    try:
+        return generate(product_pk)
+    finally:
+        close_old_connections()
+
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Ошибка генерации превью: %s", future.exception())
+
+
+def generate(product_pk):
+    """
+    Строим превью всех ширин в JPEG и WebP и записываем их в Product.thumbnails.
+
+    Имена файлов содержат хеш исходника, поэтому их можно отдавать с вечным кэшированием,
+    а повторный запуск для той же картинки ничего не перекодирует. Если картинку успели
+    заменить, пока шла генерация, результат не записывается — его перезапишет новая задача.
+    """
+    # Pillow нужен только задаче генерации: модели (srcset в карточках) и сигналы импортируют модуль
+    # в каждом процессе, и холодный старт не должен платить за него
+    from PIL import Image, ImageOps
+
+    from .models import Product
+
+    product = Product.objects.filter(pk=product_pk).only("image").first()
+    if product is None or not product.image:
+        return None
+    source_name = product.image.name
+    try:
+        with default_storage.open(source_name, "rb") as source:
+            data = source.read()
+    except FileNotFoundError:
+        logger.warning("Картинка товара #%s не найдена в хранилище: %s", product_pk, source_name)
+        return None
+    digest = hashlib.sha256(data + f":{PIPELINE_VERSION}".encode()).hexdigest()[:16]
+
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        widths = [width for width in THUMBNAIL_WIDTHS if width < image.width] or [image.width]
+        thumbnails = {"source": source_name, "width": image.width, "height": image.height}
+        for fmt, (pil_format, ext, options) in FORMATS.items():
+            thumbnails[fmt] = {}
+            for width in widths:
+                name = f"{THUMBNAIL_DIR}/{digest}_{width}.{ext}"
+                if not default_storage.exists(name):
+                    default_storage.save(name, ContentFile(_encode(image, width, pil_format, options)))
+                thumbnails[fmt][str(width)] = name
+
+    # Условный UPDATE в обход save(): updated_at (версию фрагментов карточки) сдвигаем явно
+    updated = Product.objects.filter(pk=product_pk, image=source_name).update(
+        thumbnails=thumbnails, updated_at=now(),
+    )
+    return thumbnails if updated else None
+
+
+def _encode(image, width, pil_format, options):
+    from PIL import Image
+
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.Resampling.LANCZOS) if width != image.width else image
+    if pil_format == "JPEG" and resized.mode != "RGB":
+        resized = resized.convert("RGB")
+    buffer = BytesIO()
+    resized.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def srcset(thumbnails, fmt):
+    """Строка для атрибута srcset: «url 160w, url 320w, ...» по сохранённым превью."""
+    variants = (thumbnails or {}).get(fmt) or {}
+    return ", ".join(
+        f"{default_storage.url(name)} {width}w" for width, name in sorted(variants.items(), key=lambda i: int(i[0]))
+    )
+
+
+def smallest_url(thumbnails, fmt="jpeg", min_width=0):
+    """URL самого маленького превью не уже min_width (или самого большого, если таких нет)."""
+    variants = (thumbnails or {}).get(fmt) or {}
+    if not variants:
+        return None
+    widths = sorted(int(width) for width in variants)
+    width = next((width for width in widths if width >= min_width), widths[-1])
+    return default_storage.url(variants[str(width)])
@@ -6,16 +6,21 @@ app_name = 'app'
 urlpatterns = [
     path('', views.home, name='home'),
     path('catalog/', views.catalog, name='catalog'),
+    path('search/', views.search_view, name='search'),
     path('product/<int:pk>/', views.product_detail, name='product_detail'),
     path('cart/', views.cart_view, name='cart'),
     path('cart/add/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/remove/<int:cart_item_id>/', views.remove_from_cart, name='remove_from_cart'),
+    path('cart/remove-product/<int:product_id>/', views.remove_from_session_cart, name='remove_from_session_cart'),
     path('checkout/', views.checkout, name='checkout'),
     path('order/success/', views.order_success, name='order_success'),
     path('order/<int:order_id>/', views.order_status, name='order_status'),
     path('order/repeat/<int:order_id>/', views.repeat_order, name='repeat_order'),
     path('order/history/', views.order_history, name='order_history'),
     path('analytics/', views.analytics_view, name='analytics'),
+    path('api/analytics/', views.analytics_api, name='analytics_api'),
+    path('api/analytics/export/', views.analytics_export, name='analytics_export'),
+    path('metrics/', views.metrics_view, name='metrics'),
     path('contacts/', views.contacts, name='contacts'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
@@ -26,5 +31,6 @@ urlpatterns = [
     path('password-reset-confirm/<uidb64>/<token>/', views.password_reset_confirm, name='password_reset_confirm'),
     path('password-reset-complete/', views.password_reset_complete, name='password_reset_complete'),
     path('reviews/', views.leave_review, name='reviews'),
+    path('api/catalog/', views.catalog_api, name='catalog_api'),
     path('api/send_order/', views.send_order_to_bot, name='send_order_to_bot'),
 ]
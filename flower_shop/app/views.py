@@ -1,20 +1,17 @@
 
 import json
 import logging
-import asyncio
-import threading
-from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram import Bot
-from aiogram.types import FSInputFile
-
-from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery, Sum
+from django.utils.timezone import localdate
 
 
 
@@ -24,212 +21,223 @@ from django.contrib.auth.tokens import default_token_generator
 from django.contrib.admin.views.decorators import staff_member_required
 
 
-from .forms import RegistrationForm, OrderForm, ReviewForm
+from .forms import RegistrationForm, OrderForm, ReviewForm, CatalogFilterForm, AnalyticsRangeForm
+from .fragments import arender_product_cards, product_version, render_product_cards
 from .models import Product, CartItem, Order, OrderItem, Review
+from .pagination import akeyset_page, keyset_page
+from . import cart, inventory, metrics, notifications, recommendations, reports, rollups, search, services
 
 logger = logging.getLogger(__name__)
 
-BOT_TOKEN = getattr(settings, "BOT_TOKEN")
-if not BOT_TOKEN or ":" not in BOT_TOKEN:
-    raise ValueError("BOT_TOKEN is invalid or missing in settings.py!")
 
-bot = Bot(token=BOT_TOKEN)
+def home(request):
+    # Сводка рейтинга берётся из кэша — главная по-прежнему обходится без запросов к БД
+    return render(request, 'app/home.html', {'rating_summary': rollups.rating_summary()})
 
-# Создаём глобальный event loop
-loop = asyncio.new_event_loop()
 
-def _start_loop(loop):
-    """Запускаем event loop в отдельном потоке, чтобы он жил всё время работы приложения."""
-    asyncio.set_event_loop(loop)
-    loop.run_forever()
+CATALOG_PAGE_SIZE = getattr(settings, "CATALOG_PAGE_SIZE", 24)
+CATALOG_MAX_PAGE_SIZE = 100
 
-# Запускаем поток с event loop (daemon=True, чтобы поток завершался вместе с основным процессом)
-thread = threading.Thread(target=_start_loop, args=(loop,), daemon=True)
-thread.start()
 
-def run_in_loop(coro):
+def filter_catalog(request, keys_only=False):
+    """
+    Одна страница каталога по keyset-курсору с серверными фильтрами.
 
-    return asyncio.run_coroutine_threadsafe(coro, loop)
+    Возвращает (form, products, next_cursor). Сортировка всегда дополняется id,
+    чтобы ключ был уникальным и совпадал с индексами (available, price|name, id).
+    При keys_only=True вместо объектов возвращаются словари только с полями ключа и updated_at
+    (версией фрагмента): сами карточки берутся из кэша фрагментов.
+    """
+    form, queryset, ordering, cursor, page_size = _catalog_query(request, keys_only)
+    products, next_cursor = keyset_page(queryset, ordering, cursor, page_size)
+    return form, products, next_cursor
+
+
+def _catalog_query(request, keys_only):
+    """Фильтры и ключ сортировки каталога без выполнения запроса (общая часть для sync и async)."""
+    form = CatalogFilterForm(request.GET)
+    form.is_valid()
+    params = form.cleaned_data
+
+    queryset = Product.objects.all()
+    if not (params.get('include_unavailable') and request.user.is_staff):
+        queryset = queryset.available()
+    if params.get('min_price') is not None:
+        queryset = queryset.filter(price__gte=params['min_price'])
+    if params.get('max_price') is not None:
+        queryset = queryset.filter(price__lte=params['max_price'])
+    if params.get('in_stock'):
+        queryset = queryset.filter(stock__gt=0)
+
+    sort = params.get('sort') or 'price'
+    ordering = (sort, '-id' if sort.startswith('-') else 'id')
 
-async def send_order_to_telegram_async(order):
     try:
+        page_size = min(int(request.GET.get('page_size', CATALOG_PAGE_SIZE)), CATALOG_MAX_PAGE_SIZE)
+    except ValueError:
+        page_size = CATALOG_PAGE_SIZE
+    page_size = max(page_size, 1)
 
-        chat_id = "5285694652"
-        caption = (
-            f"🎉 *Новый заказ!*\n\n"
-            f"👤 *Пользователь*: {order.user.username}\n"
-            f"💰 *Сумма заказа*: {order.total_price} руб.\n"
-            f"📅 *Дата заказа*: {order.created_at.strftime('%d.%m.%Y %H:%M')}"
-            f"📍 *Адрес*: {order.delivery_address}"
-            f"📞 *Телефон*: {order.phone_number}"
-            f"⏰ *Время доставки*: {order.delivery_time}"
-            f"Дата доставки: {order.delivery_date}"
+    if keys_only:
+        queryset = queryset.values('updated_at', *{field.lstrip('-') for field in ordering})
 
+    return form, queryset, ordering, params.get('cursor'), page_size
 
-        )
-        await bot.send_message(chat_id, caption, parse_mode="Markdown")
-        logger.info("Сообщение успешно отправлено в Telegram.")
-    except Exception as e:
-        logger.error(f"Ошибка отправки сообщения в Telegram: {e}")
 
+def _next_page_query(request, next_cursor):
+    if not next_cursor:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = next_cursor
+    return query.urlencode()
 
-def home(request):
-    return render(request, 'app/home.html')
 
+async def _load_async_context(request):
+    """
+    Для async-представлений: пользователь и сводка корзины загружаются заранее,
+    чтобы шаблон и context processors не обращались к БД из event loop.
+    """
+    request.user = await request.auser()
+    if request.user.is_authenticated:
+        request.cart_summary = await cart.aget_summary(request.user)
+    else:
+        request.cart_summary = cart.session_summary(request.guest_cart)
+
+
+async def catalog(request):
+    await _load_async_context(request)
+    form, queryset, ordering, cursor, page_size = _catalog_query(request, keys_only=True)
+    rows, next_cursor = await akeyset_page(queryset, ordering, cursor, page_size)
+    cards = await arender_product_cards([(row['id'], row['updated_at']) for row in rows], Product.objects.ain_bulk)
+    return render(request, 'app/catalog.html', {
+        'form': form,
+        'cards': cards,
+        'next_query': _next_page_query(request, next_cursor),
+    })
 
-def catalog(request):
-    products = Product.objects.filter(available=True)
-    return render(request, 'app/catalog.html', {'products': products})
 
+def catalog_api(request):
+    """JSON-вариант каталога для бесконечной прокрутки: те же фильтры и курсор, что и у catalog."""
+    form, products, next_cursor = filter_catalog(request)
+    next_query = _next_page_query(request, next_cursor)
+    by_pk = {product.pk: product for product in products}
+    cards = render_product_cards(
+        [(product.pk, product.updated_at) for product in products], lambda missing: {pk: by_pk[pk] for pk in missing},
+    )
+    items = []
+    for card in cards:
+        product = by_pk[card['pk']]
+        items.append({
+            'id': product.id,
+            'name': product.name,
+            'price': str(product.price),
+            'stock': product.stock,
+            'image': product.image.url if product.image else None,
+            'url': reverse('app:product_detail', args=[product.pk]),
+            'html': render_to_string('app/includes/product_card.html', {'card': card}, request=request),
+        })
+    return JsonResponse({
+        'items': items,
+        'next_cursor': next_cursor,
+        'next': f"{reverse('app:catalog_api')}?{next_query}" if next_query else None,
+    })
+
+
+def search_view(request):
+    """Поиск по названию и описанию: id по релевантности из индекса, карточки — из кэша фрагментов."""
+    query = request.GET.get('q', '').strip()[:100]
+    rows = search.search_rows(query) if query else []
+    cards = render_product_cards(rows, Product.objects.in_bulk)
+    return render(request, 'app/search.html', {'search_query': query, 'cards': cards})
 
-def product_detail(request, pk):
-    product = get_object_or_404(Product, pk=pk, available=True)
-    recommended_products = Product.objects.filter(available=True).exclude(pk=pk)[:4]
+
+async def product_detail(request, pk):
+    await _load_async_context(request)
+    try:
+        product = await Product.objects.available().aget(pk=pk)
+    except Product.DoesNotExist:
+        raise Http404("Товар не найден")
+    recommended_products = await recommendations.arecommended_products(pk)
     return render(request, 'app/product_detail.html', {
         'product': product,
+        'product_version': product_version(product.updated_at),
         'recommended_products': recommended_products,
     })
 
 
-@login_required
 def add_to_cart(request, product_id):
     product = get_object_or_404(Product, id=product_id, available=True)
 
-    if product.stock <= 0:
+    try:
+        if request.user.is_authenticated:
+            # Проверка остатка и резерв — один условный UPDATE, поэтому параллельные запросы не перепродают товар
+            inventory.hold(request.user, product)
+        else:
+            # Гость: корзина в подписанной cookie, в БД ничего не пишем до входа (см. cart.merge_session_cart)
+            cart.session_add(request.guest_cart, product)
+    except inventory.InsufficientStock:
         messages.error(request, f"Товар '{product.name}' закончился на складе.")
         return redirect('app:catalog')
+    except cart.SessionCartFull:
+        messages.error(request, "В корзине слишком много позиций. Войдите, чтобы добавить ещё.")
+        return redirect('app:cart')
 
-    cart_item, created = CartItem.objects.get_or_create(
-        user=request.user,
-        product=product,
-        defaults={'price': product.price, 'quantity': 0}
-    )
-
-    if created:
-        cart_item.quantity = 1
-    else:
-        if cart_item.quantity < product.stock:
-            cart_item.quantity += 1
-        else:
-            messages.warning(request, f"На складе недостаточно товара '{product.name}'.")
-            return redirect('app:cart')
-
-    cart_item.save()
     messages.success(request, f"Товар '{product.name}' добавлен в корзину.")
     return redirect('app:cart')
 
 
+async def cart_view(request):
+    await _load_async_context(request)
+    # Общая стоимость — из кэшированной сводки корзины, без пересчёта по позициям
+    total_price = request.cart_summary['total']
+    if not request.user.is_authenticated:
+        cart_items = await cart.asession_cart_items(request.guest_cart)
+        return render(request, 'app/cart.html', {'cart_items': cart_items, 'total_price': total_price})
 
-@login_required
-def cart_view(request):
     # Получаем все товары пользователя в корзине
-    cart_items = CartItem.objects.filter(user=request.user).select_related('product')
-
-    # Вычисляем общую стоимость товаров в корзине
-    total_price = sum(item.subtotal() for item in cart_items)
+    cart_items = [item async for item in CartItem.objects.filter(user=request.user).select_related('product')]
 
     return render(request, 'app/cart.html', {
         'cart_items': cart_items,
         'total_price': total_price,
     })
 
-ADMIN_CHAT_ID = "5285694652"
-
-# Функция для отправки сообщения в Telegram
-async def send_message_to_admin(message):
-    await bot.send_message(ADMIN_CHAT_ID, message)
-
-async def order_status_command(message: Message):
-    orders = await sync_to_async(lambda: list(Order.objects.select_related('user').order_by("-created_at")))()
-    if not orders:
-        await message.answer("Нет заказов на данный момент.")
-        return
-
-    status_map = {
-        'NEW': "🟡 Новый",
-        'PROCESSING': "🔵 В обработке",
-        'COMPLETED': "✅ Завершён",
-        'CANCELLED': "❌ Отменён",
-    }
-
-    for order in orders:
-        text = (
-            f"🛒 *Заказ №{order.id}* от {order.created_at.strftime('%d.%m.%Y %H:%M')}\n"
-            f"👤 Пользователь: {order.user.username}\n"
-            f"💰 Сумма: {order.total_price} ₽\n"
-            f"📍 Адрес: {order.delivery_address}\n"
-            f"📊 Статус: {status_map.get(order.status, 'Неизвестно')}"
-        )
-        await message.answer(text, parse_mode="Markdown")
-
-
-
-
 
 @login_required
 def remove_from_cart(request, cart_item_id):
-    cart_item = get_object_or_404(CartItem, id=cart_item_id, user=request.user)
-    cart_item.delete()
+    cart_item = get_object_or_404(CartItem.objects.select_related('product'), id=cart_item_id, user=request.user)
+    inventory.release(cart_item)
     messages.success(request, f'Товар “{cart_item.product.name}” удалён из корзины.')
     return redirect('app:cart')
 
 
-@login_required
-def checkout(request):
-    cart_items = CartItem.objects.filter(user=request.user)
-    if not cart_items.exists():
-        messages.warning(request, "Ваша корзина пуста.")
-        return redirect('app:catalog')
+def remove_from_session_cart(request, product_id):
+    """Удаление товара из корзины гостя (позиции в cookie адресуются id товара)."""
+    cart.session_remove(request.guest_cart, product_id)
+    messages.success(request, "Товар удалён из корзины.")
+    return redirect('app:cart')
 
-    total_price = sum(item.subtotal() for item in cart_items)
-    logger.debug("Начало оформления заказа. Пользователь: %s, Всего товаров: %d, Общая сумма: %s",
-                 request.user.username, cart_items.count(), total_price)
 
+@login_required
+def checkout(request):
     if request.method == 'POST':
         form = OrderForm(request.POST)
         if form.is_valid():
             logger.debug("Форма заказа валидна.")
             try:
-                order = form.save(commit=False)
-                order.user = request.user
-                order.total_price = total_price
-                order.save()
-                logger.debug("Заказ сохранён. Заказ id: %s", order.id)
+                services.place_order(request.user, form)
+            except services.EmptyCart:
+                messages.warning(request, "Ваша корзина пуста.")
+                return redirect('app:catalog')
+            except inventory.InsufficientStock as e:
+                logger.warning("Недостаточно товара при оформлении заказа: %s", e)
+                messages.error(request, "Часть товаров из корзины закончилась на складе. Проверьте корзину.")
+                return redirect('app:cart')
             except Exception as e:
                 logger.error("Ошибка при сохранении заказа: %s", e)
                 messages.error(request, "Ошибка при сохранении заказа. Попробуйте ещё раз.")
                 return redirect('app:checkout')
 
-            # Создание OrderItem для каждого товара в корзине
-            for item in cart_items:
-                try:
-                    OrderItem.objects.create(
-                        order=order,
-                        product=item.product,
-                        quantity=item.quantity,
-                        price=item.price
-                    )
-                    logger.debug("OrderItem создан для товара: %s (кол-во: %s)", item.product.name, item.quantity)
-                except Exception as e:
-                    logger.error("Ошибка при создании OrderItem для товара %s: %s", item.product.name, e)
-                    messages.error(request, "Ошибка при добавлении товара в заказ.")
-                    return redirect('app:checkout')
-
-            try:
-                cart_items.delete()
-                logger.debug("Корзина очищена.")
-            except Exception as e:
-                logger.error("Ошибка при очистке корзины: %s", e)
-                messages.error(request, "Ошибка при очистке корзины.")
-                return redirect('app:checkout')
-
-            # Отправляем сообщение в Telegram только после успешного сохранения заказа
-            try:
-                run_in_loop(send_order_to_telegram_async(order))
-                logger.debug("Сообщение о новом заказе отправлено в Telegram.")
-            except Exception as e:
-                logger.error("Ошибка отправки заказа в Telegram: %s", e)
-
             messages.success(request, "Ваш заказ успешно оформлен!")
             return redirect('app:order_success')
         else:
@@ -238,14 +246,18 @@ def checkout(request):
     else:
         form = OrderForm()
 
+    cart_items = list(CartItem.objects.filter(user=request.user).select_related('product'))
+    if not cart_items:
+        messages.warning(request, "Ваша корзина пуста.")
+        return redirect('app:catalog')
+
     return render(request, 'app/checkout.html', {
         'cart_items': cart_items,
-        'total_price': total_price,
+        'total_price': sum(item.subtotal() for item in cart_items),
         'form': form
     })
 
 
-
 @login_required
 def order_success(request):
     return render(request, 'app/order_success.html')
@@ -266,6 +278,7 @@ def login_view(request):
         if form.is_valid():
             user = form.get_user()
             login(request, user)
+            cart.merge_session_cart(request)
             next_url = request.GET.get('next') or 'app:home'
             return redirect(next_url)
         else:
@@ -292,8 +305,9 @@ def register(request):
             user = authenticate(username=username, password=raw_password)
             if user is not None:
                 login(request, user)
+                cart.merge_session_cart(request)
                 messages.success(request, f'Аккаунт успешно создан для пользователя {username}!')
-                return redirect('shop:home')
+                return redirect('app:home')
     else:
         form = RegistrationForm()
     return render(request, 'app/register.html', {'form': form})
@@ -377,7 +391,6 @@ def logout_success(request):
 
 @login_required
 def leave_review(request):
-    reviews = Review.objects.all().order_by('-created_at')
     if request.method == 'POST':
         form = ReviewForm(request.POST)
         if form.is_valid():
@@ -389,27 +402,56 @@ def leave_review(request):
     else:
         form = ReviewForm()
 
-    return render(request, 'app/reviews.html', {'form': form, 'reviews': reviews})
+    # Страница по курсору (created_at, id), авторы — в том же запросе
+    page_size = getattr(settings, 'REVIEWS_PAGE_SIZE', 20)
+    reviews, next_cursor = keyset_page(
+        Review.objects.select_related('user'), ('-created_at', '-id'), request.GET.get('cursor'), page_size,
+    )
+    return render(request, 'app/reviews.html', {
+        'form': form,
+        'reviews': reviews,
+        'rating_summary': rollups.rating_summary(),
+        'next_query': _next_page_query(request, next_cursor),
+    })
 
 
 @login_required
 def order_history(request):
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'app/order_history.html', {'orders': orders})
+    """
+    История заказов страницами по курсору (created_at, id): число запросов и память не зависят
+    от того, сколько всего заказов у покупателя.
+
+    Число позиций и сумма считаются подзапросами только для строк страницы,
+    позиции с товарами подгружаются одним запросом на страницу.
+    """
+    lines = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    orders = (
+        Order.objects.filter(user=request.user)
+        .annotate(
+            line_count=Subquery(lines.annotate(n=Count('pk')).values('n')),
+            items_total=Subquery(lines.annotate(total=Sum(F('price') * F('quantity'))).values('total')),
+        )
+        .prefetch_related(Prefetch('order_items', queryset=OrderItem.objects.select_related('product')))
+    )
+    page_size = getattr(settings, 'ORDER_HISTORY_PAGE_SIZE', 20)
+    orders, next_cursor = keyset_page(orders, ('-created_at', '-id'), request.GET.get('cursor'), page_size)
+    return render(request, 'app/order_history.html', {
+        'orders': orders,
+        'next_query': _next_page_query(request, next_cursor),
+    })
 
 
 @staff_member_required
 def analytics_view(request):
-    from django.db.models import Sum
-    from django.utils.timezone import now
-
-    today = now().date()
-    orders_today = Order.objects.filter(created_at__date=today)
-    total_revenue_today = orders_today.aggregate(Sum('total_price'))['total_price__sum'] or 0
-    total_orders_today = orders_today.count()
-
-    total_revenue = Order.objects.aggregate(Sum('total_price'))['total_price__sum'] or 0
-    total_orders = Order.objects.count()
+    """
+    Итоги берутся из сводок app.rollups (строка на день и статус), а не агрегатами по всей
+    таблице заказов; список сегодняшних заказов — диапазоном по created_at.
+    """
+    today = localdate()
+    total_orders, total_revenue = rollups.sales_summary()
+    total_orders_today, total_revenue_today = rollups.sales_summary(today, today)
+    start, end = rollups.day_bounds(today)
+    orders_today = Order.objects.filter(created_at__gte=start, created_at__lt=end).order_by('-created_at')
 
     return render(request, 'app/analytics.html', {
         'orders_today': orders_today,
@@ -420,83 +462,113 @@ def analytics_view(request):
     })
 
 
+@staff_member_required
+def analytics_api(request):
+    """
+    JSON-отчёт за произвольный период: ?start=ГГГГ-ММ-ДД&end=ГГГГ-ММ-ДД&granularity=hour|day|week&top=N.
+
+    Ряд, итоги и топ товаров считаются в БД (см. app.reports) по сводкам продаж.
+    """
+    form = AnalyticsRangeForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    data = form.cleaned_data
+    return JsonResponse(reports.sales_report(data['start'], data['end'], data['granularity'], data['top']))
+
+
+@staff_member_required
+def analytics_export(request):
+    """Потоковая выгрузка позиций заказов за период в CSV или Parquet (?format=csv|parquet)."""
+    form = AnalyticsRangeForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    data = form.cleaned_data
+    rows = reports.export_rows(data['start'], data['end'])
+    filename = f"orders_{data['start']:%Y%m%d}_{data['end']:%Y%m%d}"
+
+    if data['format'] == 'parquet':
+        try:
+            content = reports.stream_parquet(rows)
+        except ImportError:
+            return JsonResponse({'errors': {'format': ["Для выгрузки в Parquet установите pyarrow."]}}, status=501)
+        response = StreamingHttpResponse(content, content_type='application/vnd.apache.parquet')
+        response['Content-Disposition'] = f'attachment; filename="{filename}.parquet"'
+        return response
+
+    response = StreamingHttpResponse(reports.stream_csv(rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+
+@staff_member_required
+def metrics_view(request):
+    """Метрики запросов этого процесса (app.middleware) в текстовом формате Prometheus."""
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @csrf_exempt
-def send_order_to_bot(request):
+async def send_order_to_bot(request):
     """
     Пример ручного отправления данных по API (внешний запрос).
+
+    Отправка в Telegram ожидается прямо в представлении: под ASGI медленный Telegram
+    не занимает поток воркера, а ответ сообщает, дошло ли сообщение.
     """
-    if request.method == "POST":
-        try:
-            data = json.loads(request.body)
-            bouquet_name = data.get("bouquet_name")
-            price = data.get("price")
-            delivery_date = data.get("delivery_date")
-            image_path = data.get("image_path")
-
-            logger.info(
-                f"Отправка данных в Telegram: chat_id=5285694652, "
-                f"bouquet_name={bouquet_name}, price={price}, "
-                f"delivery_date={delivery_date}, image_path={image_path}"
-            )
-
-            async def _send_order():
-                try:
-                    if image_path:
-                        photo = FSInputFile(image_path)
-                        await bot.send_photo(
-                            chat_id="5285694652",
-                            photo=photo,
-                            caption=(
-                                f"🎉 *Новый заказ!*\n\n"
-                                f"💐 *Букет*: {bouquet_name}\n"
-                                f"💰 *Цена*: {price} руб.\n"
-                                f"📅 *Дата доставки*: {delivery_date}"
-                            ),
-                            parse_mode="Markdown"
-                        )
-                    else:
-                        await bot.send_message(
-                            chat_id="5285694652",
-                            text=(
-                                f"🎉 *Новый заказ!*\n\n"
-                                f"💐 *Букет*: {bouquet_name}\n"
-                                f"💰 *Цена*: {price} руб.\n"
-                                f"📅 *Дата доставки*: {delivery_date}"
-                            ),
-                            parse_mode="Markdown"
-                        )
-                except Exception as e:
-                    logger.error(f"Ошибка отправки сообщения: {e}")
-
-            run_in_loop(_send_order())
-            return JsonResponse({"status": "success", "message": "Заказ отправлен в Telegram."})
-        except Exception as e:
-            logger.error(f"Ошибка обработки запроса: {e}")
-            return JsonResponse({"status": "error", "message": str(e)})
-    else:
+    if request.method != "POST":
         return JsonResponse({"status": "error", "message": "Только POST-запросы разрешены."})
-
+    try:
+        data = json.loads(request.body)
+    except ValueError as e:
+        logger.error(f"Ошибка обработки запроса: {e}")
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"status": "error", "message": "Ожидается JSON-объект."}, status=400)
+
+    bouquet_name = data.get("bouquet_name")
+    price = data.get("price")
+    delivery_date = data.get("delivery_date")
+    image_path = data.get("image_path")
+
+    logger.info(
+        f"Отправка данных в Telegram: chat_id=5285694652, "
+        f"bouquet_name={bouquet_name}, price={price}, "
+        f"delivery_date={delivery_date}, image_path={image_path}"
+    )
+    text = (
+        f"🎉 *Новый заказ!*\n\n"
+        f"💐 *Букет*: {bouquet_name}\n"
+        f"💰 *Цена*: {price} руб.\n"
+        f"📅 *Дата доставки*: {delivery_date}"
+    )
+    try:
+        if image_path:
+            # aiogram импортируем по месту: он тяжёлый и нужен только здесь
+            from aiogram.types import FSInputFile
+            await notifications.client.run(notifications.client.bot.send_photo(
+                chat_id="5285694652", photo=FSInputFile(image_path), caption=text, parse_mode="Markdown",
+            ))
+        else:
+            await notifications.client.run(notifications.client.bot.send_message(
+                chat_id="5285694652", text=text, parse_mode="Markdown",
+            ))
+    except Exception as e:
+        logger.error(f"Ошибка отправки сообщения: {e}")
+        return JsonResponse({"status": "error", "message": str(e)})
+    return JsonResponse({"status": "success", "message": "Заказ отправлен в Telegram."})
 
 @login_required
 def repeat_order(request, order_id):
 
     original_order = get_object_or_404(Order, id=order_id, user=request.user)
 
-    for item in original_order.order_items.all():
-        # Если товар уже есть в корзине, увеличиваем количество,
-        # иначе создаём новую запись
-        cart_item, created = CartItem.objects.get_or_create(
-            user=request.user,
-            product=item.product,
-            defaults={'price': item.price, 'quantity': 0}
-        )
-        if not created:
-            cart_item.quantity += item.quantity
-        else:
-            cart_item.quantity = item.quantity
-        cart_item.save()
-
-    messages.success(request, "Товары из выбранного заказа добавлены в корзину.")
+    added, short = services.reorder(request.user, original_order)
+    if short:
+        names = ", ".join(product.name for product in short)
+        messages.warning(request, f"Не хватает на складе: {names}. Добавлено сколько есть.")
+    if added:
+        messages.success(request, "Товары из выбранного заказа добавлены в корзину.")
+    elif not short:
+        messages.warning(request, "Товары из этого заказа больше не продаются.")
     return redirect('app:cart')
 
 
@@ -506,10 +578,3 @@ def order_status(request, order_id):
     return render(request, 'shop/order_status.html', {'order': order})
 
 
-@login_required
-def remove_from_cart(request, cart_item_id):
-    cart_item = get_object_or_404(CartItem, id=cart_item_id, user=request.user)
-    cart_item.delete()
-    messages.success(request, f'Товар “{cart_item.product.name}” удалён из корзины.')
-    return redirect('app:cart')
-
@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flower_shop.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from app import notifications  # noqa: E402  импорт после настройки Django
+
+
+async def application(scope, receive, send):
+    # Клиент Telegram работает в loop сервера: async-представления ждут отправку напрямую,
+    # без отдельного потока с event loop (app/notifications.py)
+    notifications.client.attach_running_loop()
+    await django_application(scope, receive, send)
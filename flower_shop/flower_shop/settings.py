@@ -33,8 +33,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым: замеры времени, SQL и шаблонов для /metrics/ (см. app.middleware)
+    'app.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    # Корзина гостя — в своей подписанной cookie, без записи сессии в БД (app.cart.GuestCartStore)
+    'app.middleware.GuestCartMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -55,6 +59,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'app.context_processors.cart_summary',
             ],
         },
     },
@@ -70,6 +75,22 @@ DATABASES = {
     }
 }
 
+# Cache
+# По умолчанию локальный кэш процесса; в продакшене укажите общий бэкенд (например, Redis)
+CACHES = {
+    'default': {
+        'BACKEND': config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        'LOCATION': config("CACHE_LOCATION", default="flower-shop"),
+    }
+}
+
+# Время жизни HTML-фрагментов карточек товаров (секунды); инвалидация — по версии товара
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сессии авторизации в БД (по умолчанию Django): выход и смена пароля отзывают сессию на сервере.
+# Корзина гостя хранится не в сессии, а в отдельной подписанной cookie (app.middleware.GuestCartMiddleware)
+SESSION_ENGINE = config("SESSION_ENGINE", default="django.contrib.sessions.backends.db")
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -109,3 +130,32 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Telegram Bot
 BOT_TOKEN = config("BOT_TOKEN", default="7871114248:AAHpOr0l7R53OPjhYmvrXFa4xuUdnlsE7rQ")
 ADMIN_CHAT_ID = config("ADMIN_CHAT_ID", default="5285694652")
+# Максимум одновременных HTTP-соединений общего клиента Telegram (app.notifications)
+TELEGRAM_POOL_SIZE = config("TELEGRAM_POOL_SIZE", default=10, cast=int)
+# Адрес Bot API (пусто — https://api.telegram.org); нужен для локального сервера Bot API и бенчмарков
+TELEGRAM_API_URL = config("TELEGRAM_API_URL", default="")
+# Окно сводки смен статусов заказов, секунды (app/status_digest.py): не больше одного сообщения за окно на чат
+ORDER_STATUS_DIGEST_WINDOW = config("ORDER_STATUS_DIGEST_WINDOW", default=30, cast=int)
+
+# Превью картинок товаров (app/thumbnails.py): ширины в px и размер фонового пула
+THUMBNAIL_WIDTHS = (160, 320, 640, 1280)
+THUMBNAIL_WORKERS = config("THUMBNAIL_WORKERS", default=2, cast=int)
+# False — строить превью сразу после коммита в текущем потоке (удобно в тестах и командах)
+THUMBNAILS_ASYNC = config("THUMBNAILS_ASYNC", default=True, cast=bool)
+
+# Каталог: размер страницы keyset-пагинации
+CATALOG_PAGE_SIZE = 24
+
+# История заказов: заказов на странице (keyset-пагинация)
+ORDER_HISTORY_PAGE_SIZE = 20
+
+# Отзывы: отзывов на странице (keyset-пагинация)
+REVIEWS_PAGE_SIZE = 20
+
+# Сколько минут товар в корзине держится зарезервированным на складе
+CART_HOLD_MINUTES = 30
+
+# Инструментирование запросов (app.middleware): метрики на /metrics/ для персонала
+METRICS_ENABLED = config("METRICS_ENABLED", default=True, cast=bool)
+# Запросы дольше порога (мс) пишутся в лог app.middleware вместе со списком SQL
+METRICS_SLOW_REQUEST_MS = config("METRICS_SLOW_REQUEST_MS", default=500, cast=int)
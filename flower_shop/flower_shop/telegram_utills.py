@@ -1,32 +1,21 @@
-import os
-import asyncio
-import threading
 import logging
-from aiogram import Bot
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 
-logger = logging.getLogger(__name__)
-
-# Настройка токена и chat_id
-BOT_TOKEN = os.getenv("BOT_TOKEN", "ваш токен")
-ADMIN_CHAT_ID = os.getenv("ADMIN_CHAT_ID", "5285694652")
+from app import status_digest
+from app.notifications import client
 
-bot = Bot(token=BOT_TOKEN)
 
-# Глобальный цикл событий
-loop = asyncio.new_event_loop()
+logger = logging.getLogger(__name__)
 
-def start_loop(loop):
-    """Запуск event loop в отдельном потоке."""
-    asyncio.set_event_loop(loop)
-    loop.run_forever()
+# chat_id администратора берём из настроек; Bot и event loop общие для процесса (app.notifications)
+ADMIN_CHAT_ID = getattr(settings, "ADMIN_CHAT_ID", "5285694652")
 
-thread = threading.Thread(target=start_loop, args=(loop,), daemon=True)
-thread.start()
 
 def run_in_loop(coro):
-    """Запуск корутины в фоновом event loop."""
-    return asyncio.run_coroutine_threadsafe(coro, loop)
+    """Запуск корутины в общем фоновом event loop клиента уведомлений."""
+    return client.enqueue(coro)
 
 async def send_order_to_telegram_async(order):
     """Отправка нового заказа в Telegram."""
@@ -37,22 +26,19 @@ async def send_order_to_telegram_async(order):
         f"📅 *Дата заказа*: {order.created_at.strftime('%d.%m.%Y %H:%M')}"
     )
     try:
-        await bot.send_message(ADMIN_CHAT_ID, caption, parse_mode="Markdown")
+        await client.bot.send_message(ADMIN_CHAT_ID, caption, parse_mode="Markdown")
         logger.info("Уведомление о заказе отправлено.")
     except Exception as e:
         logger.error(f"Ошибка отправки заказа в Telegram: {e}")
 
-async def send_status_change_to_telegram_async(order):
-    """Уведомление об изменении статуса заказа."""
-    caption = (
-        f"📢 *Изменение статуса заказа!*\n\n"
-        f"🛒 Заказ №{order.id}\n"
-        f"👤 Пользователь: {order.user.username}\n"
-        f"💰 Сумма: {order.total_price} €\n"
-        f"➡️ Новый статус: {order.status}"
-    )
-    try:
-        await bot.send_message(ADMIN_CHAT_ID, caption, parse_mode="Markdown")
-        logger.info("Статус заказа отправлен.")
-    except Exception as e:
-        logger.error(f"Ошибка отправки статуса заказа: {e}")
+async def send_status_change_to_telegram_async(order, chat_id=None):
+    """
+    Уведомление об изменении статуса заказа.
+
+    Сообщение не отправляется сразу: смена попадает в сводку (app/status_digest.py), которую воркер
+    run_telegram_outbox отправит одним сообщением за окно ORDER_STATUS_DIGEST_WINDOW — при массовой
+    смене статусов чат не заваливается сообщениями на каждый заказ. Order.save, Order.change_status
+    и действия админки попадают в сводку сами; функция нужна, когда статус меняли в обход них (.update()).
+    """
+    await sync_to_async(status_digest.record)(order.status, [order.id], 1, chat_id=chat_id)
+    logger.info("Статус заказа #%s добавлен в сводку.", order.id)
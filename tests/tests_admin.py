@@ -0,0 +1,120 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import localdate
+
+from app.admin import _DrillDownQuerySet
+from app.models import DailySalesRollup, Order, OrderStatusEvent, Review, TelegramOutbox
+from app.pagination import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    """Списки заказов и отзывов в админке: число запросов не зависит от числа строк, массовые статусы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="boss", password="pass123", email="b@example.com")
+        cls.users = [User.objects.create_user(username=f"buyer{i}", password="pass123") for i in range(5)]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _orders(self, count, status="NEW"):
+        return [
+            Order.objects.create(
+                user=self.users[i % 5], total_price=Decimal("10.00"), delivery_address="Street", phone_number="1",
+                delivery_time="10:00", delivery_date=date(2030, 1, 1), status=status,
+            )
+            for i in range(count)
+        ]
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        url = reverse("admin:app_order_changelist")
+        self._orders(3)
+        for user in self.users[:3]:
+            Review.objects.create(user=user, rating=5, comment="")
+        few = self._queries(url), self._queries(reverse("admin:app_review_changelist"))
+        self._orders(12)
+        for user in self.users:
+            Review.objects.create(user=user, rating=4, comment="")
+        many = self._queries(url), self._queries(reverse("admin:app_review_changelist"))
+        self.assertEqual(few, many)
+
+    def test_paginator_caps_count(self):
+        self._orders(6)
+        paginator = EstimatedCountPaginator(Order.objects.filter(status="NEW").order_by("-id"), 2)
+        paginator.count_limit = 4
+        self.assertEqual((paginator.count, paginator.num_pages), (4, 2))
+        # Без фильтров — оценка по максимальному id
+        paginator = EstimatedCountPaginator(Order.objects.order_by("-id"), 2)
+        paginator.count_limit = 4
+        self.assertEqual(paginator.count, Order.objects.order_by("-id").first().pk)
+
+    def test_bulk_status_action(self):
+        new = self._orders(3)
+        done = self._orders(1, status="COMPLETED")
+        selected = [order.pk for order in new + done]
+
+        with self.assertNumQueries(10), self.captureOnCommitCallbacks(execute=True):
+            # сессия, админ, ограниченный COUNT списка, savepoint, id заказов, сводки (SELECT и upsert),
+            # UPDATE, событие для сводки статусов, release — независимо от числа выбранных заказов
+            response = self.client.post(reverse("admin:app_order_changelist"), {
+                "action": "mark_processing", "_selected_action": selected,
+            })
+        self.assertEqual(response.status_code, 302)
+
+        self.assertEqual(Order.objects.filter(status="PROCESSING").count(), 3)
+        self.assertEqual(Order.objects.get(pk=done[0].pk).status, "COMPLETED")
+        rollup = {
+            row.status: (row.order_count, row.revenue)
+            for row in DailySalesRollup.objects.filter(date=localdate()).exclude(order_count=0)
+        }
+        self.assertEqual(rollup, {"PROCESSING": (3, Decimal("30.00")), "COMPLETED": (1, Decimal("10.00"))})
+        # В Telegram — не сразу, а одной сводкой за окно (tests_status_digest)
+        event = OrderStatusEvent.objects.get()
+        self.assertEqual((event.status, event.order_count), ("PROCESSING", 3))
+        self.assertFalse(TelegramOutbox.objects.exists())
+
+    def test_list_editable_rejects_invalid_transition(self):
+        order = self._orders(1, status="COMPLETED")[0]
+        response = self.client.post(reverse("admin:app_order_changelist"), {
+            "form-TOTAL_FORMS": 1, "form-INITIAL_FORMS": 1,
+            "form-0-id": order.pk, "form-0-status": "NEW", "_save": "Сохранить",
+        })
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual(order.status, "COMPLETED")
+        self.assertFalse(OrderStatusEvent.objects.exists())
+
+    def test_date_hierarchy_matches_distinct_datetimes(self):
+        orders = self._orders(5)
+        moments = [(2024, 12, 31, 23), (2025, 1, 1, 0), (2025, 1, 15, 12), (2025, 3, 2, 8), (2025, 3, 2, 9)]
+        for order, moment in zip(orders, moments):
+            Order.objects.filter(pk=order.pk).update(created_at=datetime(*moment, tzinfo=timezone.utc))
+        drill_down = _DrillDownQuerySet(Order)
+        for kind in ("year", "month", "day"):
+            for order in ("ASC", "DESC"):
+                self.assertEqual(
+                    drill_down.datetimes("created_at", kind, order),
+                    list(Order.objects.datetimes("created_at", kind, order)),
+                )
+        # Поиск внутри уже отфильтрованного года — как в date_hierarchy
+        self.assertEqual(
+            drill_down.filter(created_at__year=2025).datetimes("created_at", "month"),
+            list(Order.objects.filter(created_at__year=2025).datetimes("created_at", "month")),
+        )
+        response = self.client.get(reverse("admin:app_order_changelist"), {"created_at__year": 2025})
+        self.assertContains(response, "created_at__month=3")
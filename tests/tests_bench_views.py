@@ -0,0 +1,23 @@
+import json
+
+from django.test import TestCase
+
+from benchmarks.bench_views import BUDGETS_FILE, over_budget, route_names, run, scenarios, seed
+
+
+class ViewBenchmarkTests(TestCase):
+    """Бенчмарк страниц на маленьком наборе данных: покрытие маршрутов и бюджеты запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed(scale=0.001)
+
+    def test_every_route_has_a_scenario(self):
+        self.assertEqual(set(route_names()) - set(scenarios(self.data)), set())
+
+    def test_query_budgets(self):
+        budgets = json.loads(BUDGETS_FILE.read_text())
+        results = run(self.data, repeat=1, warmup=1, only=list(budgets))
+        self.assertEqual({name: stats["status"] < 400 for name, stats in results.items()},
+                         dict.fromkeys(budgets, True))
+        self.assertEqual(over_budget(results, budgets), [])
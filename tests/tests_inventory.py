@@ -0,0 +1,120 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+
+from app import inventory
+from app.models import Product, CartItem, Order
+
+User = get_user_model()
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="holder", password="pass123")
+        self.product = Product.objects.create(name="Peony", price=Decimal("8.00"), stock=2, available=True)
+
+    def test_hold_reserves_stock_and_fills_cart(self):
+        inventory.hold(self.user, self.product)
+        inventory.hold(self.user, self.product)
+        self.product.refresh_from_db()
+        item = CartItem.objects.get(user=self.user, product=self.product)
+        self.assertEqual(self.product.stock, 0)
+        self.assertEqual((item.quantity, item.reserved_quantity), (2, 2))
+        self.assertIsNotNone(item.reserved_until)
+
+    def test_hold_never_oversells(self):
+        other = User.objects.create_user(username="rival", password="pass123")
+        inventory.hold(self.user, self.product, quantity=2)
+        with self.assertRaises(inventory.InsufficientStock):
+            inventory.hold(other, self.product)
+        self.assertFalse(CartItem.objects.filter(user=other).exists())
+
+    def test_release_returns_reserved_stock(self):
+        inventory.hold(self.user, self.product)
+        inventory.release(CartItem.objects.get(user=self.user))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 2)
+
+    def test_release_returns_only_what_it_deleted(self):
+        inventory.hold(self.user, self.product, quantity=2)
+        stale = CartItem.objects.get(user=self.user)
+        # Резерв уже вернул sweep, а в памяти осталась старая копия с reserved_quantity=2
+        CartItem.objects.update(reserved_until=now() - timedelta(minutes=1))
+        inventory.sweep_expired_holds()
+        self.assertEqual(inventory.release(stale), 0)
+        self.assertEqual(inventory.release(stale), 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 2)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_hold_joins_row_created_by_concurrent_request(self):
+        real_add = inventory._add_to_held
+        calls = []
+
+        def racing_add(user, product, quantity, until):
+            calls.append(quantity)
+            if len(calls) == 1:
+                # Параллельный запрос создал позицию между нашим UPDATE и INSERT
+                CartItem.objects.create(
+                    user=user, product=product, price=product.price, quantity=1, reserved_quantity=1,
+                )
+                return False
+            return real_add(user, product, quantity, until)
+
+        with patch("app.inventory._add_to_held", side_effect=racing_add):
+            inventory.hold(self.user, self.product)
+        item = CartItem.objects.get(user=self.user, product=self.product)
+        self.assertEqual((item.quantity, item.reserved_quantity), (2, 2))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+    def test_sweep_returns_expired_holds_in_bulk(self):
+        tulip = Product.objects.create(name="Tulip", price=Decimal("3.00"), stock=5, available=True)
+        inventory.hold(self.user, self.product)
+        inventory.hold(self.user, tulip, quantity=3)
+        CartItem.objects.update(reserved_until=now() - timedelta(minutes=1))
+
+        # savepoint, выборка, UPDATE товаров, UPDATE корзин, release — независимо от числа позиций
+        with self.assertNumQueries(5):
+            released = inventory.sweep_expired_holds()
+
+        self.assertEqual(released, 2)
+        self.assertEqual(
+            dict(Product.objects.values_list("name", "stock")),
+            {"Peony": 2, "Tulip": 5},
+        )
+        self.assertFalse(CartItem.objects.filter(reserved_quantity__gt=0).exists())
+        self.assertEqual(CartItem.objects.count(), 2)
+
+
+class CheckoutStockTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", password="pass123")
+        self.product = Product.objects.create(name="Iris", price=Decimal("4.00"), stock=3, available=True)
+        self.client.login(username="buyer", password="pass123")
+        self.post_data = {
+            "delivery_address": "1 Main St",
+            "phone_number": "111",
+            "delivery_time": "10:00",
+            "delivery_date": "2025-02-01",
+        }
+
+    def test_checkout_claims_unreserved_quantity(self):
+        CartItem.objects.create(user=self.user, product=self.product, quantity=2, price=self.product.price)
+        self.client.post(reverse("app:checkout"), self.post_data)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertTrue(Order.objects.filter(user=self.user).exists())
+
+    def test_checkout_fails_without_stock(self):
+        CartItem.objects.create(user=self.user, product=self.product, quantity=5, price=self.product.price)
+        response = self.client.post(reverse("app:checkout"), self.post_data)
+        self.assertRedirects(response, reverse("app:cart"), fetch_redirect_response=False)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+        self.assertFalse(Order.objects.exists())
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from app import metrics
+from app.models import Product
+
+User = get_user_model()
+
+
+class InstrumentationMiddlewareTests(TestCase):
+    """Метрики запросов: SQL, шаблоны, размер ответа, лог медленных запросов и /metrics/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="ops", password="pass123", is_staff=True)
+        cls.user = User.objects.create_user(username="shopper", password="pass123")
+        Product.objects.create(name="Rose", price=Decimal("10.00"), stock=5, available=True)
+
+    def setUp(self):
+        metrics.registry = metrics.Registry()
+
+    def _series(self, metric, view):
+        return metric._series[(view,)]
+
+    def test_records_queries_templates_and_size(self):
+        response = self.client.get(reverse("app:catalog"))
+        self.assertEqual(response.status_code, 200)
+        registry = metrics.registry
+        self.assertEqual(registry.requests._series[("app:catalog", "GET", 200)], 1)
+        counts, queries = self._series(registry.db_queries, "app:catalog")
+        self.assertEqual(sum(counts), 1)
+        self.assertGreater(queries, 0)
+        self.assertGreater(self._series(registry.template_time, "app:catalog")[1], 0)
+        self.assertEqual(self._series(registry.response_size, "app:catalog")[1], len(response.content))
+
+    def test_unmatched_paths_share_one_label(self):
+        self.client.get("/no-such-page-1/")
+        self.client.get("/no-such-page-2/")
+        self.assertEqual(metrics.registry.requests._series[("unmatched", "GET", 404)], 2)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_logs_queries(self):
+        with self.assertLogs("app.middleware", level="WARNING") as logs:
+            self.client.get(reverse("app:catalog"))
+        self.assertIn("app:catalog", logs.output[0])
+        self.assertIn("app_product", logs.output[0])
+        self.assertEqual(metrics.registry.slow_requests._series[("app:catalog",)], 1)
+
+    def test_endpoint_is_staff_only(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("app:metrics")).status_code, 302)
+
+    def test_endpoint_renders_prometheus_text(self):
+        self.client.get(reverse("app:catalog"))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("app:metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn("# TYPE flower_shop_request_duration_seconds histogram", body)
+        self.assertIn('flower_shop_request_duration_seconds_bucket{view="app:catalog",le="+Inf"} 1', body)
+        self.assertIn('flower_shop_requests_total{view="app:catalog",method="GET",status="200"} 1', body)
+
+    async def test_asgi_requests_count_queries_from_orm_threads(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("app:cart"))
+        self.assertEqual(response.status_code, 200)
+        counts, queries = self._series(metrics.registry.db_queries, "app:cart")
+        self.assertEqual(sum(counts), 1)
+        self.assertGreater(queries, 0)
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from app.notifications import NotificationClient
+
+
+class NotificationClientTests(SimpleTestCase):
+    def test_nothing_is_created_until_first_use(self):
+        client = NotificationClient(token="123:abc")
+        self.assertIsNone(client._bot)
+        self.assertIsNone(client._thread)
+
+    def test_bot_is_shared_and_pool_is_bounded(self):
+        client = NotificationClient(token="123:abc", pool_size=3)
+        self.assertIs(client.bot, client.bot)
+        self.assertEqual(client.bot.session._connector_init["limit"], 3)
+
+    @override_settings(BOT_TOKEN="broken")
+    def test_invalid_token_is_reported_on_first_use(self):
+        with self.assertRaises(ValueError):
+            NotificationClient().bot
+
+    def test_enqueue_runs_on_one_background_loop(self):
+        client = NotificationClient(token="123:abc")
+        names = []
+
+        async def job():
+            names.append(threading.current_thread().name)
+            return len(names)
+
+        try:
+            self.assertEqual(client.enqueue(job()).result(timeout=5), 1)
+            self.assertEqual(client.enqueue(job()).result(timeout=5), 2)
+        finally:
+            client.shutdown()
+        self.assertEqual(names, ["telegram-notifications"] * 2)
+        self.assertIsNone(client._thread)
+
+    def test_run_awaits_directly_in_attached_loop(self):
+        client = NotificationClient(token="123:abc")
+
+        async def job():
+            return threading.current_thread().name
+
+        async def main():
+            self.assertTrue(client.attach_running_loop())
+            return await client.run(job())
+
+        self.assertEqual(asyncio.run(main()), threading.current_thread().name)
+        self.assertIsNone(client._thread)
+
+    def test_run_from_foreign_loop_uses_client_loop(self):
+        client = NotificationClient(token="123:abc")
+
+        async def job():
+            return threading.current_thread().name
+
+        try:
+            self.assertEqual(asyncio.run(client.run(job())), "telegram-notifications")
+        finally:
+            client.shutdown()
+
+    @override_settings(TELEGRAM_API_URL="http://127.0.0.1:8081")
+    def test_custom_api_server(self):
+        client = NotificationClient(token="123:abc")
+        self.assertEqual(client.bot.session.api.base, "http://127.0.0.1:8081/bot{token}/{method}")
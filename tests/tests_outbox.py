@@ -0,0 +1,121 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+
+from app.models import Product, CartItem, TelegramOutbox
+from app.outbox import (
+    LEASE, OutboxDispatcher, RateLimiter, claim_batch, enqueue, mark_failed, mark_sent, renew_lease,
+)
+
+User = get_user_model()
+
+
+class CheckoutOutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="notify", password="pass123")
+        product = Product.objects.create(name="Aster", price=Decimal("6.00"), stock=5, available=True)
+        CartItem.objects.create(user=self.user, product=product, quantity=1, price=product.price)
+        self.client.login(username="notify", password="pass123")
+
+    def test_checkout_writes_notification_to_outbox(self):
+        self.client.post(reverse("app:checkout"), {
+            "delivery_address": "Outbox St",
+            "phone_number": "42",
+            "delivery_time": "09:00",
+            "delivery_date": "2025-04-01",
+        })
+        message = TelegramOutbox.objects.get()
+        self.assertEqual(message.status, "PENDING")
+        self.assertIn("notify", message.text)
+        self.assertIn("Outbox St", message.text)
+
+
+class NoDelayLimiter(RateLimiter):
+    async def wait(self, chat_id):
+        return None
+
+
+class OutboxDispatcherTests(TestCase):
+    def _dispatcher(self, side_effect=None):
+        bot = MagicMock()
+        bot.send_message = AsyncMock(side_effect=side_effect)
+        return OutboxDispatcher(bot, batch_size=10, limiter=NoDelayLimiter()), bot
+
+    async def test_successful_send_marks_message_sent(self):
+        message = await TelegramOutbox.objects.acreate(chat_id="1", text="hi")
+        dispatcher, bot = self._dispatcher()
+        self.assertEqual(await dispatcher.drain_once(), 1)
+        await message.arefresh_from_db()
+        self.assertEqual(message.status, "SENT")
+        bot.send_message.assert_awaited_once_with("1", "hi", parse_mode=None)
+
+    async def test_transient_error_schedules_retry_with_backoff(self):
+        message = await TelegramOutbox.objects.acreate(chat_id="1", text="hi")
+        dispatcher, _ = self._dispatcher(side_effect=ConnectionError("network"))
+        await dispatcher.drain_once()
+        await message.arefresh_from_db()
+        self.assertEqual((message.status, message.attempts), ("PENDING", 1))
+        self.assertGreater(message.next_attempt_at, now())
+        # Пока не наступил срок повтора, сообщение не выбирается повторно
+        self.assertEqual(await dispatcher.drain_once(), 0)
+
+    async def test_bad_request_fails_permanently(self):
+        message = await TelegramOutbox.objects.acreate(chat_id="1", text="hi")
+        dispatcher, _ = self._dispatcher(side_effect=TelegramBadRequest(method=MagicMock(), message="chat not found"))
+        await dispatcher.drain_once()
+        await message.arefresh_from_db()
+        self.assertEqual(message.status, "FAILED")
+
+    async def test_retry_after_postpones_rest_of_batch_without_counting_attempt(self):
+        first = await TelegramOutbox.objects.acreate(chat_id="1", text="one")
+        second = await TelegramOutbox.objects.acreate(chat_id="2", text="two")
+        dispatcher, bot = self._dispatcher(
+            side_effect=TelegramRetryAfter(method=MagicMock(), message="flood", retry_after=30)
+        )
+        await dispatcher.drain_once()
+        self.assertEqual(bot.send_message.await_count, 1)
+        for message in (first, second):
+            await message.arefresh_from_db()
+            self.assertEqual((message.status, message.attempts), ("PENDING", 0))
+        self.assertGreater(dispatcher.limiter.delay("1"), 20)
+
+
+class OutboxLeaseTests(TestCase):
+    def test_expired_lease_taken_by_another_worker_is_not_touched(self):
+        TelegramOutbox.objects.create(chat_id="1", text="hi")
+        [stale] = claim_batch(10)
+        # Аренда первого воркера истекла — сообщение забирает второй
+        TelegramOutbox.objects.update(next_attempt_at=now() - timedelta(seconds=1))
+        [fresh] = claim_batch(10)
+        self.assertFalse(renew_lease(stale))
+        self.assertFalse(mark_sent(stale))
+        mark_failed(stale, "boom", permanent=True)
+        self.assertEqual(TelegramOutbox.objects.get().status, "PENDING")
+        self.assertTrue(renew_lease(fresh))
+        self.assertTrue(mark_sent(fresh))
+        self.assertEqual(TelegramOutbox.objects.get().status, "SENT")
+
+    def test_lease_covers_rate_limited_batch(self):
+        limiter = RateLimiter(chat_interval=1.0, group_interval=3.0)
+        dispatcher = OutboxDispatcher(MagicMock(), batch_size=50, limiter=limiter)
+        self.assertGreaterEqual(dispatcher.lease, LEASE + timedelta(seconds=150))
+
+
+class RateLimiterTests(TestCase):
+    async def test_per_chat_and_group_intervals(self):
+        limiter = RateLimiter(per_second=10, chat_interval=1.0, group_interval=3.0, clock=lambda: 100.0)
+        await limiter.wait("5")
+        self.assertEqual(limiter.delay("5"), 1.0)
+        await limiter.wait("-7")
+        self.assertEqual(limiter.delay("-7"), 3.0)
+        # Другой чат ограничен только общим лимитом в 10 сообщений/с
+        self.assertAlmostEqual(limiter.delay("9"), 0.1)
+
+    def test_enqueue_stores_chat_id_as_text(self):
+        self.assertEqual(enqueue(12345, "text").chat_id, "12345")
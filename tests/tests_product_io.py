@@ -0,0 +1,143 @@
+import json
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from app import product_io, search
+from app.models import Product
+
+CSV_HEADER = "sku,name,price,available,stock,description,image\n"
+
+
+def _png(size=(400, 300), color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@override_settings(THUMBNAILS_ASYNC=False)
+class ProductImportTests(TestCase):
+    """import_products / export_products: пачки по SKU, ошибки строк, картинки, совместимость выгрузки."""
+
+    def setUp(self):
+        cache.clear()
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=str(self.dir / "media"))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _file(self, name, content):
+        path = self.dir / name
+        path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    def _import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command("import_products", path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_creates_and_updates_by_sku(self):
+        existing = Product.objects.create(sku="R-1", name="Роза", price=Decimal("10.00"), stock=1)
+        version = existing.updated_at
+        path = self._file("products.csv", CSV_HEADER + (
+            "R-1,Роза красная,12.50,1,7,,\n"
+            "T-1,Тюльпаны,\"5,00\",0,3,Весенний букет,\n"
+        ))
+        out, _ = self._import(path)
+        self.assertIn("создано: 1, обновлено: 1", out)
+
+        existing.refresh_from_db()
+        self.assertEqual((existing.name, existing.price, existing.stock), ("Роза красная", Decimal("12.50"), 7))
+        self.assertGreater(existing.updated_at, version)
+        tulips = Product.objects.get(sku="T-1")
+        self.assertEqual((tulips.price, tulips.available, tulips.description), (Decimal("5.00"), False, "Весенний букет"))
+        # bulk-операции обходят сигналы — индекс поиска обновляет сам импорт
+        self.assertEqual(search.search_ids("тюльпан", include_unavailable=True), [tulips.pk])
+
+        out, _ = self._import(path)
+        self.assertIn("создано: 0, обновлено: 0, без изменений: 2", out)
+
+    def test_queries_per_chunk_do_not_depend_on_rows(self):
+        rows = [(i, {"sku": f"S-{i}", "name": f"Букет {i}", "price": "1"}) for i in range(50)]
+        with self.assertNumQueries(5):  # SELECT по SKU, bulk INSERT, вставка в индекс поиска + savepoint
+            stats = product_io.import_products(rows, chunk_size=50, images=False)
+        self.assertEqual(stats["created"], 50)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        path = self._file("products.jsonl", "\n".join([
+            json.dumps({"sku": "A", "name": "Астры", "price": "3", "available": True}),
+            json.dumps({"sku": "B", "name": "Без цены"}),
+            "{broken",
+            json.dumps({"sku": "C", "name": "Минус", "price": "1", "stock": -1}),
+        ]))
+        out, err = self._import(path)
+        self.assertIn("создано: 1", out)
+        self.assertIn("ошибок: 3", out)
+        self.assertIn("строка 2: некорректная цена", err)
+        self.assertIn("строка 3: некорректный JSON", err)
+        self.assertEqual(list(Product.objects.values_list("sku", flat=True)), ["A"])
+
+    def test_dry_run_writes_nothing(self):
+        path = self._file("products.csv", CSV_HEADER + "N-1,Новый,1,1,1,,\n")
+        out, _ = self._import(path, "--dry-run")
+        self.assertIn("Проверка без записи. Строк: 1, создано: 1", out)
+        self.assertFalse(Product.objects.exists())
+
+    def test_images_are_stored_once_by_content(self):
+        (self.dir / "rose.png").write_bytes(_png())
+        (self.dir / "copy.png").write_bytes(_png())
+        (self.dir / "bad.png").write_bytes(b"not an image")
+        path = self._file("products.csv", CSV_HEADER + (
+            "I-1,Роза,1,1,1,,rose.png\n"
+            "I-2,Роза 2,1,1,1,,copy.png\n"
+            "I-3,Роза 3,1,1,1,,bad.png\n"
+        ))
+        with self.captureOnCommitCallbacks(execute=True):
+            _, err = self._import(path, "--images-dir", str(self.dir))
+
+        first, second, third = Product.objects.order_by("sku")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith("products/") and first.image.name.endswith(".png"))
+        self.assertFalse(third.image)
+        self.assertIn("файл не является картинкой: bad.png", err)
+        # Превью строятся как для картинок из админки
+        self.assertTrue(first.has_thumbnails)
+
+    def test_image_paths_stay_inside_images_dir(self):
+        (self.dir / "rose.png").write_bytes(_png())
+        images_dir = self.dir / "images"
+        images_dir.mkdir()
+        for source in (str(self.dir / "rose.png"), "../rose.png"):
+            with self.subTest(source=source), self.assertRaisesMessage(product_io.ImportRowError, "относительным"):
+                product_io.fetch_image(source, images_dir)
+
+    def test_export_round_trips_through_import(self):
+        Product.objects.create(sku="E-1", name="Эустома", price=Decimal("9.90"), stock=2, available=False,
+                               description="Нежная, \"пастельная\"")
+        Product.objects.create(name="Без артикула", price=Decimal("1.00"))
+        image = default_storage.save("products/eustoma.png", ContentFile(_png()))
+        Product.objects.create(sku="E-2", name="С картинкой", price=Decimal("2.00"), image=image)
+        for fmt in ("csv", "jsonl"):
+            path = str(self.dir / f"export.{fmt}")
+            call_command("export_products", path, stdout=StringIO(), stderr=StringIO())
+            out, err = self._import(path)
+            # Строка без SKU — ошибка, остальное (и картинка из хранилища) совпадает с базой
+            self.assertIn("без изменений: 2, ошибок: 1", out)
+            self.assertNotIn("картинка", err)
+        self.assertEqual(Product.objects.get(sku="E-2").image.name, image)
+
+        out = StringIO()
+        call_command("export_products", "--format", "jsonl", stdout=out)
+        first = json.loads(out.getvalue().splitlines()[0])
+        self.assertEqual(first["price"], "9.90")
+        self.assertIs(first["available"], False)
@@ -0,0 +1,101 @@
+import re
+from datetime import date
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from app.models import CartItem, Order, OrderItem, Product, ProductCoPurchase
+from app.pagination import encode_cursor
+
+User = get_user_model()
+
+# Таблицы, полный просмотр которых в горячих страницах недопустим.
+# Сводки продаж (app_dailysalesrollup) растут как O(дней) и читаются целиком намеренно.
+HOT_TABLES = {'app_product', 'app_order', 'app_orderitem', 'app_cartitem', 'app_productcopurchase', 'auth_user'}
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN — синтаксис SQLite")
+class HotQueryPlanTests(TestCase):
+    """Регрессия планов: запросы горячих страниц должны идти по индексам, а не полным просмотром."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="planner", password="pass123")
+        cls.admin = User.objects.create_superuser(username="boss", password="pass123", email="b@example.com")
+        products = [
+            Product.objects.create(name=f"Flower {i}", price=Decimal(i + 1), stock=5, available=True)
+            for i in range(5)
+        ]
+        cls.product = products[0]
+        for i in range(3):
+            order = Order.objects.create(
+                user=cls.user, total_price=Decimal("3.00"), delivery_address="Street", phone_number="1",
+                delivery_time="10:00", delivery_date=date(2030, 1, 1),
+            )
+            OrderItem.objects.create(order=order, product=products[i], quantity=1, price=products[i].price)
+        CartItem.objects.create(user=cls.user, product=products[1], quantity=1, price=products[1].price)
+        ProductCoPurchase.objects.create(product=products[0], related_product=products[1], count=2)
+
+    def setUp(self):
+        cache.clear()
+
+    def _plans(self, url, user=None):
+        """(строка плана, SQL) для каждого SELECT, выполненного при открытии страницы."""
+        if user is not None:
+            self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans.extend((row[-1], sql) for row in cursor.fetchall())
+        return plans
+
+    def _full_scans(self, url, user=None):
+        return [
+            (detail, sql) for detail, sql in self._plans(url, user)
+            if (match := FULL_SCAN.match(detail)) and match.group(1) in HOT_TABLES
+        ]
+
+    def _sorts(self, url, user=None):
+        return [(detail, sql) for detail, sql in self._plans(url, user) if 'TEMP B-TREE' in detail]
+
+    def test_catalog(self):
+        for query in ("", "?sort=-price", "?sort=name", "?sort=price&min_price=2"):
+            url = reverse("app:catalog") + query
+            self.assertEqual(self._full_scans(url), [])
+            # Keyset-страница читается прямо в порядке индекса, без сортировки
+            self.assertEqual(self._sorts(url), [])
+
+    def test_catalog_api(self):
+        url = reverse("app:catalog_api") + "?sort=name"
+        self.assertEqual(self._full_scans(url), [])
+        self.assertEqual(self._sorts(url), [])
+
+    def test_product_detail(self):
+        self.assertEqual(self._full_scans(reverse("app:product_detail", args=[self.product.pk])), [])
+
+    def test_cart(self):
+        self.assertEqual(self._full_scans(reverse("app:cart"), self.user), [])
+
+    def test_order_history(self):
+        newest = Order.objects.filter(user=self.user).latest('created_at', 'id')
+        cursor = encode_cursor([newest.created_at, newest.pk])
+        for url in (reverse("app:order_history"), f"{reverse('app:order_history')}?cursor={cursor}"):
+            self.assertEqual(self._full_scans(url, self.user), [])
+            self.assertEqual(self._sorts(url, self.user), [])
+
+    def test_analytics(self):
+        self.assertEqual(self._full_scans(reverse("app:analytics"), self.admin), [])
@@ -0,0 +1,95 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+
+from app.models import Product, Order, OrderItem, ProductCoPurchase, RecommendationIndexState
+from app.recommendations import update_index, top_neighbours
+
+User = get_user_model()
+
+
+class RecommendationIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="buyer", password="pass123")
+        self.rose, self.tulip, self.lily, self.fern = (
+            Product.objects.create(name=name, price=Decimal("5.00"), stock=10, available=True)
+            for name in ("Rose", "Tulip", "Lily", "Fern")
+        )
+
+    def _order(self, *products, age=timedelta(hours=1)):
+        order = Order.objects.create(
+            user=self.user,
+            total_price=Decimal("0.00"),
+            delivery_address="Test",
+            phone_number="123",
+            delivery_time="12:00",
+            delivery_date="2025-01-20",
+        )
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+        # В индекс попадают только заказы старше SETTLE_SECONDS
+        Order.objects.filter(pk=order.pk).update(created_at=now() - age)
+        order.refresh_from_db()
+        return order
+
+    def test_neighbours_ranked_by_copurchase_count(self):
+        self._order(self.rose, self.tulip)
+        self._order(self.rose, self.tulip, self.lily)
+        self._order(self.rose, self.lily, self.lily)
+        self._order(self.rose, self.tulip)
+        update_index()
+        self.assertEqual(top_neighbours(self.rose.pk), [self.tulip.pk, self.lily.pk])
+        self.assertEqual(
+            ProductCoPurchase.objects.get(product=self.lily, related_product=self.rose).count, 2
+        )
+
+    def test_incremental_update_only_adds_new_orders(self):
+        self._order(self.rose, self.fern)
+        self.assertEqual(update_index(), 1)
+        self._order(self.rose, self.fern)
+        self.assertEqual(update_index(), 1)
+        self.assertEqual(update_index(), 0)
+        self.assertEqual(ProductCoPurchase.objects.get(product=self.rose, related_product=self.fern).count, 2)
+        self.assertEqual(top_neighbours(self.rose.pk), [self.fern.pk])
+
+    def test_recent_orders_wait_for_settle_window(self):
+        self._order(self.rose, self.fern, age=timedelta(hours=2))
+        late = self._order(self.rose, self.tulip, age=timedelta(seconds=0))
+        self.assertEqual(update_index(), 1)
+        # Заказ закоммитился позже, но старше водяного знака его created_at не стал — он не потерян
+        Order.objects.filter(pk=late.pk).update(created_at=now() - timedelta(hours=1))
+        self.assertEqual(update_index(), 1)
+        self.assertEqual(set(top_neighbours(self.rose.pk)), {self.fern.pk, self.tulip.pk})
+
+    def test_editing_indexed_order_triggers_rebuild(self):
+        order = self._order(self.rose, self.tulip)
+        self.assertEqual(top_neighbours(self.rose.pk), [])
+        update_index()
+        self.assertEqual(top_neighbours(self.rose.pk), [self.tulip.pk])
+        OrderItem.objects.create(order=order, product=self.lily, quantity=1, price=self.lily.price)
+        OrderItem.objects.filter(order=order, product=self.tulip).delete()
+        self.assertTrue(RecommendationIndexState.objects.get().dirty)
+        self.assertEqual(update_index(), 1)
+        self.assertEqual(top_neighbours(self.rose.pk), [self.lily.pk])
+        self.assertFalse(ProductCoPurchase.objects.filter(related_product=self.tulip).exists())
+
+    def test_full_rebuild_matches_incremental(self):
+        self._order(self.rose, self.tulip)
+        update_index()
+        self._order(self.rose, self.tulip)
+        call_command("rebuild_recommendations", "--full", stdout=StringIO())
+        self.assertEqual(ProductCoPurchase.objects.get(product=self.rose, related_product=self.tulip).count, 2)
+
+    def test_product_detail_shows_copurchased_products(self):
+        self._order(self.rose, self.lily)
+        update_index()
+        response = self.client.get(reverse("app:product_detail", args=[self.rose.pk]))
+        self.assertEqual([p.pk for p in response.context["recommended_products"]], [self.lily.pk])
@@ -0,0 +1,190 @@
+from datetime import date
+from io import BytesIO, StringIO
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import localdate
+
+from app import rollups
+from app.models import DailySalesRollup, Order, OrderItem, Product, ProductDailyRollup, Review, ReviewRatingRollup
+
+User = get_user_model()
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", password="pass123")
+        self.rose = Product.objects.create(name="Rose", price=Decimal("10.00"), stock=10, available=True)
+        self.today = localdate()
+
+    def _order(self, total="20.00", status="NEW"):
+        return Order.objects.create(
+            user=self.user,
+            total_price=Decimal(total),
+            delivery_address="Street 1",
+            phone_number="123456",
+            delivery_time="10:00",
+            delivery_date=date(2030, 1, 1),
+            status=status,
+        )
+
+    def _daily(self):
+        return {
+            row.status: (row.order_count, row.revenue)
+            for row in DailySalesRollup.objects.filter(date=self.today).exclude(order_count=0)
+        }
+
+    def test_orders_are_added_to_daily_rollup(self):
+        self._order("20.00")
+        self._order("5.50")
+        self.assertEqual(self._daily(), {"NEW": (2, Decimal("25.50"))})
+        self.assertEqual(rollups.sales_summary(self.today, self.today), (2, Decimal("25.50")))
+
+    def test_status_change_moves_order_between_rollup_rows(self):
+        order = self._order("20.00")
+        order.status = "COMPLETED"
+        order.save()
+        self.assertEqual(self._daily(), {"COMPLETED": (1, Decimal("20.00"))})
+
+    def test_delete_subtracts_order_and_items(self):
+        order = self._order("20.00")
+        OrderItem.objects.create(order=order, product=self.rose, quantity=2, price=Decimal("10.00"))
+        order.delete()
+        self.assertEqual(self._daily(), {})
+        self.assertFalse(ProductDailyRollup.objects.exclude(quantity=0).exists())
+
+    def test_item_edits_adjust_product_rollup(self):
+        order = self._order("20.00")
+        item = OrderItem.objects.create(order=order, product=self.rose, quantity=2, price=Decimal("10.00"))
+        item.quantity = 3
+        item.save()
+        rollup = ProductDailyRollup.objects.get(date=self.today, product=self.rose)
+        self.assertEqual((rollup.quantity, rollup.revenue), (3, Decimal("30.00")))
+
+    def test_backfill_rebuilds_rollups_from_orders(self):
+        order = self._order("20.00")
+        OrderItem.objects.create(order=order, product=self.rose, quantity=2, price=Decimal("10.00"))
+        DailySalesRollup.objects.all().delete()
+        ProductDailyRollup.objects.update(quantity=0, revenue=0)
+
+        call_command("backfill_rollups", stdout=StringIO())
+
+        self.assertEqual(self._daily(), {"NEW": (1, Decimal("20.00"))})
+        rollup = ProductDailyRollup.objects.get(date=self.today, product=self.rose)
+        self.assertEqual((rollup.quantity, rollup.revenue), (2, Decimal("20.00")))
+
+    def test_analytics_view_reads_rollups(self):
+        self._order("20.00")
+        self._order("7.00", status="COMPLETED")
+        User.objects.create_superuser(username="admin", password="pass123", email="a@example.com")
+        self.client.login(username="admin", password="pass123")
+
+        response = self.client.get(reverse("app:analytics"))
+
+        self.assertEqual(response.context["total_orders"], 2)
+        self.assertEqual(response.context["total_revenue"], Decimal("27.00"))
+        self.assertEqual(response.context["total_orders_today"], 2)
+        self.assertEqual(len(response.context["orders_today"]), 2)
+
+
+class AnalyticsApiTests(TestCase):
+    def setUp(self):
+        self.today = localdate()
+        buyer = User.objects.create_user(username="buyer", password="pass123")
+        rose = Product.objects.create(name="Rose", price=Decimal("10.00"), stock=10, available=True)
+        tulip = Product.objects.create(name="Tulip", price=Decimal("3.00"), stock=10, available=True)
+        for total, items in (("20.00", [(rose, 2)]), ("16.00", [(rose, 1), (tulip, 2)])):
+            order = Order.objects.create(
+                user=buyer, total_price=Decimal(total), delivery_address="Street 1",
+                phone_number="123456", delivery_time="10:00", delivery_date=date(2030, 1, 1),
+            )
+            for product, quantity in items:
+                OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+        User.objects.create_superuser(username="admin", password="pass123", email="a@example.com")
+        self.client.login(username="admin", password="pass123")
+        self.params = {"start": self.today.isoformat(), "end": self.today.isoformat()}
+
+    def test_report_totals_series_and_top_products(self):
+        for granularity in ("hour", "day", "week"):
+            response = self.client.get(reverse("app:analytics_api"), {**self.params, "granularity": granularity})
+            data = response.json()
+            self.assertEqual(data["totals"], {"orders": 2, "revenue": "36.00", "average_basket": "18.00"})
+            self.assertEqual(len(data["series"]), 1)
+        self.assertEqual([row["name"] for row in data["top_products"]], ["Rose", "Tulip"])
+        self.assertEqual(data["top_products"][0]["quantity"], 3)
+
+    def test_invalid_range_is_rejected(self):
+        response = self.client.get(reverse("app:analytics_api"), {"start": "2030-02-01", "end": "2030-01-01"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_csv_export_streams_order_items(self):
+        response = self.client.get(reverse("app:analytics_export"), self.params)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["order_id", "created_at", "status"])
+        self.assertEqual(len(lines), 4)
+
+    def test_parquet_export(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            response = self.client.get(reverse("app:analytics_export"), {**self.params, "format": "parquet"})
+            self.assertEqual(response.status_code, 501)
+            return
+        response = self.client.get(reverse("app:analytics_export"), {**self.params, "format": "parquet"})
+        table = pq.read_table(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(sum(table.column("quantity").to_pylist()), 5)
+
+
+class RatingSummaryTests(TestCase):
+    """Гистограмма оценок поддерживается сигналами Review, сводка кэшируется."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="reviewer", password="pass123")
+
+    def _review(self, rating):
+        return Review.objects.create(user=self.user, rating=rating, text="ok", comment="")
+
+    def _counts(self):
+        return {row["rating"]: row["count"] for row in rollups.rating_summary()["histogram"] if row["count"]}
+
+    def test_summary_follows_saves_and_deletes(self):
+        self._review(5)
+        self._review(5)
+        changed = self._review(4)
+        removed = self._review(1)
+        changed.rating = 2
+        changed.save()
+        removed.delete()
+
+        summary = rollups.rating_summary()
+        self.assertEqual(self._counts(), {5: 2, 2: 1})
+        self.assertEqual(summary["count"], 3)
+        self.assertEqual(summary["mean"], Decimal("4.00"))
+        self.assertEqual([row["rating"] for row in summary["histogram"]], [5, 4, 3, 2, 1])
+        self.assertEqual(summary["histogram"][0]["percent"], 67)
+
+    def test_cached_summary_needs_no_queries(self):
+        self._review(3)
+        rollups.rating_summary()
+        with self.assertNumQueries(0):
+            self.assertEqual(rollups.rating_summary()["count"], 1)
+        self._review(5)
+        self.assertEqual(rollups.rating_summary()["mean"], Decimal("4.00"))
+
+    def test_empty_summary(self):
+        summary = rollups.rating_summary()
+        self.assertEqual((summary["count"], summary["mean"]), (0, None))
+
+    def test_backfill_counts_bulk_created_reviews(self):
+        Review.objects.bulk_create([Review(user=self.user, rating=4, comment="") for _ in range(3)])
+        self.assertEqual(rollups.rating_summary()["count"], 0)
+        call_command("backfill_rollups", stdout=StringIO())
+        self.assertEqual(self._counts(), {4: 3})
+        self.assertEqual(ReviewRatingRollup.objects.count(), 1)
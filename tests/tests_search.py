@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from app import search
+from app.models import Product
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_stem(self):
+        self.assertEqual({search.stem(word) for word in ("роза", "розы", "розами", "розой")}, {"роз"})
+        self.assertEqual(search.stem("красные"), search.stem("красный"))
+        self.assertEqual(search.stem("Пионовый"), search.stem("пионовые"))
+
+    def test_latin_and_numbers_are_kept(self):
+        self.assertEqual(search.terms("Mix 25 ёлочка"), ["mix", "25", search.stem("елочка")])
+
+
+class SearchIndexTests(TestCase):
+    """Индекс FTS5 обновляется сигналами Product, выдача ранжируется BM25."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _product(self, name, description="", **kwargs):
+        return Product.objects.create(name=name, description=description, price=Decimal("10.00"), stock=5, **kwargs)
+
+    def test_finds_other_word_forms_and_prefixes(self):
+        roses = self._product("Букет красных роз")
+        self._product("Тюльпаны")
+        self.assertEqual(search.search_ids("красная роза"), [roses.pk])
+        self.assertEqual(search.search_ids("розовый"), [])
+        self.assertEqual(search.search_ids("крас"), [roses.pk])
+
+    def test_name_match_ranks_above_description(self):
+        in_description = self._product("Весенний букет", "Пионы и розы")
+        in_name = self._product("Пионы", "Нежный букет")
+        self.assertEqual(search.search_ids("пионы"), [in_name.pk, in_description.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        product = self._product("Ромашки")
+        product.name = "Лилии"
+        product.save()
+        self.assertEqual(search.search_ids("ромашки"), [])
+        self.assertEqual(search.search_ids("лилия"), [product.pk])
+        product.delete()
+        self.assertEqual(search.search_ids("лилия"), [])
+
+    def test_unavailable_products_are_hidden(self):
+        hidden = self._product("Орхидея", available=False)
+        self.assertEqual(search.search_ids("орхидея"), [])
+        self.assertEqual(search.search_ids("орхидея", include_unavailable=True), [hidden.pk])
+
+    def test_rebuild_indexes_bulk_created_products(self):
+        Product.objects.bulk_create([Product(name="Гортензия", price=Decimal("5.00"))])
+        self.assertEqual(search.search_ids("гортензии"), [])
+        self.assertEqual(search.rebuild(), 1)
+        self.assertEqual(len(search.search_ids("гортензии")), 1)
+
+    def test_search_page(self):
+        self._product("Букет красных роз")
+        self._product("Тюльпаны")
+        response = self.client.get(reverse("app:search"), {"q": "розы"})
+        self.assertContains(response, "Букет красных роз")
+        self.assertNotContains(response, "Тюльпаны")
+        with self.assertNumQueries(1):
+            self.client.get(reverse("app:search"), {"q": "розы"})
+
+    def test_empty_query_does_not_hit_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("app:search"), {"q": "  "})
+        self.assertContains(response, "Введите название")
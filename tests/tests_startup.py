@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.test import SimpleTestCase
+
+from benchmarks.bench_startup import PROJECT_DIR, over_budget, run
+
+# Бюджет холодного старта в секундах; на медленных CI можно поднять через переменную окружения
+STARTUP_BUDGET = float(os.environ.get("STARTUP_BUDGET_SECONDS", "10"))
+
+IMPORT_PROBE = """
+import json, sys, threading
+import django
+django.setup()
+threads = threading.active_count()
+import app.urls, app.views, app.product_io, flower_shop.telegram_utills
+print(json.dumps({
+    "aiogram": "aiogram" in sys.modules,
+    "pil": "PIL" in sys.modules,
+    "new_threads": threading.active_count() - threads,
+}))
+"""
+
+
+class StartupTests(SimpleTestCase):
+    def test_importing_web_modules_has_no_telegram_side_effects(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="flower_shop.settings")
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE],
+            cwd=PROJECT_DIR, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        self.assertEqual(probe, {"aiogram": False, "pil": False, "new_threads": 0})
+
+    def test_cold_start_within_budget(self):
+        results = run(repeat=1)
+        self.assertEqual(over_budget(results, {"check": STARTUP_BUDGET, "wsgi": STARTUP_BUDGET}), [])
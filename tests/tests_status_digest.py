@@ -0,0 +1,121 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+
+from app import services, status_digest
+from app.models import InvalidStatusTransition, Order, OrderStatusEvent, TelegramOutbox
+from app.outbox import OutboxDispatcher, RateLimiter
+from flower_shop.telegram_utills import send_status_change_to_telegram_async
+
+User = get_user_model()
+
+
+class NoDelayLimiter(RateLimiter):
+    async def wait(self, chat_id):
+        return None
+
+
+@override_settings(ADMIN_CHAT_ID="100")
+class StatusDigestTests(TestCase):
+    """Переходы статусов заказа и сводка смен статусов в Telegram за окно."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="buyer", password="pass123")
+
+    def _orders(self, count, status="NEW"):
+        return [
+            Order.objects.create(
+                user=self.user, total_price=Decimal("10.00"), delivery_address="Street", phone_number="1",
+                delivery_time="10:00", delivery_date=date(2030, 1, 1), status=status,
+            )
+            for _ in range(count)
+        ]
+
+    def _flush_later(self, seconds=None):
+        return status_digest.flush(now() + timedelta(seconds=status_digest.WINDOW if seconds is None else seconds))
+
+    def test_transitions(self):
+        order = self._orders(1)[0]
+        order.change_status("PROCESSING")
+        order.change_status("COMPLETED")
+        with self.assertRaises(InvalidStatusTransition):
+            order.change_status("NEW")
+        self.assertEqual(Order.objects.get(pk=order.pk).status, "COMPLETED")
+        self.assertEqual(Order.statuses_leading_to("CANCELLED"), ("NEW", "PROCESSING"))
+
+        loaded = Order.objects.get(pk=order.pk)
+        loaded.status = "PROCESSING"
+        with self.assertRaises(ValidationError):
+            loaded.clean()
+
+    def test_events_are_coalesced_into_one_digest_per_window(self):
+        orders = self._orders(30)
+        orders[0].change_status("CANCELLED")
+        services.bulk_set_status(Order.objects.filter(status="NEW"), "PROCESSING")
+        Order.objects.get(pk=orders[1].pk).change_status("COMPLETED")
+        self.assertEqual(OrderStatusEvent.objects.count(), 3)
+
+        # Окно ещё открыто — в Telegram ничего не уходит
+        self.assertEqual(status_digest.flush(), 0)
+        self.assertEqual(self._flush_later(), 1)
+        message = TelegramOutbox.objects.get()
+        self.assertEqual((message.chat_id, message.parse_mode), ("100", "Markdown"))
+        self.assertIn("Отменён — заказов: 1", message.text)
+        self.assertIn("В обработке — заказов: 29", message.text)
+        self.assertIn("и ещё 9", message.text)
+        self.assertIn("Завершён — заказов: 1", message.text)
+        self.assertFalse(OrderStatusEvent.objects.exists())
+        self.assertEqual(self._flush_later(), 0)
+
+    def test_unchanged_status_emits_nothing(self):
+        order = self._orders(1)[0]
+        order.total_price = Decimal("12.00")
+        order.save()
+        self.assertFalse(OrderStatusEvent.objects.exists())
+
+    def test_digests_are_per_chat(self):
+        status_digest.record("PROCESSING", [1], 1, chat_id="200")
+        status_digest.record("PROCESSING", [2], 1)
+        self.assertEqual(self._flush_later(), 2)
+        self.assertEqual(set(TelegramOutbox.objects.values_list("chat_id", flat=True)), {"100", "200"})
+
+    def test_events_taken_by_another_worker_are_not_sent_twice(self):
+        status_digest.record("PROCESSING", [1], 1)
+        # Второй воркер успел забрать события после того, как этот увидел чат в due_chats
+        self.assertEqual(len(status_digest._take_events("100")), 1)
+        with patch("app.status_digest.due_chats", return_value=["100"]):
+            self.assertEqual(self._flush_later(), 0)
+        self.assertFalse(TelegramOutbox.objects.exists())
+
+    async def test_dispatcher_survives_locked_database_in_flush(self):
+        await TelegramOutbox.objects.acreate(chat_id="1", text="hi")
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        dispatcher = OutboxDispatcher(
+            bot, limiter=NoDelayLimiter(), before_drain=MagicMock(side_effect=OperationalError("database is locked")),
+        )
+        with self.assertLogs("app.outbox", level="WARNING"):
+            self.assertEqual(await dispatcher.drain_once(), 1)
+
+    async def test_async_helper_and_dispatcher_send_digest(self):
+        orders = await Order.objects.abulk_create([
+            Order(user=self.user, total_price=Decimal("5.00"), delivery_address="Street", phone_number="1",
+                  delivery_time="10:00", delivery_date=date(2030, 1, 1), status="CANCELLED")
+        ])
+        await send_status_change_to_telegram_async(orders[0])
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        dispatcher = OutboxDispatcher(
+            bot, limiter=NoDelayLimiter(), before_drain=lambda: status_digest.flush(window=0),
+        )
+        self.assertEqual(await dispatcher.drain_once(), 1)
+        chat_id, text = bot.send_message.await_args.args
+        self.assertEqual(chat_id, "100")
+        self.assertIn(f"#{orders[0].pk}", text)
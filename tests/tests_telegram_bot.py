@@ -0,0 +1,131 @@
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils.timezone import now
+
+from app.models import Order
+from app.telegram_bot import (
+    ADMIN_CHAT_ID,
+    MESSAGE_LIMIT,
+    ORDERS_PER_PAGE,
+    fetch_orders_page,
+    order_status_command,
+    orders_page_callback,
+    render_orders_page,
+)
+
+User = get_user_model()
+
+
+class FakeChat:
+    def __init__(self, id):
+        self.id = id
+
+
+class FakeMessage:
+    def __init__(self, chat_id, text=""):
+        self.chat = FakeChat(chat_id)
+        self.text = text
+        self.answer = AsyncMock()
+        self.edit_text = AsyncMock()
+
+
+class FakeCallbackQuery:
+    def __init__(self, data, chat_id):
+        self.data = data
+        self.message = FakeMessage(chat_id)
+        self.answer = AsyncMock()
+
+
+class OrderStatusPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username="botuser", password="pass123")
+        cls.orders = [
+            Order.objects.create(
+                user=user,
+                total_price=Decimal("10.00"),
+                delivery_address=f"Street {i}",
+                phone_number="1",
+                delivery_time="10:00",
+                delivery_date="2025-01-01",
+                status="COMPLETED" if i % 2 else "NEW",
+            )
+            for i in range(5)
+        ]
+
+    async def test_pages_walk_older_and_back_newer(self):
+        ids = [order.id for order in reversed(self.orders)]
+        first, has_newer, has_older = await fetch_orders_page(per_page=2)
+        self.assertEqual([o.id for o in first], ids[:2])
+        self.assertEqual((has_newer, has_older), (False, True))
+
+        second, has_newer, has_older = await fetch_orders_page(None, "older", first[-1].id, per_page=2)
+        self.assertEqual([o.id for o in second], ids[2:4])
+        self.assertEqual((has_newer, has_older), (True, True))
+
+        back, has_newer, has_older = await fetch_orders_page(None, "newer", second[0].id, per_page=2)
+        self.assertEqual([o.id for o in back], ids[:2])
+        self.assertFalse(has_newer)
+
+    async def test_command_sends_single_message_with_status_filter(self):
+        message = FakeMessage(int(ADMIN_CHAT_ID), text="/order_status completed")
+        await order_status_command(message)
+        message.answer.assert_awaited_once()
+        text = message.answer.await_args.args[0]
+        self.assertIn("Street 1", text)
+        self.assertIn("Street 3", text)
+        self.assertNotIn("Street 0", text)
+
+    async def test_command_without_orders(self):
+        message = FakeMessage(int(ADMIN_CHAT_ID), text="/order_status cancelled")
+        await order_status_command(message)
+        message.answer.assert_awaited_once_with("Нет заказов.")
+
+    async def test_callback_edits_message_in_place(self):
+        callback = FakeCallbackQuery(f"orders:NEW:older:{self.orders[4].id}", int(ADMIN_CHAT_ID))
+        await orders_page_callback(callback)
+        callback.message.edit_text.assert_awaited_once()
+        text = callback.message.edit_text.await_args.args[0]
+        self.assertIn("Street 2", text)
+        self.assertNotIn("Street 4", text)
+
+    async def test_callback_rejects_non_admin(self):
+        callback = FakeCallbackQuery("orders:ALL:first:0", 11111)
+        await orders_page_callback(callback)
+        callback.message.edit_text.assert_not_awaited()
+
+
+    def test_page_with_longest_fields_fits_message_limit(self):
+        user = User(username="u" * 150)
+        orders = [
+            Order(id=10 ** 9 + i, user=user, total_price=Decimal("99999999.99"), delivery_address="а" * 255,
+                  status="PROCESSING", created_at=now())
+            for i in range(ORDERS_PER_PAGE)
+        ]
+        text, _ = render_orders_page(orders, "PROCESSING", True, True)
+        self.assertLessEqual(len(text), MESSAGE_LIMIT)
+        self.assertIn("а" * 79 + "…", text)
+
+
+class RepeatOrderCallbackTests(TestCase):
+    async def test_new_rows_are_not_incremented_twice(self):
+        from app.models import CartItem, OrderItem, Product
+        from app.telegram_bot import repeat_order_callback
+
+        user = await User.objects.acreate(username="repeater")
+        rose = await Product.objects.acreate(name="Rose", price=Decimal("10.00"), stock=5, available=True)
+        order = await Order.objects.acreate(
+            user=user, total_price=Decimal("20.00"), delivery_address="Street", phone_number="1",
+            delivery_time="10:00", delivery_date="2025-01-01",
+        )
+        await OrderItem.objects.acreate(order=order, product=rose, quantity=2, price=rose.price)
+
+        callback = FakeCallbackQuery(f"repeat_order:{order.id}", int(ADMIN_CHAT_ID))
+        await repeat_order_callback(callback)
+
+        callback.answer.assert_awaited_once_with("Товары добавлены в корзину.", show_alert=True)
+        item = await CartItem.objects.aget(user=user)
+        self.assertEqual(item.quantity, 2)
@@ -0,0 +1,95 @@
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from app import thumbnails
+from app.models import Product
+
+
+def _upload(name="rose.png", size=(800, 600), color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+@override_settings(THUMBNAILS_ASYNC=False)
+class ThumbnailTests(TestCase):
+    """Превью картинок товаров: генерация после коммита, хеш в именах, srcset в карточках."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+
+    def _create(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="Rose", price=Decimal("10.00"), stock=5, **kwargs)
+        product.refresh_from_db()
+        return product
+
+    def test_upload_builds_jpeg_and_webp_variants(self):
+        product = self._create()
+        product.image = _upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+            saved_at = product.updated_at
+        product.refresh_from_db()
+        self.assertTrue(product.has_thumbnails)
+        # Запись превью в обход save() тоже сдвигает версию фрагментов карточки
+        self.assertGreater(product.updated_at, saved_at)
+        # Ширины не больше исходника: 1280 пропускается для картинки шириной 800
+        self.assertEqual(set(product.thumbnails["jpeg"]), {"160", "320", "640"})
+        self.assertEqual(set(product.thumbnails["webp"]), {"160", "320", "640"})
+        with default_storage.open(product.thumbnails["webp"]["320"]) as thumb:
+            image = Image.open(thumb)
+            self.assertEqual((image.format, image.size), ("WEBP", (320, 240)))
+
+    def test_names_are_content_hashed(self):
+        first = self._create(image=_upload("a.png"))
+        second = self._create(image=_upload("b.png"))
+        other = self._create(image=_upload("c.png", color="blue"))
+        # Одинаковое содержимое — одни и те же файлы превью, другое — другие
+        self.assertEqual(first.thumbnails["jpeg"], second.thumbnails["jpeg"])
+        self.assertNotEqual(first.thumbnails["jpeg"], other.thumbnails["jpeg"])
+
+    def test_replaced_image_is_not_overwritten_by_stale_job(self):
+        product = self._create()
+        Product.objects.filter(pk=product.pk).update(image=default_storage.save("products/old.png", _upload()))
+        encode = thumbnails._encode
+
+        def replace_during_encoding(*args):
+            # Пока задача кодирует превью, картинку товара меняют
+            Product.objects.filter(pk=product.pk).update(image="products/new.png")
+            return encode(*args)
+
+        with patch("app.thumbnails._encode", side_effect=replace_during_encoding):
+            self.assertIsNone(thumbnails.generate(product.pk))
+        product.refresh_from_db()
+        self.assertEqual(product.thumbnails, {})
+
+    def test_missing_source_is_skipped(self):
+        product = self._create()
+        Product.objects.filter(pk=product.pk).update(image="products/missing.png")
+        with self.assertLogs("app.thumbnails", level="WARNING"):
+            self.assertIsNone(thumbnails.generate(product.pk))
+
+    def test_catalog_card_uses_srcset(self):
+        product = self._create(image=_upload())
+        self._create()
+        response = self.client.get(reverse("app:catalog"))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, f'{default_storage.url(product.thumbnails["jpeg"]["160"])} 160w')
+        self.assertContains(response, "images/placeholder-320.jpg")
+        self.assertNotContains(response, "via.placeholder.com")
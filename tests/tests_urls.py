@@ -12,6 +12,10 @@ class URLTests(SimpleTestCase):
         url = reverse("app:catalog")
         self.assertEqual(resolve(url).func, views.catalog)
 
+    def test_catalog_api_url(self):
+        url = reverse("app:catalog_api")
+        self.assertEqual(resolve(url).func, views.catalog_api)
+
     def test_product_detail_url(self):
         url = reverse("app:product_detail", args=[1])
         self.assertEqual(resolve(url).func, views.product_detail)
@@ -28,6 +32,10 @@ class URLTests(SimpleTestCase):
         url = reverse("app:remove_from_cart", args=[1])
         self.assertEqual(resolve(url).func, views.remove_from_cart)
 
+    def test_remove_from_session_cart_url(self):
+        url = reverse("app:remove_from_session_cart", args=[1])
+        self.assertEqual(resolve(url).func, views.remove_from_session_cart)
+
     def test_checkout_url(self):
         url = reverse("app:checkout")
         self.assertEqual(resolve(url).func, views.checkout)
@@ -52,6 +60,16 @@ class URLTests(SimpleTestCase):
         url = reverse("app:analytics")
         self.assertEqual(resolve(url).func, views.analytics_view)
 
+    def test_analytics_api_urls(self):
+        self.assertEqual(resolve(reverse("app:analytics_api")).func, views.analytics_api)
+        self.assertEqual(resolve(reverse("app:analytics_export")).func, views.analytics_export)
+
+    def test_search_url(self):
+        self.assertEqual(resolve(reverse("app:search")).func, views.search_view)
+
+    def test_metrics_url(self):
+        self.assertEqual(resolve(reverse("app:metrics")).func, views.metrics_view)
+
     def test_contacts_url(self):
         url = reverse("app:contacts")
         self.assertEqual(resolve(url).func, views.contacts)
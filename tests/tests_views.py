@@ -1,12 +1,17 @@
 import asyncio
-import threading
+import base64
+import json
 from unittest.mock import patch
 from decimal import Decimal
 
-from django.test import TestCase, Client
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
+from django.utils.timezone import now
 from django.contrib.auth import get_user_model
 
+from app.cart import GUEST_CART_COOKIE_NAME
 from app.models import Product, CartItem, Order, OrderItem, Review
 
 User = get_user_model()
@@ -22,8 +27,8 @@ def dummy_run_in_loop(coro):
     fut.set_result(None)
     return fut
 
-# Путь до функции run_in_loop, используемой в ваших вьюхах (например, в app/views.py)
-RUN_IN_LOOP_PATH = "app.views.run_in_loop"
+# Путь до неблокирующей отправки общего клиента уведомлений (app/notifications.py)
+RUN_IN_LOOP_PATH = "app.notifications.client.enqueue"
 
 # --- Тесты для HomeView ---
 
@@ -69,6 +74,102 @@ class CatalogViewTests(TestCase):
         self.assertNotContains(response, self.product2.name)
 
 
+class CatalogPaginationTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        for i in range(5):
+            Product.objects.create(
+                name=f"Flower {i}",
+                price=Decimal("10.00") + i,
+                stock=i,
+                available=True
+            )
+
+    def test_catalog_keyset_pages_cover_all_products_once(self):
+        seen = []
+        url = reverse("app:catalog_api") + "?page_size=2"
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(item["name"] for item in data["items"])
+            url = data["next"]
+        self.assertEqual(seen, [f"Flower {i}" for i in range(5)])
+
+    def test_catalog_sort_by_price_desc(self):
+        data = self.client.get(reverse("app:catalog_api"), {"sort": "-price", "page_size": 2}).json()
+        self.assertEqual([item["name"] for item in data["items"]], ["Flower 4", "Flower 3"])
+        self.assertIsNotNone(data["next_cursor"])
+
+    def test_catalog_filters_price_range_and_stock(self):
+        data = self.client.get(reverse("app:catalog_api"), {
+            "min_price": "10.00", "max_price": "12.00", "in_stock": "on",
+        }).json()
+        self.assertEqual([item["name"] for item in data["items"]], ["Flower 1", "Flower 2"])
+        self.assertIsNone(data["next"])
+
+    def test_catalog_page_query_count_is_constant(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse("app:catalog_api"), {"page_size": 2})
+
+    def test_catalog_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse("app:catalog"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Flower 0")
+
+    def test_forged_cursor_values_fall_back_to_first_page(self):
+        # Курсор правильной длины, но с чужими типами значений: все страницы с курсором — первая страница
+        user = User.objects.create_user(username="cursor", password="pass123")
+        self.client.force_login(user)
+        Review.objects.create(user=user, rating=5, comment="Отлично")
+        urls = [reverse(name) for name in ("app:catalog", "app:catalog_api", "app:reviews", "app:order_history")]
+        for values in (["abc", "def"], [None, None], ["1", "zz"], [[1], {"a": 1}]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            for url in urls:
+                with self.subTest(url=url, values=values):
+                    self.assertEqual(self.client.get(url, {"cursor": cursor}).status_code, 200)
+        self.assertEqual(len(self.client.get(reverse("app:catalog_api"), {"cursor": cursor}).json()["items"]), 5)
+
+
+class CatalogFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.rose = Product.objects.create(name="Rose", price=Decimal("10.00"), stock=3, available=True)
+        self.tulip = Product.objects.create(name="Tulip", price=Decimal("12.00"), stock=3, available=True)
+
+    def test_warm_catalog_renders_cards_from_cache(self):
+        self.client.get(reverse("app:catalog"))
+        # Тёплый кэш: остаётся только индексный запрос страницы, без догрузки товаров
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("app:catalog"))
+        self.assertContains(response, "Rose")
+        self.assertContains(response, "Tulip")
+
+    def test_saving_product_invalidates_only_its_fragments(self):
+        self.client.get(reverse("app:catalog"))
+        before = dict(Product.objects.values_list("pk", "updated_at"))
+
+        self.rose.name = "Red Rose"
+        self.rose.save()
+
+        after = dict(Product.objects.values_list("pk", "updated_at"))
+        self.assertNotEqual(before[self.rose.pk], after[self.rose.pk])
+        self.assertEqual(before[self.tulip.pk], after[self.tulip.pk])
+        self.assertContains(self.client.get(reverse("app:catalog")), "Red Rose")
+
+    def test_update_from_another_process_invalidates_fragments(self):
+        self.client.get(reverse("app:catalog"))
+        # Команда импорта или пул превью пишут в БД в обход save() и сигналов этого процесса
+        Product.objects.filter(pk=self.rose.pk).update(name="Garden Rose", updated_at=now())
+        self.assertContains(self.client.get(reverse("app:catalog")), "Garden Rose")
+
+    def test_product_detail_reflects_edits(self):
+        url = reverse("app:product_detail", args=[self.rose.pk])
+        self.client.get(url)
+        self.rose.description = "Свежая роза"
+        self.rose.save()
+        self.assertContains(self.client.get(url), "Свежая роза")
+
+
 # --- Тесты для ProductDetailView ---
 
 class ProductDetailViewTests(TestCase):
@@ -86,6 +187,11 @@ class ProductDetailViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, self.product.name)
 
+    def test_guest_sees_add_to_cart_form(self):
+        response = self.client.get(reverse("app:product_detail", args=[self.product.pk]))
+        self.assertContains(response, reverse("app:add_to_cart", args=[self.product.pk]))
+        self.assertNotContains(response, "Войдите в систему")
+
 
 # --- Тесты для AddToCartView ---
 
@@ -131,9 +237,11 @@ class CartViewTests(TestCase):
             price=self.product.price
         )
 
-    def test_cart_view_requires_login(self):
+    def test_cart_view_for_anonymous_is_empty(self):
         response = self.client.get(reverse("app:cart"))
-        self.assertNotEqual(response.status_code, 200)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Ваша корзина пуста.")
+        self.assertNotContains(response, self.product.name)
 
     def test_cart_view_for_logged_in_user(self):
         self.client.login(username="cartviewer", password="pass123")
@@ -144,6 +252,134 @@ class CartViewTests(TestCase):
         self.assertContains(response, str(total))
 
 
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username="badge", password="pass123")
+        self.client.login(username="badge", password="pass123")
+        self.rose = Product.objects.create(name="Rose", price=Decimal("10.00"), stock=5, available=True)
+
+    def test_badge_follows_add_and_remove(self):
+        self.client.get(reverse("app:add_to_cart", args=[self.rose.pk]))
+        self.client.get(reverse("app:add_to_cart", args=[self.rose.pk]))
+        response = self.client.get(reverse("app:home"))
+        self.assertEqual(response.context["cart_summary"]["count"], 2)
+        self.assertEqual(response.context["cart_summary"]["total"], Decimal("20.00"))
+
+        item = CartItem.objects.get(user=self.user)
+        self.client.get(reverse("app:remove_from_cart", args=[item.pk]))
+        response = self.client.get(reverse("app:home"))
+        self.assertEqual(response.context["cart_summary"]["count"], 0)
+
+    def test_warm_summary_needs_no_queries(self):
+        from app.cart import get_summary
+
+        CartItem.objects.create(user=self.user, product=self.rose, quantity=3, price=self.rose.price)
+        get_summary(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_summary(self.user), {"count": 3, "total": Decimal("30.00")})
+
+
+class SessionCartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username="guest", password="pass123")
+        self.rose = Product.objects.create(name="Rose", price=Decimal("10.00"), stock=5, available=True)
+        self.tulip = Product.objects.create(name="Tulip", price=Decimal("3.00"), stock=5, available=True)
+
+    def test_guest_cart_lives_in_cookie_without_db_writes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("app:add_to_cart", args=[self.rose.pk]))
+            self.client.get(reverse("app:add_to_cart", args=[self.rose.pk]))
+        # Ни одной записи — ни CartItem, ни django_session: корзина гостя в своей подписанной cookie
+        self.assertFalse([q for q in ctx.captured_queries if not q["sql"].startswith("SELECT")])
+        self.assertFalse(CartItem.objects.exists())
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+        self.assertIn(GUEST_CART_COOKIE_NAME, self.client.cookies)
+
+        response = self.client.get(reverse("app:cart"))
+        self.assertContains(response, "Rose")
+        self.assertEqual(response.context["cart_summary"]["count"], 2)
+        self.assertEqual(response.context["total_price"], Decimal("20.00"))
+
+        self.client.post(reverse("app:remove_from_session_cart", args=[self.rose.pk]))
+        self.assertEqual(self.client.get(reverse("app:cart")).context["cart_summary"]["count"], 0)
+        # Пустая корзина удаляет cookie
+        self.assertEqual(self.client.cookies[GUEST_CART_COOKIE_NAME].value, "")
+
+    def test_login_merges_guest_cart_into_existing_cart(self):
+        CartItem.objects.create(user=self.user, product=self.rose, quantity=1, price=self.rose.price)
+        self.client.get(reverse("app:add_to_cart", args=[self.rose.pk]))
+        self.client.get(reverse("app:add_to_cart", args=[self.tulip.pk]))
+
+        self.client.post(reverse("app:login"), {"username": "guest", "password": "pass123"})
+
+        self.assertEqual(
+            dict(CartItem.objects.filter(user=self.user).values_list("product__name", "quantity")),
+            {"Rose": 2, "Tulip": 1},
+        )
+        self.assertEqual(self.client.cookies[GUEST_CART_COOKIE_NAME].value, "")
+
+    def test_register_merges_guest_cart(self):
+        self.client.get(reverse("app:add_to_cart", args=[self.tulip.pk]))
+        self.client.post(reverse("app:register"), {
+            "username": "newcomer", "email": "n@example.com", "password1": "pass123", "password2": "pass123",
+        })
+        self.assertTrue(CartItem.objects.filter(user__username="newcomer", product=self.tulip, quantity=1).exists())
+
+
+class RepeatOrderTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username="repeater", password="pass123")
+        self.client.login(username="repeater", password="pass123")
+        self.order = Order.objects.create(
+            user=self.user, total_price=Decimal("0"), delivery_address="Street", phone_number="1",
+            delivery_time="10:00", delivery_date="2025-01-01",
+        )
+
+    def _order_products(self, count, stock=10):
+        products = []
+        for i in range(count):
+            product = Product.objects.create(name=f"Repeat {i}", price=Decimal("4.00"), stock=stock, available=True)
+            OrderItem.objects.create(order=self.order, product=product, quantity=2, price=Decimal("3.00"))
+            products.append(product)
+        return products
+
+    def _repeat_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("app:repeat_order", args=[self.order.id]))
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_depend_on_order_size(self):
+        self._order_products(1)
+        small = self._repeat_queries()
+        self._order_products(5)
+        large = self._repeat_queries()
+        self.assertEqual(small, large)
+        # Первая позиция добавлялась дважды и сложилась, цены — текущие
+        self.assertEqual(
+            sorted(CartItem.objects.filter(user=self.user).values_list("quantity", flat=True)),
+            [2, 2, 2, 2, 2, 4],
+        )
+        self.assertEqual(set(CartItem.objects.values_list("price", flat=True)), {Decimal("4.00")})
+
+    def test_quantity_is_clamped_to_stock(self):
+        product, = self._order_products(1, stock=3)
+        CartItem.objects.create(user=self.user, product=product, quantity=2, price=product.price)
+        response = self.client.get(reverse("app:repeat_order", args=[self.order.id]), follow=True)
+        self.assertEqual(CartItem.objects.get(user=self.user).quantity, 3)
+        self.assertContains(response, "Не хватает на складе")
+
+
 # --- Тесты для CheckoutView ---
 
 class CheckoutViewTests(TestCase):
@@ -197,6 +433,52 @@ class CheckoutViewTests(TestCase):
         self.assertFalse(CartItem.objects.filter(user=self.user).exists())
 
 
+class CheckoutPipelineTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username="bulkbuyer", password="pass123")
+        self.client.login(username="bulkbuyer", password="pass123")
+        self.post_data = {
+            "delivery_address": "1 Bulk St",
+            "phone_number": "555",
+            "delivery_time": "18:00",
+            "delivery_date": "2025-03-01",
+        }
+
+    def _fill_cart(self, size):
+        for i in range(size):
+            product = Product.objects.create(name=f"Bulk {i}", price=Decimal("2.00"), stock=10, available=True)
+            CartItem.objects.create(user=self.user, product=product, quantity=1, price=product.price)
+
+    def _checkout_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse("app:checkout"), self.post_data)
+        self.assertRedirects(response, reverse("app:order_success"), fetch_redirect_response=False)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        self._fill_cart(1)
+        small = self._checkout_queries()
+        self._fill_cart(6)
+        large = self._checkout_queries()
+        self.assertEqual(small, large)
+        order = Order.objects.filter(user=self.user).latest("id")
+        self.assertEqual(order.order_items.count(), 6)
+        self.assertEqual(order.total_price, Decimal("12.00"))
+
+    def test_failure_rolls_back_order_cart_and_stock(self):
+        self._fill_cart(2)
+        with patch("app.services.OrderItem.objects.bulk_create", side_effect=RuntimeError("db down")):
+            response = self.client.post(reverse("app:checkout"), self.post_data)
+        self.assertRedirects(response, reverse("app:checkout"), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(set(Product.objects.values_list("stock", flat=True)), {10})
+
+
 # --- Тесты для LoginView ---
 
 class LoginViewTests(TestCase):
@@ -218,9 +500,161 @@ class LoginViewTests(TestCase):
         self.assertTrue("_auth_user_id" in self.client.session)
 
 
+@override_settings(ORDER_HISTORY_PAGE_SIZE=2)
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username="regular", password="pass123")
+        self.client.login(username="regular", password="pass123")
+        self.orders = []
+        for i in range(5):
+            order = Order.objects.create(
+                user=self.user, total_price=Decimal("0"), delivery_address="Street", phone_number="1",
+                delivery_time="10:00", delivery_date="2025-01-01",
+            )
+            for j in range(i + 1):
+                product = Product.objects.create(name=f"History {i}-{j}", price=Decimal("2.00"), stock=5)
+                OrderItem.objects.create(order=order, product=product, quantity=2, price=Decimal("1.50"))
+            self.orders.append(order)
+
+    def _page(self, query=""):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("app:order_history") + query)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_pages_follow_cursor_with_constant_queries(self):
+        seen, counts, query = [], set(), ""
+        while True:
+            response, queries = self._page(query)
+            seen.extend(order.pk for order in response.context["orders"])
+            counts.add(queries)
+            if not response.context["next_query"]:
+                break
+            query = "?" + response.context["next_query"]
+        self.assertEqual(seen, [order.pk for order in reversed(self.orders)])
+        self.assertEqual(len(counts), 1)
+
+    def test_line_items_and_totals(self):
+        response, _ = self._page()
+        newest = response.context["orders"][0]
+        self.assertEqual(newest.line_count, 5)
+        self.assertEqual(newest.items_total, Decimal("15.00"))
+        self.assertContains(response, "History 4-3 × 2")
+
+    def test_other_users_orders_are_hidden(self):
+        other = User.objects.create_user(username="other", password="pass123")
+        Order.objects.create(
+            user=other, total_price=Decimal("0"), delivery_address="Street", phone_number="1",
+            delivery_time="10:00", delivery_date="2025-01-01",
+        )
+        response, _ = self._page()
+        self.assertTrue(all(order.user_id == self.user.pk for order in response.context["orders"]))
+
+
+class ReviewsViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(username=f"reviewer{i}", password="pass123") for i in range(3)]
+        self.reviews = [
+            Review.objects.create(user=self.users[i % 3], rating=i % 5 + 1, text=f"Отзыв {i}", comment="")
+            for i in range(7)
+        ]
+        self.client.login(username="reviewer0", password="pass123")
+
+    @override_settings(REVIEWS_PAGE_SIZE=3)
+    def test_pages_follow_cursor_without_user_lookups(self):
+        self.client.get(reverse("app:reviews"))
+        seen, query = [], ""
+        while True:
+            # Сессия, пользователь и одна страница отзывов вместе с авторами; сводки — из кэша
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse("app:reviews") + query)
+            seen.extend(review.pk for review in response.context["reviews"])
+            self.assertContains(response, response.context["reviews"][0].user.username)
+            if not response.context["next_query"]:
+                break
+            query = "?" + response.context["next_query"]
+        self.assertEqual(seen, [review.pk for review in reversed(self.reviews)])
+
+    def test_rating_summary_on_reviews_and_home(self):
+        self.assertContains(self.client.get(reverse("app:reviews")), "Средняя оценка: 2.57 / 5")
+        self.client.logout()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("app:home"))
+        self.assertContains(response, "отзывов: 7")
+
+
+class AsyncViewTests(TestCase):
+    """catalog, product_detail, cart_view и send_order_to_bot — async: через ASGI-обработчик без потоков."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="asyncuser", password="pass123")
+        cls.product = Product.objects.create(name="Async Rose", price=Decimal("5.00"), stock=3, available=True)
+        CartItem.objects.create(user=cls.user, product=cls.product, quantity=2, price=cls.product.price)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_views_are_coroutines(self):
+        from app import views
+
+        for view in (views.catalog, views.product_detail, views.cart_view, views.send_order_to_bot):
+            self.assertTrue(asyncio.iscoroutinefunction(view), view.__name__)
+
+    async def test_catalog_and_detail(self):
+        response = await self.async_client.get(reverse("app:catalog"))
+        self.assertContains(response, "Async Rose")
+        response = await self.async_client.get(reverse("app:product_detail", args=[self.product.pk]))
+        self.assertContains(response, "Async Rose")
+        response = await self.async_client.get(reverse("app:product_detail", args=[self.product.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_cart_for_user_and_guest(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("app:cart"))
+        self.assertContains(response, "Async Rose")
+        self.assertEqual(response.context["total_price"], Decimal("10.00"))
+        await self.async_client.alogout()
+        response = await self.async_client.get(reverse("app:cart"))
+        self.assertEqual(list(response.context["cart_items"]), [])
+
+    async def test_send_order_awaits_telegram(self):
+        from unittest.mock import AsyncMock
+
+        with patch("app.notifications.client.run", new_callable=AsyncMock) as run, \
+                patch("app.notifications.NotificationClient.bot"):
+            response = await self.async_client.post(
+                reverse("app:send_order_to_bot"), {"bouquet_name": "Розы", "price": 10},
+                content_type="application/json",
+            )
+        self.assertEqual(response.json()["status"], "success")
+        run.assert_awaited_once()
+
+    async def test_send_order_reports_telegram_failure(self):
+        from unittest.mock import AsyncMock
+
+        with patch("app.notifications.client.run", new_callable=AsyncMock, side_effect=RuntimeError("down")), \
+                patch("app.notifications.NotificationClient.bot"):
+            response = await self.async_client.post(
+                reverse("app:send_order_to_bot"), {"bouquet_name": "Розы"}, content_type="application/json",
+            )
+        self.assertEqual(response.json(), {"status": "error", "message": "down"})
+
+    async def test_send_order_rejects_non_object_body(self):
+        for body in ("[1, 2]", '"Розы"', "null", "{oops"):
+            response = await self.async_client.post(
+                reverse("app:send_order_to_bot"), body, content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 400, body)
+            self.assertEqual(response.json()["status"], "error")
+
+
 # --- Функция для корректного закрытия клиентской сессии бота после завершения всех тестов ---
 def tearDownModule():
-    import asyncio
-    from app.views import bot
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(bot.session.close())
+    from app.notifications import client
+    client.shutdown()